@@ -2,11 +2,16 @@ from __future__ import annotations
 
 import os
 import site
+from typing import TYPE_CHECKING
 
 site.addsitedir(os.path.join(os.path.dirname(__file__), "lib"))
 
-from .DarkestDungeonModCopy import DarkestDungeonModCopy  # noqa: E402
+if TYPE_CHECKING:
+    from .DarkestDungeonModCopy import DarkestDungeonModCopy
 
 
 def createPlugin() -> DarkestDungeonModCopy:
+    # 插件本体依赖 mobase 和 Qt，用到时才导入，命令行（cli.py）只需要这个包
+    from .DarkestDungeonModCopy import DarkestDungeonModCopy
+
     return DarkestDungeonModCopy()
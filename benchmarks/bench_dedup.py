@@ -0,0 +1,106 @@
+"""
+计时重复文件分析，并检查部分哈希附近的边界情况不会把内容不同的文件算成重复。
+
+    python benchmarks/bench_dedup.py [--mods 50] [--files 40] [--repeat 3]
+
+每次计时都用新的 HashStore，结果是不带缓存的分析耗时。
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic_steam import register_package
+
+register_package()
+
+from dd_plugin.dedup import PARTIAL_SIZE, DedupAnalyzer, HashStore
+
+
+def check_grouping(tmp: Path):
+    """
+    每种大小放三个模组：a 和 b 内容相同，c 只在开头和结尾各 PARTIAL_SIZE 之外
+    （小文件是第一个 PARTIAL_SIZE 之后）改了一个字节。只有 a、b 能分到一组。
+    """
+    sizes = [
+        PARTIAL_SIZE,
+        PARTIAL_SIZE + 1,
+        PARTIAL_SIZE + 30000,
+        2 * PARTIAL_SIZE,
+        2 * PARTIAL_SIZE + 1,
+        3 * PARTIAL_SIZE,
+    ]
+    mods = [tmp / "check" / name for name in "abc"]
+    for mod in mods:
+        mod.mkdir(parents=True)
+    rnd = random.Random(0)
+    for size in sizes:
+        data = bytearray(rnd.randbytes(size))
+        (mods[0] / f"{size}.bin").write_bytes(data)
+        (mods[1] / f"{size}.bin").write_bytes(data)
+        if size > PARTIAL_SIZE:
+            # 大文件改在开头和结尾之间，小文件改在开头之后
+            position = size // 2 if size > 2 * PARTIAL_SIZE else PARTIAL_SIZE
+            data[position] ^= 0xFF
+        else:
+            data[-1] ^= 0xFF
+        (mods[2] / f"{size}.bin").write_bytes(data)
+    report = DedupAnalyzer(mods).run()
+    for group in report.groups:
+        paths = sorted(Path(info.path).parent.name for c in group.copies for info in c)
+        if paths != ["a", "b"]:
+            raise SystemExit(f"size {group.size}: wrongly grouped {paths}")
+    if len(report.groups) != len(sizes):
+        raise SystemExit(f"expected {len(sizes)} groups, got {len(report.groups)}")
+
+
+def make_mods(root: Path, mods: int, files: int) -> list[Path]:
+    rnd = random.Random(1)
+    # 一半的文件从共享的池子里取，模拟多个模组带了同样的贴图
+    shared = [rnd.randbytes(rnd.randint(1, 300) * 1024) for _ in range(files)]
+    folders: list[Path] = []
+    for i in range(mods):
+        folder = root / f"mod{i}"
+        folder.mkdir(parents=True)
+        for j in range(files):
+            data = (
+                rnd.choice(shared)
+                if j % 2
+                else rnd.randbytes(rnd.randint(1, 300) * 1024)
+            )
+            (folder / f"file{j}.bin").write_bytes(data)
+        folders.append(folder)
+    return folders
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mods", type=int, default=50)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dd-dedup-") as tmp:
+        tmp_path = Path(tmp)
+        check_grouping(tmp_path)
+        folders = make_mods(tmp_path / "mods", args.mods, args.files)
+        runs: list[float] = []
+        for i in range(args.repeat):
+            store = HashStore(tmp_path / f"hashes{i}.sqlite")
+            start = time.perf_counter()
+            report = DedupAnalyzer(folders, store).run()
+            runs.append(time.perf_counter() - start)
+            store.flush(force=True)
+        print(
+            f"{report.files} files, {len(report.groups)} groups, "
+            f"{report.wasted_bytes / 1024 / 1024:.1f} MB wasted, "
+            f"best {min(runs) * 1000:.1f} ms",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
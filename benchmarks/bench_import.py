@@ -0,0 +1,203 @@
+"""
+计时 MO2 启动时加载插件的开销：导入包、createPlugin()、init() 和 MO2 会调用的
+元数据方法（name、settings 等）。打开窗口之后才用到的模块不应该出现在这里。
+
+    python benchmarks/bench_import.py [--repeat 5] [--output results.json]
+        [--baseline old.json] [--tolerance 0.5]
+
+每次在新的解释器里用 ``python -X importtime`` 运行，MO2 自己已经加载的模块
+（PyQt6、mobase 等）先导入，不算在内。结果里有总耗时、``-X importtime`` 统计的
+各模块自身耗时之和以及新导入的模块。有 ``HEAVY_MODULES`` 里的模块被导入，
+或者给出 ``--baseline`` 时比旧结果慢超过 ``--tolerance``，以状态 1 退出。
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PACKAGE = "dd_plugin"
+PLUGIN_PATH = Path(__file__).resolve().parent.parent
+# MO2 的 Python 插件加载器在加载插件前已经导入的模块
+PRELOADED = (
+    "logging",
+    "pathlib",
+    "typing",
+    "PyQt6.QtCore",
+    "PyQt6.QtGui",
+    "PyQt6.QtWidgets",
+)
+# 只在打开窗口后才需要的模块，启动时导入就算退化
+HEAVY_MODULES = (
+    "vdf",
+    "sqlite3",
+    "zipfile",
+    "xml.etree.ElementTree",
+    "concurrent.futures",
+    f"{PACKAGE}.mod_copy_tool",
+    f"{PACKAGE}.table_copy",
+    f"{PACKAGE}.steam_utils",
+    f"{PACKAGE}.mod_core",
+    f"{PACKAGE}.copy_engine",
+)
+_MARKER = "-- dd_plugin load --"
+
+
+def child(data_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from synthetic_steam import StubOrganizer, install_mobase_stub
+
+    install_mobase_stub()
+    for name in PRELOADED:
+        __import__(name)
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE,
+        PLUGIN_PATH / "__init__.py",
+        submodule_search_locations=[str(PLUGIN_PATH)],
+    )
+    assert spec is not None and spec.loader is not None
+    before = set(sys.modules)
+    print(_MARKER, file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+    plugin = package.createPlugin()
+    plugin.init(StubOrganizer(data_path / "mods", data_path / "plugin_data"))
+    for method in ("name", "displayName", "description", "tooltip", "author"):
+        getattr(plugin, method)()
+    plugin.version()
+    plugin.settings()
+    elapsed = time.perf_counter() - start
+
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "modules": sorted(set(sys.modules) - before),
+            }
+        )
+    )
+
+
+def _importtime(stderr: str) -> tuple[float, list[tuple[str, float]]]:
+    """
+    返回标记之后所有模块自身耗时之和（秒）和按累计耗时排序的顶层导入。
+    """
+    lines = stderr.splitlines()
+    if _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1 :]
+    total_us = 0
+    top: list[tuple[str, float]] = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        total_us += int(fields[0])
+        name = fields[2].rstrip()
+        # 缩进表示被谁导入，只看直接由插件导入的
+        if len(name) - len(name.lstrip()) <= 1:
+            top.append((name.strip(), int(fields[1]) / 1e6))
+    top.sort(key=lambda item: item[1], reverse=True)
+    return total_us / 1e6, top
+
+
+def measure() -> dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="dd-import-") as tmp:
+        (Path(tmp) / "mods").mkdir()
+        (Path(tmp) / "plugin_data").mkdir()
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", __file__, "--child", tmp],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    result = json.loads(proc.stdout.splitlines()[-1])
+    import_seconds, top = _importtime(proc.stderr)
+    result["import_seconds"] = import_seconds
+    result["top"] = top[:10]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child)
+        return
+
+    runs = [measure() for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: float(run["seconds"]))  # type: ignore[arg-type]
+    heavy = [
+        name
+        for name in best["modules"]  # type: ignore[union-attr]
+        if name in HEAVY_MODULES
+    ]
+    print(
+        f"plugin load {float(best['seconds']) * 1000:.1f} ms, "  # type: ignore[arg-type]
+        f"imports {float(best['import_seconds']) * 1000:.1f} ms, "  # type: ignore[arg-type]
+        f"{len(best['modules'])} new modules",  # type: ignore[arg-type]
+        file=sys.stderr,
+    )
+    for name, seconds in best["top"]:  # type: ignore[misc]
+        print(f"  {seconds * 1000:8.1f} ms  {name}", file=sys.stderr)
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": args.repeat,
+        "results": [
+            {
+                "benchmark": "plugin_load",
+                "best": best["seconds"],
+                "import_seconds": best["import_seconds"],
+                "runs": [run["seconds"] for run in runs],
+                "modules": best["modules"],
+            }
+        ],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    ok = True
+    if heavy:
+        print(f"REGRESSION: imported at load time: {', '.join(heavy)}", file=sys.stderr)
+        ok = False
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            old = float(json.load(f)["results"][0]["best"])
+        ratio = float(best["seconds"]) / old  # type: ignore[arg-type]
+        regressed = ratio > 1 + args.tolerance
+        print(
+            f"plugin_load {ratio:6.2f}x" + ("  REGRESSION" if regressed else ""),
+            file=sys.stderr,
+        )
+        ok = ok and not regressed
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
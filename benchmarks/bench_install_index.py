@@ -0,0 +1,91 @@
+"""
+比较用 glob 查找已安装的创意工坊模组和 install_index.InstallIndex。
+
+    python benchmarks/bench_install_index.py [--mods 500 3000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+# 插件模块用相对导入；注册一个只有 __path__ 的包，跳过会导入 mobase 的 __init__
+_package = types.ModuleType("dd_plugin")
+_package.__path__ = [str(Path(__file__).resolve().parent.parent)]
+sys.modules["dd_plugin"] = _package
+
+from dd_plugin.install_index import InstallIndex
+
+
+def make_mods(mods_path: Path, count: int, seed: int = 262060):
+    rnd = random.Random(seed)
+    for i in range(count):
+        mod = mods_path / f"mod {i}"
+        (mod / "heroes").mkdir(parents=True)
+        (mod / "heroes" / "hero.info.darkest").write_text("x")
+        (mod / "meta.ini").write_text("[General]\n")
+        kind = rnd.random()
+        if kind < 0.7:
+            (mod / "project_file").mkdir()
+            (mod / "project_file" / f"w{1_000_000_000 + i}.manifest").write_text("1")
+            (mod / "project_file" / f"{1_000_000_000 + i}.xml").write_text("<a/>")
+        elif kind < 0.8:
+            (mod / "project_file").mkdir()
+            (mod / "project_file" / f"l{i}.manifest").write_text("")
+
+
+def legacy_lookup(mods_path: Path) -> dict[str, str]:
+    # 原来的查找方式
+    return {
+        str(i.stem.strip("w")): i.parent.parent.name
+        for i in mods_path.glob("*/project_file/w*.manifest")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mods", type=int, nargs="*", default=[500, 3000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mods':>8} {'glob ms':>9} {'cold ms':>9} {'warm ms':>9}")
+    for count in args.mods:
+        with tempfile.TemporaryDirectory() as tmp:
+            mods_path = Path(tmp) / "mods"
+            index_file = Path(tmp) / "install_index.json"
+            make_mods(mods_path, count)
+
+            start = time.perf_counter()
+            InstallIndex(mods_path, index_file).refresh()
+            cold = time.perf_counter() - start
+
+            legacy = warm = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                expected = legacy_lookup(mods_path)
+                legacy = min(legacy, time.perf_counter() - start)
+
+                start = time.perf_counter()
+                index = InstallIndex(mods_path, index_file)
+                index.refresh()
+                warm = min(warm, time.perf_counter() - start)
+                assert index.workshop_mods() == expected
+                index.save()
+
+            # 改动一个模组后只重新扫描它
+            os.remove(mods_path / "mod 0" / "project_file" / "w1000000000.manifest")
+            index = InstallIndex(mods_path, index_file)
+            assert index.refresh()
+            assert index.workshop_mods() == legacy_lookup(mods_path)
+            print(
+                f"{count:>8} {legacy * 1000:>9.1f} {cold * 1000:>9.1f}"
+                f" {warm * 1000:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
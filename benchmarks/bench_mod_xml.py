@@ -0,0 +1,160 @@
+"""
+比较流式 project.xml 解析和原来的 ElementTree 多次遍历解析。
+
+    python benchmarks/bench_mod_xml.py [--description-kb 400] [--repeat 200]
+"""
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from xml.etree import ElementTree as ET
+from xml.etree.ElementTree import Element
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mod_xml import dd_xml_data
+
+
+def _etree_text_iter(tree: Element, name: str):
+    for elem in tree.iter(name):
+        if isinstance(elem.text, str):
+            return elem.text
+    return ""
+
+
+def legacy_mod_xml_parser(xml_file: str | Path):
+    # 原来的实现，用来做对照
+    mod_title: str = ""
+    mod_versions: list[int] = [0, 0, 0]
+    mod_tags: list[str] = []
+    mod_description: str = ""
+    mod_PublishedFileId: str = ""
+    try:
+        root = ET.fromstring(
+            Path(xml_file).read_text(encoding="utf-8", errors="ignore").strip()
+        )
+        mod_title = _etree_text_iter(root, "Title") or mod_title
+        mod_title = re.sub(r'[\/:*?"<>|]', "_", mod_title).strip()
+        mod_versions[0] = int(_etree_text_iter(root, "VersionMajor") or mod_versions[0])
+        mod_versions[1] = int(_etree_text_iter(root, "VersionMinor") or mod_versions[1])
+        mod_versions[2] = int(_etree_text_iter(root, "TargetBuild") or mod_versions[2])
+        mod_description = _etree_text_iter(root, "ItemDescription") or mod_description
+        mod_PublishedFileId = (
+            _etree_text_iter(root, "PublishedFileId") or mod_PublishedFileId
+        )
+        for Tags in root.iter("Tags"):
+            if not isinstance(Tags.text, str) or not Tags.text.strip():
+                continue
+            mod_tags.append(Tags.text)
+    except Exception:  # noqa: BLE001, S110
+        pass
+    return dd_xml_data(
+        mod_title, mod_versions, mod_tags, mod_description, mod_PublishedFileId
+    )
+
+
+def make_project_xml(published_file_id: int, description_kb: int) -> str:
+    words = [
+        "[b]英雄[/b]",
+        "[i]trinket[/i]",
+        "Crusader",
+        "暗黑地牢",
+        "[url=x]link[/url]",
+    ]
+    rnd = random.Random(published_file_id)
+    description = ""
+    while len(description) < description_kb * 1024:
+        description += " ".join(rnd.choice(words) for _ in range(50)) + "\n"
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<project>
+    <PreviewIconFile>preview_icon.png</PreviewIconFile>
+    <ItemDescriptionShort/>
+    <ModDataPath>C:/mods/{published_file_id}</ModDataPath>
+    <Title>测试模组 {published_file_id}: "demo"</Title>
+    <Language>english</Language>
+    <UpdateDetails/>
+    <Visibility>public</Visibility>
+    <UploadMode>direct_upload</UploadMode>
+    <VersionMajor>1</VersionMajor>
+    <VersionMinor>2</VersionMinor>
+    <TargetBuild>25208</TargetBuild>
+    <Tags>
+        <Tags>Gameplay Tweak</Tags>
+        <Tags>Classes</Tags>
+    </Tags>
+    <ItemDescription>{description.replace("&", "&amp;").replace("<", "&lt;")}</ItemDescription>
+    <PublishedFileId>{published_file_id}</PublishedFileId>
+</project>
+"""
+
+
+BROKEN_FILES: dict[str, str | bytes] = {
+    "empty": "",
+    "truncated": '<?xml version="1.0"?>\n<project><Title>x</Title><VersionMajor>1',
+    "bad_int": "<project><Title>x</Title><VersionMajor>a</VersionMajor></project>",
+    "blank_int": "<project><Title>x</Title><VersionMajor> </VersionMajor></project>",
+    "nested_tags": "<project><Tags>a<Tags>b</Tags> </Tags><Tags/></project>",
+    "no_tags": "<project><Title>a/b</Title><PublishedFileId>1</PublishedFileId></project>",
+    "leading_ws": "\n\n  <project><Title>t</Title></project>\n",
+    "bom": "\ufeff<?xml version='1.0' encoding='utf-8'?><project><Title>t</Title></project>",
+    "gbk_decl": "<?xml version='1.0' encoding='gbk'?><project><Title>中文</Title></project>",
+    "invalid_utf8": b"<project><Title>a\xff\xfeb</Title></project>",
+}
+
+
+def check_equivalence(tmp: Path):
+    for name, content in BROKEN_FILES.items():
+        path = tmp / f"{name}.xml"
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content, encoding="utf-8")
+        expected = legacy_mod_xml_parser(path).__dict__
+        actual = dd_xml_data.mod_xml_parser(path).__dict__
+        if expected != actual:
+            raise SystemExit(f"{name}: {actual} != {expected}")
+    missing = tmp / "missing.xml"
+    assert (
+        legacy_mod_xml_parser(missing).__dict__
+        == dd_xml_data.mod_xml_parser(missing).__dict__
+    )
+
+
+def bench(func, path: Path, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(path)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--description-kb", type=int, nargs="*", default=[1, 50, 400])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        check_equivalence(tmp_path)
+        print(f"{'description':>12} {'legacy ms':>10} {'stream ms':>10} {'speedup':>8}")
+        for kb in args.description_kb:
+            path = tmp_path / f"project_{kb}.xml"
+            path.write_text(make_project_xml(1000 + kb, kb), encoding="utf-8")
+            assert (
+                legacy_mod_xml_parser(path).__dict__
+                == dd_xml_data.mod_xml_parser(path).__dict__
+            )
+            legacy = bench(legacy_mod_xml_parser, path, args.repeat)
+            stream = bench(dd_xml_data.mod_xml_parser, path, args.repeat)
+            print(
+                f"{kb:>10}KB {legacy * 1000:>10.3f} {stream * 1000:>10.3f}"
+                f" {legacy / stream:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
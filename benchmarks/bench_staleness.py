@@ -0,0 +1,79 @@
+"""
+计时 staleness.update_outdated：几千个已安装模组时应该只要几毫秒。
+
+    python benchmarks/bench_staleness.py [--mods 1000 5000] [--repeat 50]
+"""
+
+import argparse
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+# 插件模块用相对导入；注册一个只有 __path__ 的包，跳过会导入 mobase 的 __init__
+_package = types.ModuleType("dd_plugin")
+_package.__path__ = [str(Path(__file__).resolve().parent.parent)]
+sys.modules["dd_plugin"] = _package
+
+from dd_plugin.mod_record import ModRecord
+from dd_plugin.staleness import update_outdated
+from dd_plugin.workshop_acf import WorkshopItem
+
+
+def make_records(
+    count: int, seed: int = 262060
+) -> tuple[list[ModRecord], dict[str, WorkshopItem]]:
+    rnd = random.Random(seed)
+    records: list[ModRecord] = []
+    items: dict[str, WorkshopItem] = {}
+    for i in range(count):
+        published_file_id = str(1_000_000_000 + i)
+        manifest = str(rnd.randrange(10**18, 10**19))
+        timeupdated = 1_500_000_000 + rnd.randrange(200_000_000)
+        items[published_file_id] = WorkshopItem(
+            published_file_id, manifest, str(timeupdated)
+        )
+        record = ModRecord(
+            f"C:/steam/content/262060/{published_file_id}",
+            f"mod {i}",
+            published_file_id,
+            f"mod {i}",
+            f"C:/mo2/mods/mod {i}",
+        )
+        # 大约十分之一过期，另有一些旧版本留下的空清单
+        if rnd.random() < 0.1:
+            record.installed_manifest = str(rnd.randrange(10**18, 10**19))
+        elif rnd.random() < 0.05:
+            record.installed_manifest = ""
+        else:
+            record.installed_manifest = manifest
+        record.installed_mtime_ns = (timeupdated + rnd.randrange(-1000, 1000)) * 10**9
+        record.source_mtime_ns = timeupdated * 10**9
+        records.append(record)
+    return records, items
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mods", type=int, nargs="*", default=[1000, 5000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mods':>8} {'outdated':>9} {'ms':>8}")
+    for count in args.mods:
+        records, items = make_records(count)
+        update_outdated(records, items)
+        outdated = sum(1 for record in records if record.outdated)
+        best = float("inf")
+        for _ in range(args.repeat):
+            for record in records:
+                record.outdated = False
+            start = time.perf_counter()
+            update_outdated(records, items)
+            best = min(best, time.perf_counter() - start)
+        print(f"{count:>8} {outdated:>9} {best * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
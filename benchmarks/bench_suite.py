@@ -0,0 +1,251 @@
+"""
+在生成的 Steam 库和假 MO2 上计时插件的主要路径，不需要 Windows、Steam 或 MO2。
+
+    python benchmarks/bench_suite.py [--mods 100 1000 10000] [--repeat 3]
+        [--copy-sample 10] [--output results.json]
+        [--baseline old.json] [--tolerance 0.25] [--diagnostics]
+
+计时的项目：
+
+- parse_library_info：读取 libraryfolders.vdf
+- get_workshop_items (cold/warm)：打开窗口时的完整扫描，cold 时删掉所有缓存
+- mod_xml_parser：逐个解析全部 project.xml
+- scopy_mod：从库里抽 ``--copy-sample`` 个模组复制进 MO2，复制本身和库的大小无关
+
+结果以 JSON 写到 ``--output``（默认输出到标准输出）。给出 ``--baseline`` 时和
+旧结果比较，有项目比旧结果慢超过 ``--tolerance`` 就以状态 1 退出。
+``--diagnostics`` 打开插件的计时统计并把它一起写进结果，也可以用来比较开销。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from synthetic_steam import (
+    SyntheticSteam,
+    install_mobase_stub,
+    register_package,
+)
+
+register_package()
+install_mobase_stub()
+
+import dd_plugin.DarkestDungeonModCopy as plugin_module
+from dd_plugin import diagnostics, mod_core, steam_utils
+from dd_plugin.mod_xml import dd_xml_data
+from PyQt6.QtWidgets import QApplication, QWidget
+
+
+def _time(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Callable[[], object] | None = None,
+) -> list[float]:
+    runs: list[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def _result(
+    benchmark: str, mods: int, runs: list[float], **extra: object
+) -> dict[str, object]:
+    return {
+        "benchmark": benchmark,
+        "mods": mods,
+        "best": min(runs),
+        "runs": runs,
+        **extra,
+    }
+
+
+def run_size(
+    mods: int, repeat: int, copy_sample: int, diagnostics_on: bool
+) -> list[dict[str, object]]:
+    results: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory(prefix="dd-bench-") as tmp:
+        start = time.perf_counter()
+        steam = SyntheticSteam(Path(tmp), mods)
+        print(
+            f"{mods} mods generated in {time.perf_counter() - start:.1f} s",
+            file=sys.stderr,
+        )
+        # 插件从 winreg 找 Steam，这里指向生成的目录
+        mod_core.find_steam_path = lambda: steam.steam_path
+        plugin = plugin_module.DarkestDungeonModCopy()
+        organizer = steam.organizer()
+        organizer.settings["diagnostics"] = diagnostics_on
+        plugin.init(organizer)  # type: ignore[arg-type]
+        parent = QWidget()
+        plugin.setParentWidget(parent)
+        # 扫描、复制等都在第一次打开窗口时才加载的 ModCopyTool 里
+        tool = plugin.tool()
+
+        runs = _time(
+            lambda: steam_utils.parse_library_info(steam.library_vdf), repeat * 10
+        )
+        results.append(_result("parse_library_info", mods, runs))
+
+        def reset_plugin():
+            tool.core = None
+
+        def drop_caches():
+            reset_plugin()
+            for name in ("mod_xml_cache.sqlite", "install_index.json"):
+                (tool._data_path() / name).unlink(missing_ok=True)
+            steam_utils._library_cache.clear()
+
+        count = 0
+
+        def scan():
+            nonlocal count
+            count = len(tool.get_workshop_items())
+
+        runs = _time(scan, repeat, drop_caches)
+        results.append(_result("get_workshop_items_cold", mods, runs, rows=count))
+        runs = _time(scan, repeat, reset_plugin)
+        results.append(_result("get_workshop_items_warm", mods, runs, rows=count))
+
+        # 搜索框每次输入做的事：全文查询、带标签查询和标签计数
+        search_index = tool._get_core().search_index
+        queries = ("c", "cru", "暗黑", "测试模组 12", "trinket 英雄", "[url")
+
+        def search():
+            for query in queries:
+                ids = search_index.search(query)
+                search_index.search(query, "Heroes")
+                search_index.facets(ids)
+
+        runs = [run / len(queries) for run in _time(search, repeat * 10)]
+        results.append(_result("search_query", mods, runs, indexed=len(search_index)))
+
+        xml_files = [folder / "project.xml" for folder in steam.mod_folders]
+        runs = _time(
+            lambda: [dd_xml_data.mod_xml_parser(xml_file) for xml_file in xml_files],
+            repeat,
+        )
+        results.append(_result("mod_xml_parser", mods, runs, files=len(xml_files)))
+
+        sample = random.Random(mods).sample(
+            steam.mod_folders, min(copy_sample, len(steam.mod_folders))
+        )
+        copied_bytes = sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for folder in sample
+            for dirpath, _dirs, names in os.walk(folder)
+            for name in names
+        )
+
+        def remove_copies():
+            for i in range(len(sample)):
+                shutil.rmtree(steam.mods_path / f"bench copy {i}", ignore_errors=True)
+
+        def copy_sample_mods():
+            for i, folder in enumerate(sample):
+                if not tool.scopy_mod(
+                    folder, steam.mods_path / f"bench copy {i}", True
+                ):
+                    raise RuntimeError(f"scopy_mod failed for {folder}")
+
+        runs = _time(copy_sample_mods, repeat, remove_copies)
+        remove_copies()
+        results.append(
+            _result(
+                "scopy_mod",
+                mods,
+                runs,
+                copied_mods=len(sample),
+                copied_bytes=copied_bytes,
+            )
+        )
+        parent.deleteLater()
+    return results
+
+
+def compare(
+    results: list[dict[str, object]], baseline_file: Path, tolerance: float
+) -> bool:
+    """
+    打印和旧结果的比值，返回是否没有退化。
+    """
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = {
+            (item["benchmark"], item["mods"]): item["best"]
+            for item in json.load(f)["results"]
+        }
+    ok = True
+    for item in results:
+        old = baseline.get((item["benchmark"], item["mods"]))
+        if not old:
+            continue
+        ratio = float(item["best"]) / float(old)  # type: ignore[arg-type]
+        regressed = ratio > 1 + tolerance
+        ok = ok and not regressed
+        print(
+            f"{item['benchmark']:>26} {item['mods']:>6} {ratio:6.2f}x"
+            + ("  REGRESSION" if regressed else ""),
+            file=sys.stderr,
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mods", type=int, nargs="*", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--copy-sample", type=int, default=10)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--diagnostics", action="store_true")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results: list[dict[str, object]] = []
+    for mods in args.mods:
+        results.extend(run_size(mods, args.repeat, args.copy_sample, args.diagnostics))
+    app.processEvents()
+
+    for item in results:
+        print(
+            f"{item['benchmark']:>26} {item['mods']:>6} "
+            f"{float(item['best']) * 1000:10.1f} ms",  # type: ignore[arg-type]
+            file=sys.stderr,
+        )
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.diagnostics:
+        report["diagnostics"] = diagnostics.report()["spans"]
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline is not None and not compare(
+        results, args.baseline, args.tolerance
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
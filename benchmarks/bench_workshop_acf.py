@@ -0,0 +1,107 @@
+"""
+比较 workshop_acf.parse_workshop_acf 和 vdf.load 读取 appworkshop_262060.acf。
+
+    python benchmarks/bench_workshop_acf.py [--items 5000 20000] [--repeat 5]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import vdf  # type: ignore
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from workshop_acf import parse_workshop_acf
+
+
+def make_workshop_acf(items: int, seed: int = 262060) -> str:
+    rnd = random.Random(seed)
+    ids = [str(1_000_000_000 + rnd.randrange(2_000_000_000)) for _ in range(items)]
+    installed: list[str] = []
+    details: list[str] = []
+    for item_id in ids:
+        size = str(rnd.randrange(10_000, 2_000_000_000))
+        timeupdated = str(1_500_000_000 + rnd.randrange(200_000_000))
+        manifest = str(rnd.randrange(10**18, 10**19))
+        installed.append(
+            f'\t\t"{item_id}"\n\t\t{{\n'
+            f'\t\t\t"size"\t\t"{size}"\n'
+            f'\t\t\t"timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"manifest"\t\t"{manifest}"\n'
+            "\t\t}\n"
+        )
+        details.append(
+            f'\t\t"{item_id}"\n\t\t{{\n'
+            f'\t\t\t"manifest"\t\t"{manifest}"\n'
+            f'\t\t\t"timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"timetouched"\t\t"{timeupdated}"\n'
+            '\t\t\t"subscribedby"\t\t"76561198000000000"\n'
+            f'\t\t\t"latest_timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"latest_manifest"\t\t"{manifest}"\n'
+            "\t\t}\n"
+        )
+    return (
+        '"AppWorkshop"\n{\n'
+        '\t"appid"\t\t"262060"\n'
+        '\t"SizeOnDisk"\t\t"123456789"\n'
+        '\t"NeedsUpdate"\t\t"0"\n'
+        '\t"NeedsDownload"\t\t"0"\n'
+        '\t"TimeLastUpdated"\t\t"1700000000"\n'
+        '\t"TimeLastAppRan"\t\t"1700000000"\n'
+        '\t"LastBuildID"\t\t"0"\n'
+        '\t"WorkshopItemsInstalled"\n\t{\n' + "".join(installed) + "\t}\n"
+        '\t"WorkshopItemDetails"\n\t{\n' + "".join(details) + "\t}\n"
+        "}\n"
+    )
+
+
+def legacy_load(acf_path: Path) -> dict[str, dict[str, str]]:
+    # 原来的读法
+    with open(acf_path, encoding="utf-8") as f:
+        return vdf.load(f)["AppWorkshop"]["WorkshopItemDetails"]  # type: ignore
+
+
+def bench(func, path: Path, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, nargs="*", default=[5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(
+            f"{'items':>8} {'size':>8} {'vdf ms':>10} {'stream ms':>10} {'speedup':>8}"
+        )
+        for count in args.items:
+            path = Path(tmp) / f"appworkshop_{count}.acf"
+            path.write_text(make_workshop_acf(count), encoding="utf-8")
+            expected = legacy_load(path)
+            actual = parse_workshop_acf(path)
+            assert list(expected) == list(actual)
+            for item_id, details in expected.items():
+                assert actual[item_id].manifest == details["manifest"]
+                assert actual[item_id].timeupdated == details["timeupdated"]
+                assert actual[item_id].size
+            legacy = bench(legacy_load, path, args.repeat)
+            stream = bench(parse_workshop_acf, path, args.repeat)
+            print(
+                f"{count:>8} {path.stat().st_size / 1024 / 1024:>6.1f}MB"
+                f" {legacy * 1000:>10.1f} {stream * 1000:>10.1f}"
+                f" {legacy / stream:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
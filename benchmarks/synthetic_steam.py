@@ -0,0 +1,264 @@
+"""
+给基准测试用的假 Steam 库和假 MO2。
+
+生成 libraryfolders.vdf、每个库的 appworkshop_262060.acf、content/262060 下
+N 个带 project.xml 的模组文件夹，以及一部分已经复制进 MO2 的模组。模组里的
+文件按真实模组的大小分布生成，但都是稀疏文件，一万个模组也不占多少磁盘。
+
+mobase 只在这里用一个空模块代替，插件本身的代码不受影响。
+"""
+
+import random
+import sys
+import types
+from pathlib import Path
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+GAME_ID = "262060"
+
+# (扩展名, 最小字节数, 最大字节数, 权重)，大致按创意工坊模组里的文件统计
+_FILE_KINDS = (
+    (".darkest", 200, 40_000, 40),
+    (".txt", 100, 20_000, 10),
+    (".png", 4_000, 2_000_000, 35),
+    (".json", 200, 50_000, 8),
+    (".bank", 200_000, 30_000_000, 2),
+    (".xml", 500, 200_000, 5),
+)
+_FOLDERS = ("heroes", "trinkets", "localization", "dungeons", "shared", "panels")
+_WORDS = ("[b]英雄[/b]", "Crusader", "暗黑地牢", "trinket", "[url=x]link[/url]")
+_TAGS = ("Heroes", "Trinkets", "UI", "Gameplay Tweaks", "Overhauls", "Skins")
+
+
+def register_package(name: str = "dd_plugin") -> types.ModuleType:
+    """
+    插件模块用相对导入；注册一个只有 __path__ 的包，跳过会导入 mobase 的 __init__。
+    """
+    package = types.ModuleType(name)
+    package.__path__ = [str(REPO_PATH)]
+    sys.modules[name] = package
+    return package
+
+
+class _StubModule(types.ModuleType):
+    # mobase 里的类只在类型注解和基类里用到，随便给一个类就够了
+    def __getattr__(self, name: str) -> type:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        stub = type(name, (), {"__init__": lambda self, *args, **kwargs: None})
+        setattr(self, name, stub)
+        return stub
+
+
+def install_mobase_stub():
+    sys.modules.setdefault("mobase", _StubModule("mobase"))
+
+
+class StubModList:
+    def __init__(self, mods_path: Path):
+        self._mods_path = mods_path
+
+    def allMods(self) -> list[str]:
+        return sorted(path.name for path in self._mods_path.iterdir())
+
+
+class StubOrganizer:
+    """
+    只实现插件用到的 IOrganizer 方法，设置都返回 None，让插件使用默认值。
+    """
+
+    def __init__(self, mods_path: Path, data_path: Path):
+        self._mods_path = mods_path
+        self._data_path = data_path
+        self._mod_list = StubModList(mods_path)
+        self.settings: dict[str, object] = {}
+
+    def modsPath(self) -> str:
+        return str(self._mods_path)
+
+    def pluginDataPath(self) -> str:
+        return str(self._data_path)
+
+    def pluginSetting(self, plugin_name: str, key: str) -> object:
+        return self.settings.get(key)
+
+    def modList(self) -> StubModList:
+        return self._mod_list
+
+    def refresh(self, save_changes: bool = True):
+        pass
+
+
+def _project_xml(rnd: random.Random, published_file_id: str, index: int) -> str:
+    # 大部分描述只有几 KB，少数模组会写很长的说明
+    description_kb = rnd.choice((1, 1, 2, 4, 8, 16, 200 if rnd.random() < 0.02 else 4))
+    words: list[str] = []
+    size = 0
+    while size < description_kb * 1024:
+        word = rnd.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    tags = "".join(
+        f"\n        <Tags>{tag}</Tags>" for tag in rnd.sample(_TAGS, rnd.randint(1, 3))
+    )
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<project>
+    <PreviewIconFile>preview_icon.png</PreviewIconFile>
+    <ItemDescriptionShort/>
+    <ModDataPath>C:/mods/{published_file_id}</ModDataPath>
+    <Title>测试模组 {index}: "demo"</Title>
+    <Language>english</Language>
+    <UpdateDetails/>
+    <Visibility>public</Visibility>
+    <UploadMode>direct_upload</UploadMode>
+    <VersionMajor>{rnd.randint(0, 3)}</VersionMajor>
+    <VersionMinor>{rnd.randint(0, 20)}</VersionMinor>
+    <TargetBuild>0</TargetBuild>
+    <Tags>{tags}
+    </Tags>
+    <ItemDescription>{" ".join(words)}</ItemDescription>
+    <PublishedFileId>{published_file_id}</PublishedFileId>
+</project>
+"""
+
+
+def _make_mod_files(rnd: random.Random, mod_folder: Path):
+    weights = [kind[3] for kind in _FILE_KINDS]
+    # 文件数大致是对数正态分布，中位数在 8 个左右
+    count = min(80, max(1, int(rnd.lognormvariate(2.1, 0.8))))
+    for i in range(count):
+        suffix, low, high, _weight = rnd.choices(_FILE_KINDS, weights)[0]
+        folder = mod_folder / rnd.choice(_FOLDERS)
+        folder.mkdir(exist_ok=True)
+        size = int(low * (high / low) ** rnd.random())
+        with open(folder / f"file_{i}{suffix}", "wb") as f:
+            f.truncate(size)
+    with open(mod_folder / "preview_icon.png", "wb") as f:
+        f.truncate(rnd.randint(20_000, 500_000))
+
+
+def _workshop_acf(items: list[tuple[str, str, str, int]]) -> str:
+    installed: list[str] = []
+    details: list[str] = []
+    for item_id, manifest, timeupdated, size in items:
+        installed.append(
+            f'\t\t"{item_id}"\n\t\t{{\n'
+            f'\t\t\t"size"\t\t"{size}"\n'
+            f'\t\t\t"timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"manifest"\t\t"{manifest}"\n'
+            "\t\t}\n"
+        )
+        details.append(
+            f'\t\t"{item_id}"\n\t\t{{\n'
+            f'\t\t\t"manifest"\t\t"{manifest}"\n'
+            f'\t\t\t"timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"timetouched"\t\t"{timeupdated}"\n'
+            '\t\t\t"subscribedby"\t\t"76561198000000000"\n'
+            f'\t\t\t"latest_timeupdated"\t\t"{timeupdated}"\n'
+            f'\t\t\t"latest_manifest"\t\t"{manifest}"\n'
+            "\t\t}\n"
+        )
+    return (
+        '"AppWorkshop"\n{\n'
+        f'\t"appid"\t\t"{GAME_ID}"\n'
+        '\t"SizeOnDisk"\t\t"123456789"\n'
+        '\t"NeedsUpdate"\t\t"0"\n'
+        '\t"NeedsDownload"\t\t"0"\n'
+        '\t"TimeLastUpdated"\t\t"1700000000"\n'
+        '\t"TimeLastAppRan"\t\t"1700000000"\n'
+        '\t"LastBuildID"\t\t"0"\n'
+        '\t"WorkshopItemsInstalled"\n\t{\n' + "".join(installed) + "\t}\n"
+        '\t"WorkshopItemDetails"\n\t{\n' + "".join(details) + "\t}\n"
+        "}\n"
+    )
+
+
+def _library_folders_vdf(libraries: list[Path]) -> str:
+    entries: list[str] = []
+    for i, library in enumerate(libraries):
+        apps = f'\t\t\t"{GAME_ID}"\t\t"123456789"\n' if i == 0 else ""
+        path = str(library).replace("\\", "\\\\")
+        entries.append(
+            f'\t"{i}"\n\t{{\n'
+            f'\t\t"path"\t\t"{path}"\n'
+            '\t\t"label"\t\t""\n'
+            '\t\t"contentid"\t\t"1234567890"\n'
+            '\t\t"totalsize"\t\t"0"\n'
+            f'\t\t"apps"\n\t\t{{\n{apps}\t\t}}\n'
+            "\t}\n"
+        )
+    return '"libraryfolders"\n{\n' + "".join(entries) + "}\n"
+
+
+class SyntheticSteam:
+    """
+    ``root`` 下的一套假环境：
+
+    - steam/steamapps/libraryfolders.vdf，列出 ``libraries`` 个库，第一个就是 steam 本身
+    - 每个库的 steamapps/workshop/appworkshop_262060.acf 和 content/262060/<id>
+    - mo2/mods 里已经复制过的一部分模组（只有 project_file/w<id>.manifest）
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        mods: int,
+        libraries: int = 2,
+        installed_ratio: float = 0.3,
+        seed: int = 262060,
+    ):
+        self.root = root
+        self.steam_path = root / "steam"
+        self.mods_path = root / "mo2" / "mods"
+        self.data_path = root / "mo2" / "plugin_data"
+        self.library_vdf = self.steam_path / "steamapps" / "libraryfolders.vdf"
+        self.libraries = [self.steam_path] + [
+            root / f"library_{i}" for i in range(1, libraries)
+        ]
+        self.mod_folders: list[Path] = []
+
+        rnd = random.Random(seed)
+        self.mods_path.mkdir(parents=True)
+        self.data_path.mkdir(parents=True)
+        self.library_vdf.parent.mkdir(parents=True)
+        self.library_vdf.write_text(
+            _library_folders_vdf(self.libraries), encoding="utf-8"
+        )
+        per_library: list[list[tuple[str, str, str, int]]] = [
+            [] for _ in self.libraries
+        ]
+        for i in range(mods):
+            published_file_id = str(1_000_000_000 + i * 7919)
+            manifest = str(rnd.randrange(10**18, 10**19))
+            timeupdated = str(1_500_000_000 + rnd.randrange(200_000_000))
+            library_index = rnd.randrange(len(self.libraries))
+            mod_folder = (
+                self.libraries[library_index]
+                / "steamapps"
+                / "workshop"
+                / "content"
+                / GAME_ID
+                / published_file_id
+            )
+            mod_folder.mkdir(parents=True)
+            (mod_folder / "project.xml").write_text(
+                _project_xml(rnd, published_file_id, i), encoding="utf-8"
+            )
+            _make_mod_files(rnd, mod_folder)
+            self.mod_folders.append(mod_folder)
+            per_library[library_index].append(
+                (published_file_id, manifest, timeupdated, rnd.randrange(10**4, 10**9))
+            )
+            if rnd.random() < installed_ratio:
+                project_file = self.mods_path / f"测试模组 {i}" / "project_file"
+                project_file.mkdir(parents=True)
+                (project_file / f"w{published_file_id}.manifest").write_text(manifest)
+        for library, items in zip(self.libraries, per_library, strict=True):
+            workshop = library / "steamapps" / "workshop"
+            workshop.mkdir(parents=True, exist_ok=True)
+            (workshop / f"appworkshop_{GAME_ID}.acf").write_text(
+                _workshop_acf(items), encoding="utf-8"
+            )
+
+    def organizer(self) -> StubOrganizer:
+        return StubOrganizer(self.mods_path, self.data_path)
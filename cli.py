@@ -0,0 +1,384 @@
+"""
+不打开 MO2 的命令行入口，和插件共用 mod_core。
+
+    python -m <插件文件夹>.cli scan --mods D:/MO2/mods [--json mods.json] [--sizes]
+    python -m <插件文件夹>.cli install --mods D:/MO2/mods --all [--jobs 4]
+    python -m <插件文件夹>.cli update --mods D:/MO2/mods --outdated
+    python -m <插件文件夹>.cli backup --mods D:/MO2/mods [--full]
+    python -m <插件文件夹>.cli restore --mods D:/MO2/mods [--snapshot NAME]
+
+也可以直接运行 ``python cli.py ...``。``--steam`` 不给时从注册表查找 Steam；
+``--data`` 默认是 MO2 的插件数据目录，和插件共用缓存和索引。
+MO2 运行时安装的模组要在 MO2 里刷新后才会出现，``--enable-in`` 修改的
+modlist.txt 只能在 MO2 关闭时写。
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    # 直接当脚本运行时，注册一个指向本文件夹的包，让相对导入可用
+    import importlib
+    import types
+
+    _package = types.ModuleType("dd_plugin")
+    _package.__path__ = [str(Path(__file__).resolve().parent)]
+    sys.modules["dd_plugin"] = _package
+    sys.exit(importlib.import_module("dd_plugin.cli").main())
+
+from .copy_engine import DEFAULT_WORKERS, CopyCancelled, format_bytes
+from .mod_backup import (
+    BackupRestorer,
+    BackupWriter,
+    list_snapshots,
+)
+from .mod_core import ModCore, enable_in_profile, record_to_dict
+from .mod_installer import DEFAULT_INSTALL_JOBS, QueueProgress
+from .mod_record import NOT_COPIED, ModRecord
+from .workshop_scan import DEFAULT_SCAN_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# MO2 的 pluginDataPath() 是 plugins/data，插件自己的数据在它下面
+DEFAULT_DATA_PATH = (
+    Path(__file__).resolve().parent.parent / "data" / "DarkestDungeonModCopy"
+)
+# 命令行里进度最多每隔多久打印一次（秒）
+PROGRESS_INTERVAL = 1.0
+
+
+def _core(args: argparse.Namespace) -> ModCore:
+    args.data.mkdir(parents=True, exist_ok=True)
+    return ModCore(args.mods, args.data, args.steam)
+
+
+def _scan(args: argparse.Namespace, core: ModCore) -> list[ModRecord]:
+    start = time.perf_counter()
+    records = core.scan(args.scan_workers, args.processes)
+    logger.info(f"scanned {len(records)} mods in {time.perf_counter() - start:.1f} s")
+    return records
+
+
+def _select(records: list[ModRecord], args: argparse.Namespace) -> list[ModRecord]:
+    if args.ids:
+        wanted = set(args.ids)
+        selected = [r for r in records if r.published_file_id in wanted]
+        missing = wanted - {r.published_file_id for r in selected}
+        if missing:
+            logger.warning(f"not in any workshop library: {', '.join(sorted(missing))}")
+        return selected
+    return records
+
+
+def cmd_scan(args: argparse.Namespace) -> int:
+    core = _core(args)
+    records = _scan(args, core)
+    if args.sizes:
+        by_source = {record.source_path: record for record in records}
+        for source_path, size_bytes, file_count in core.iter_sizes(
+            list(by_source), args.scan_workers, prune=True
+        ):
+            by_source[source_path].size_bytes = size_bytes
+            by_source[source_path].file_count = file_count
+    if args.json is not None:
+        text = json.dumps(
+            [record_to_dict(record) for record in records],
+            ensure_ascii=False,
+            indent=2,
+        )
+        if str(args.json) == "-":
+            print(text)
+        else:
+            args.json.write_text(text + "\n", encoding="utf-8")
+        return 0
+    for record in records:
+        print(
+            "\t".join(
+                (
+                    record.published_file_id,
+                    "过期" if record.outdated else "",
+                    record.mo2_name or NOT_COPIED,
+                    *(
+                        (format_bytes(record.size_bytes),)
+                        if record.size_bytes >= 0
+                        else ()
+                    ),
+                    record.title,
+                )
+            )
+        )
+    return 0
+
+
+def _print_queue_progress():
+    last = 0.0
+
+    def on_progress(p: QueueProgress):
+        nonlocal last
+        now = time.perf_counter()
+        if now - last < PROGRESS_INTERVAL and p.permille < 1000:
+            return
+        last = now
+        print(
+            f"{p.jobs_done + p.jobs_failed}/{p.jobs_total} 个模组，"
+            f"{format_bytes(p.bytes_done)}/{format_bytes(p.bytes_total)}，"
+            f"{format_bytes(p.bytes_per_second)}/s",
+            file=sys.stderr,
+        )
+
+    return on_progress
+
+
+def cmd_install(args: argparse.Namespace) -> int:
+    if not args.ids and not args.all:
+        logger.error("give --ids or --all")
+        return 2
+    for profile in args.enable_in:
+        if not (profile / "modlist.txt").is_file():
+            logger.error(f"not a MO2 profile: {profile}")
+            return 2
+    core = _core(args)
+    records = _select(_scan(args, core), args)
+    jobs = core.plan_installs(records, core.taken_names())
+    for job in jobs:
+        print(f"{job.source.name} -> {job.name}")
+    if not jobs:
+        return 0
+    check = core.check_space([job.source for job in jobs], args.link, args.scan_workers)
+    logger.info(f"need {format_bytes(check.required)}, {format_bytes(check.free)} free")
+    if args.dry_run:
+        return 0
+    if not check.enough and not args.ignore_space:
+        logger.error(
+            f"not enough space in {core.mods_path}: "
+            f"need {format_bytes(check.required)}, {format_bytes(check.free)} free "
+            "(--ignore-space to install anyway)"
+        )
+        return 1
+    done = core.install(
+        jobs,
+        args.jobs,
+        args.workers,
+        args.link,
+        None if args.quiet else _print_queue_progress(),
+    )
+    for profile in args.enable_in:
+        added = enable_in_profile(profile, [job.name for job in done])
+        logger.info(f"enabled {added} mods in {profile}")
+    failed = [job for job in jobs if job.error is not None]
+    for job in failed:
+        print(f"失败 {job.name}: {job.error}", file=sys.stderr)
+    print(f"已安装 {len(done)} 个模组，{len(failed)} 个失败", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_update(args: argparse.Namespace) -> int:
+    if not args.ids and not args.outdated:
+        logger.error("give --ids or --outdated")
+        return 2
+    core = _core(args)
+    records = [
+        record
+        for record in _select(_scan(args, core), args)
+        if record.installed
+        and record.is_workshop
+        and (record.outdated or not args.outdated)
+    ]
+    failed = 0
+    for record in records:
+        print(f"{record.published_file_id} -> {record.mo2_name}")
+        if args.dry_run:
+            continue
+        try:
+            progress = core.update_mod(record, args.workers, args.link)
+        except (CopyCancelled, OSError, ValueError) as e:
+            failed += 1
+            print(f"失败 {record.mo2_name}: {e}", file=sys.stderr)
+            continue
+        logger.info(
+            f"{record.mo2_name}: {progress.files_done} files, "
+            f"{format_bytes(progress.bytes_done)}"
+        )
+    print(f"已更新 {len(records) - failed} 个模组，{failed} 个失败", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _print_phase_progress():
+    last = 0.0
+
+    def on_progress(phase: str, done: int, total: int):
+        nonlocal last
+        now = time.perf_counter()
+        if now - last < PROGRESS_INTERVAL and done < total:
+            return
+        last = now
+        print(f"{phase}: {done}/{total}", file=sys.stderr)
+
+    return on_progress
+
+
+def _backup_root(args: argparse.Namespace) -> Path:
+    return args.out if args.out is not None else args.data / "backups"
+
+
+def cmd_backup(args: argparse.Namespace) -> int:
+    core = _core(args)
+    install_index = core.install_index
+    install_index.refresh()
+    install_index.save()
+    mod_names = install_index.managed_mods()
+    if not mod_names:
+        logger.error("no mods copied by this plugin")
+        return 1
+    backup_root = _backup_root(args)
+    snapshots = list_snapshots(backup_root)
+    base = None if args.full or not snapshots else snapshots[-1]
+    if base is not None:
+        logger.info(f"incremental backup on top of {base.name}")
+    writer = BackupWriter(args.mods, mod_names, backup_root, base, args.workers)
+    snapshot = writer.run(None if args.quiet else _print_phase_progress())
+    print(
+        f"已备份 {len(snapshot.mods)} 个模组的 {snapshot.files} 个文件 "
+        f"({format_bytes(snapshot.bytes)})，本次压缩了 {snapshot.stored_files} 个 "
+        f"({format_bytes(snapshot.stored_bytes)})：{snapshot.path}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def cmd_restore(args: argparse.Namespace) -> int:
+    backup_root = _backup_root(args)
+    snapshots = list_snapshots(backup_root)
+    if args.snapshot is not None:
+        snapshots = [s for s in snapshots if s.name == args.snapshot]
+    if not snapshots:
+        logger.error(f"no snapshot in {backup_root}")
+        return 1
+    snapshot = snapshots[-1]
+    mod_names = args.only or None
+    if mod_names is not None:
+        missing = set(mod_names) - snapshot.mods.keys()
+        if missing:
+            logger.error(f"not in {snapshot.name}: {', '.join(sorted(missing))}")
+            return 2
+    core = _core(args)
+    restorer = BackupRestorer(snapshot, backup_root, args.mods, mod_names, args.workers)
+    restored = restorer.run(None if args.quiet else _print_phase_progress())
+    for name in restored:
+        core.index_installed_mod(name)
+    for name, error in restorer.errors.items():
+        print(f"失败 {name}: {error}", file=sys.stderr)
+    print(
+        f"已从 {snapshot.name} 恢复 {len(restored)} 个模组，"
+        f"{len(restorer.errors)} 个失败",
+        file=sys.stderr,
+    )
+    return 1 if restorer.errors else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--mods", type=Path, required=True, help="MO2 的模组文件夹")
+    common.add_argument("--steam", type=Path, help="Steam 安装目录，默认从注册表查找")
+    common.add_argument("--data", type=Path, default=DEFAULT_DATA_PATH)
+    common.add_argument(
+        "--scan-workers",
+        type=int,
+        default=DEFAULT_SCAN_WORKERS,
+        help="同时读取 project.xml 的线程数",
+    )
+    common.add_argument("--processes", action="store_true", help="用多进程解析")
+    common.add_argument("-v", "--verbose", action="store_true")
+    common.add_argument("-q", "--quiet", action="store_true")
+
+    copy = argparse.ArgumentParser(add_help=False)
+    copy.add_argument("--ids", nargs="*", default=[], help="PublishedFileId")
+    copy.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="每个模组同时复制的文件数",
+    )
+    copy.add_argument("--link", action="store_true", help="优先用 reflink 或硬链接")
+    copy.add_argument("--dry-run", action="store_true")
+
+    parser = argparse.ArgumentParser(
+        prog="dd-mod-copy", description="Darkest Dungeon 创意工坊模组复制"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan = commands.add_parser("scan", parents=[common], help="列出创意工坊模组")
+    scan.add_argument("--json", type=Path, help="导出 JSON，- 表示标准输出")
+    scan.add_argument("--sizes", action="store_true", help="同时统计每个模组的大小")
+    scan.set_defaults(func=cmd_scan)
+
+    install = commands.add_parser(
+        "install", parents=[common, copy], help="批量安装还没复制的模组"
+    )
+    install.add_argument("--all", action="store_true", help="所有没复制过的模组")
+    install.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_INSTALL_JOBS,
+        help="同时安装的模组数",
+    )
+    install.add_argument(
+        "--enable-in",
+        type=Path,
+        action="append",
+        default=[],
+        metavar="PROFILE",
+        help="在这个 MO2 配置文件夹的 modlist.txt 里启用安装的模组，可以给多次",
+    )
+    install.add_argument(
+        "--ignore-space", action="store_true", help="剩余空间不足时也安装"
+    )
+    install.set_defaults(func=cmd_install)
+
+    update = commands.add_parser(
+        "update", parents=[common, copy], help="增量更新已经复制过的模组"
+    )
+    update.add_argument("--outdated", action="store_true", help="所有过期的模组")
+    update.set_defaults(func=cmd_update)
+
+    backup_common = argparse.ArgumentParser(add_help=False)
+    backup_common.add_argument(
+        "--out", type=Path, help="备份文件夹，默认是数据目录下的 backups"
+    )
+    backup_common.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help="同时压缩或解压的线程数"
+    )
+
+    backup = commands.add_parser(
+        "backup", parents=[common, backup_common], help="压缩备份由本插件复制的模组"
+    )
+    backup.add_argument(
+        "--full", action="store_true", help="不和上一个快照比较，完整备份"
+    )
+    backup.set_defaults(func=cmd_backup)
+
+    restore = commands.add_parser(
+        "restore", parents=[common, backup_common], help="从快照恢复模组"
+    )
+    restore.add_argument("--snapshot", help="快照名，默认是最新的")
+    restore.add_argument("--only", nargs="*", default=[], help="只恢复这些模组")
+    restore.set_defaults(func=cmd_restore)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    level = logging.INFO
+    if args.verbose:
+        level = logging.DEBUG
+    elif args.quiet:
+        level = logging.WARNING
+    logging.basicConfig(level=level, format="%(levelname)s %(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+由本插件管理的 MO2 模组之间的文件冲突索引。
+
+每个模组只用 os.scandir 遍历一遍，得到 相对路径 -> 模组 的映射，查询
+“还有谁带了这个文件”是一次字典查找。安装或更新模组后只重新遍历这一个模组。
+路径统一用 / 分隔并 casefold，和 Windows 上游戏读取文件的方式一致。
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .copy_engine import DEFAULT_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# MO2 和本插件自己在模组根目录下的文件，不参与冲突，增量更新时也不会删除或覆盖
+IGNORED_ROOT_ENTRIES = frozenset(("meta.ini", "project_file", "preview_file"))
+
+
+def normalize_path(rel_path: str) -> str:
+    return rel_path.replace("\\", "/").strip().strip("/").casefold()
+
+
+def _scan_mod(mod_folder: Path) -> list[str]:
+    """
+    返回模组里所有文件的规范化相对路径。
+    """
+    paths: list[str] = []
+    stack = [("", str(mod_folder))]
+    while stack:
+        rel, folder = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if not rel and entry.name.casefold() in IGNORED_ROOT_ENTRIES:
+                continue
+            rel_path = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((rel_path, entry.path))
+                    continue
+            except OSError:
+                continue
+            # 同一个相对路径在所有模组里只保存一份字符串
+            paths.append(sys.intern(rel_path.casefold()))
+    return paths
+
+
+class ConflictIndex:
+    def __init__(self, mods_path: Path):
+        self.mods_path = mods_path
+        self._mod_files: dict[str, list[str]] = {}
+        # 大部分文件只属于一个模组，直接存模组名，只有冲突的文件才用列表
+        self._owners: dict[str, str | list[str]] = {}
+        self._lock = threading.Lock()
+
+    def build(
+        self,
+        mod_names: Iterable[str],
+        workers: int = DEFAULT_WORKERS,
+        on_progress: Callable[[str, int, int], None] | None = None,
+    ):
+        """
+        并发遍历所有模组，重建整个索引。
+        """
+        mod_names = list(mod_names)
+        scanned: list[list[str]] = []
+        with ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="dd-conflict"
+        ) as pool:
+            for paths in pool.map(
+                lambda name: _scan_mod(self.mods_path / name), mod_names
+            ):
+                scanned.append(paths)
+                if on_progress is not None:
+                    on_progress("扫描模组", len(scanned), len(mod_names))
+        with self._lock:
+            self._mod_files = {}
+            self._owners = {}
+            for name, paths in zip(mod_names, scanned, strict=True):
+                self._add(name, paths)
+        logger.debug(
+            f"conflict index: {len(mod_names)} mods, {len(self._owners)} paths"
+        )
+
+    def _add(self, name: str, paths: list[str]):
+        self._mod_files[name] = paths
+        owners = self._owners
+        for path in paths:
+            current = owners.get(path)
+            if current is None:
+                owners[path] = name
+            elif isinstance(current, str):
+                if current != name:
+                    owners[path] = [current, name]
+            elif name not in current:
+                current.append(name)
+
+    def _remove(self, name: str):
+        owners = self._owners
+        for path in self._mod_files.pop(name, ()):
+            current = owners.get(path)
+            if current is None:
+                continue
+            if isinstance(current, str):
+                if current == name:
+                    del owners[path]
+                continue
+            if name in current:
+                current.remove(name)
+            if len(current) == 1:
+                owners[path] = current[0]
+
+    def update_mod(self, name: str):
+        """
+        安装、更新或删除一个模组后只重新遍历它。
+        """
+        mod_folder = self.mods_path / name
+        paths = _scan_mod(mod_folder) if mod_folder.is_dir() else None
+        with self._lock:
+            self._remove(name)
+            if paths is not None:
+                self._add(name, paths)
+
+    def remove_mod(self, name: str):
+        with self._lock:
+            self._remove(name)
+
+    @property
+    def mods(self) -> list[str]:
+        with self._lock:
+            return sorted(self._mod_files)
+
+    @property
+    def file_count(self) -> int:
+        return len(self._owners)
+
+    def owners(self, rel_path: str) -> list[str]:
+        """
+        带有这个文件的所有模组。
+        """
+        with self._lock:
+            current = self._owners.get(normalize_path(rel_path))
+            if current is None:
+                return []
+            if isinstance(current, str):
+                return [current]
+            return list(current)
+
+    def conflicts_of(self, name: str) -> list[tuple[str, list[str]]]:
+        """
+        ``name`` 和其他模组冲突的文件，以及带有同一个文件的其他模组。
+        """
+        with self._lock:
+            result: list[tuple[str, list[str]]] = []
+            for path in self._mod_files.get(name, ()):
+                current = self._owners.get(path)
+                if isinstance(current, list):
+                    result.append((path, [other for other in current if other != name]))
+            return sorted(result)
+
+    def conflict_counts(self) -> dict[str, int]:
+        """
+        每个模组有多少文件和其他模组冲突。
+        """
+        with self._lock:
+            counts = dict.fromkeys(self._mod_files, 0)
+            for current in self._owners.values():
+                if isinstance(current, list):
+                    for name in current:
+                        counts[name] += 1
+            return counts
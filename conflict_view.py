@@ -0,0 +1,127 @@
+"""
+文件冲突窗口：左边是有冲突的模组，右边是选中模组和其他模组重复的文件。
+"""
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtWidgets import (
+    QDialog,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QSplitter,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .conflict_index import ConflictIndex
+
+CONFLICT_HEADERS = ["文件", "其他模组"]
+
+
+class ConflictTableModel(QAbstractTableModel):
+    def __init__(self):
+        super().__init__()
+        self._rows: list[tuple[str, list[str]]] = []
+
+    def set_rows(self, rows: list[tuple[str, list[str]]]):
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        path, others = self._rows[index.row()]
+        return path if index.column() == 0 else ", ".join(others)
+
+    def rowCount(self, parent: QModelIndex) -> int:  # type: ignore
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent: QModelIndex) -> int:  # type: ignore
+        return len(CONFLICT_HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = 0):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return CONFLICT_HEADERS[section]
+
+
+class ConflictDialog(QDialog):
+    def __init__(
+        self,
+        index: ConflictIndex,
+        counts: dict[str, int],
+        parent: QWidget | None = None,
+    ):
+        super().__init__(parent)
+        self._index = index
+        self.setWindowTitle("文件冲突")
+        self.resize(1200, 700)
+
+        self.search = QLineEdit()
+        self.search.setPlaceholderText(
+            "输入文件路径查询哪些模组带了它，例如 heroes/crusader/crusader.info.darkest"
+        )
+        self.search.textChanged.connect(self._on_search)
+        self.search_result = QLabel()
+
+        self.mod_list = QListWidget()
+        # 冲突最多的模组排在前面
+        for name, count in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
+            if count:
+                item = QListWidgetItem(f"{name} ({count})")
+                item.setData(Qt.ItemDataRole.UserRole, name)
+                self.mod_list.addItem(item)
+        self.mod_list.currentItemChanged.connect(self._on_mod_changed)
+
+        self.model = ConflictTableModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setShowGrid(False)
+        if header := self.table.horizontalHeader():
+            header.setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
+            header.setStretchLastSection(True)
+        self.table.setColumnWidth(0, 500)
+        if vertical_header := self.table.verticalHeader():
+            vertical_header.setVisible(False)
+
+        splitter = QSplitter()
+        splitter.addWidget(self.mod_list)
+        splitter.addWidget(self.table)
+        splitter.setSizes([350, 850])
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.search)
+        layout.addWidget(self.search_result)
+        layout.addWidget(splitter, 1)
+        conflicted = self.mod_list.count()
+        layout.addWidget(
+            QLabel(
+                f"{len(counts)} 个模组，{index.file_count} 个文件，"
+                f"{conflicted} 个模组有冲突"
+            )
+        )
+
+    def _on_search(self, text: str):
+        if not text.strip():
+            self.search_result.clear()
+            return
+        owners = self._index.owners(text)
+        self.search_result.setText(
+            ", ".join(owners) if owners else "没有模组带这个文件"
+        )
+
+    def _on_mod_changed(self, current: QListWidgetItem | None, _previous: object):
+        if current is None:
+            self.model.set_rows([])
+            return
+        self.model.set_rows(
+            self._index.conflicts_of(current.data(Qt.ItemDataRole.UserRole))
+        )
@@ -0,0 +1,461 @@
+"""
+并发复制引擎。
+
+不依赖 Qt，命令行（cli.py）和基准测试直接使用；插件里通过 QThread
+包一层，把进度以信号的形式发回 QProgressDialog。
+"""
+
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from . import diagnostics
+from .defaults import DEFAULT_WORKERS
+
+CHUNK_SIZE = 1024 * 1024
+# 进度回调的最小间隔（秒），避免每个块都刷新界面
+PROGRESS_INTERVAL = 0.05
+# 安装后会被重命名、删除或改写的文件，链接模式下也必须真实复制，免得动到创意工坊原文件
+REAL_COPY_FILES = (
+    "project.xml",
+    "preview_icon.png",
+    "modfiles.txt",
+    "steam_workshop_uploader.log",
+)
+# 这些错误说明文件系统不支持，之后的文件不用再试
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.ENOSYS,
+    errno.EMLINK,
+}
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+class CopyItem:
+    __slots__ = ("dest", "link", "size", "source")
+
+    def __init__(self, source: Path, dest: Path, size: int, link: bool = True):
+        self.source = source
+        self.dest = dest
+        self.size = size
+        # 为 False 时即使开启了链接模式也要真实复制
+        self.link = link
+
+    def __repr__(self):
+        return f"CopyItem({self.source} -> {self.dest}, {self.size})"
+
+
+class CopyPlan:
+    """
+    一次复制要做的事情：要创建的文件夹和要复制的文件。
+    """
+
+    def __init__(self, source: Path, dest: Path):
+        self.source = source
+        self.dest = dest
+        self.folders: list[Path] = []
+        self.files: list[CopyItem] = []
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(item.size for item in self.files)
+
+    @staticmethod
+    def must_copy(rel_path: str | Path) -> bool:
+        rel_path = Path(rel_path)
+        if len(rel_path.parts) != 1:
+            return False
+        return rel_path.name in REAL_COPY_FILES or rel_path.suffix == ".manifest"
+
+    def add_file(self, rel_path: str | Path, size: int):
+        self.files.append(
+            CopyItem(
+                self.source / rel_path,
+                self.dest / rel_path,
+                size,
+                not self.must_copy(rel_path),
+            )
+        )
+
+    @classmethod
+    def from_walk(cls, walk: "TreeWalk", dest: Path) -> "CopyPlan":
+        """
+        用已经遍历好的文件夹生成计划，不再访问源文件夹。
+        """
+        plan = cls(walk.root, dest)
+        plan.folders = [dest / rel_path for rel_path in walk.folders]
+        for rel_path, size in walk.files:
+            plan.add_file(rel_path, size)
+        return plan
+
+    @classmethod
+    def from_tree(cls, source: Path, dest: Path) -> "CopyPlan":
+        return cls.from_walk(walk_tree(source), dest)
+
+
+class TreeWalk:
+    """
+    一次 os.scandir 遍历的结果：子文件夹、文件和大小，以及每个文件夹的 mtime。
+    相对路径统一用 / 分隔。
+    """
+
+    __slots__ = ("dir_mtimes", "files", "folders", "root", "total_bytes")
+
+    def __init__(self, root: Path):
+        self.root = root
+        # 先父后子，按这个顺序创建文件夹
+        self.folders: list[str] = []
+        self.files: list[tuple[str, int]] = []
+        # 相对路径 -> mtime_ns，"" 是 root 本身；文件增删或改名都会改变所在文件夹的 mtime
+        self.dir_mtimes: dict[str, int] = {}
+        self.total_bytes = 0
+
+    @property
+    def file_count(self) -> int:
+        return len(self.files)
+
+    def __repr__(self):
+        return f"TreeWalk({self.root}, {len(self.files)} files, {format_bytes(self.total_bytes)})"
+
+
+def walk_tree(root: Path) -> TreeWalk:
+    """
+    遍历 ``root``，每个条目只 stat 一次（Windows 上 scandir 已经带了大小和 mtime）。
+    和 os.walk 一样不进入指向文件夹的符号链接。
+    """
+    walk = TreeWalk(root)
+    walk.dir_mtimes[""] = os.stat(root).st_mtime_ns
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        with os.scandir(root / rel if rel else root) as entries:
+            for entry in entries:
+                rel_path = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_dir():
+                    walk.folders.append(rel_path)
+                    if not entry.is_symlink():
+                        walk.dir_mtimes[rel_path] = entry.stat().st_mtime_ns
+                        stack.append(rel_path)
+                else:
+                    size = entry.stat().st_size
+                    walk.files.append((rel_path, size))
+                    walk.total_bytes += size
+    return walk
+
+
+class CopyProgress:
+    __slots__ = (
+        "bytes_done",
+        "bytes_total",
+        "current_file",
+        "elapsed",
+        "files_done",
+        "files_total",
+    )
+
+    def __init__(self, bytes_total: int, files_total: int):
+        self.bytes_done = 0
+        self.bytes_total = bytes_total
+        self.files_done = 0
+        self.files_total = files_total
+        self.elapsed = 0.0
+        self.current_file = ""
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_done / self.elapsed
+
+    @property
+    def permille(self) -> int:
+        # QProgressDialog 只接受 int，字节数超过 2G 会溢出，所以用千分比
+        if self.bytes_total <= 0:
+            return 1000 if self.files_done >= self.files_total else 0
+        return int(self.bytes_done * 1000 / self.bytes_total)
+
+    def copy(self) -> "CopyProgress":
+        other = CopyProgress(self.bytes_total, self.files_total)
+        other.bytes_done = self.bytes_done
+        other.files_done = self.files_done
+        other.elapsed = self.elapsed
+        other.current_file = self.current_file
+        return other
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+if sys.platform == "win32":
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    _FSCTL_DUPLICATE_EXTENTS_TO_FILE = 0x00098344
+    # 单次克隆的字节数上限要小于 4G，取一个按簇对齐的值
+    _CLONE_CHUNK = 1 << 30
+
+    class _DuplicateExtentsData(ctypes.Structure):
+        _fields_ = [
+            ("FileHandle", wintypes.HANDLE),
+            ("SourceFileOffset", ctypes.c_longlong),
+            ("TargetFileOffset", ctypes.c_longlong),
+            ("ByteCount", ctypes.c_longlong),
+        ]
+
+    def _cluster_size(path: Path) -> int:
+        sectors = wintypes.DWORD()
+        bytes_per_sector = wintypes.DWORD()
+        free = wintypes.DWORD()
+        total = wintypes.DWORD()
+        if not ctypes.windll.kernel32.GetDiskFreeSpaceW(
+            path.anchor,
+            ctypes.byref(sectors),
+            ctypes.byref(bytes_per_sector),
+            ctypes.byref(free),
+            ctypes.byref(total),
+        ):
+            raise ctypes.WinError()
+        return sectors.value * bytes_per_sector.value
+
+    def reflink(source: Path, dest: Path):
+        """
+        ReFS / Dev Drive 上的块克隆，其他文件系统会抛出 OSError。
+        """
+        if source.absolute().drive.lower() != dest.absolute().drive.lower():
+            raise OSError(errno.EXDEV, "different volumes", str(dest))
+        cluster = _cluster_size(dest.absolute())
+        size = source.stat().st_size
+        with open(source, "rb") as fsrc, open(dest, "wb") as fdst:
+            fdst.truncate(size)
+            fdst.flush()
+            data = _DuplicateExtentsData()
+            data.FileHandle = msvcrt.get_osfhandle(fsrc.fileno())
+            returned = wintypes.DWORD()
+            offset = 0
+            # 最后一段要按簇向上取整
+            end = (size + cluster - 1) // cluster * cluster
+            while offset < end:
+                data.SourceFileOffset = offset
+                data.TargetFileOffset = offset
+                data.ByteCount = min(_CLONE_CHUNK, end - offset)
+                if not ctypes.windll.kernel32.DeviceIoControl(
+                    wintypes.HANDLE(msvcrt.get_osfhandle(fdst.fileno())),
+                    _FSCTL_DUPLICATE_EXTENTS_TO_FILE,
+                    ctypes.byref(data),
+                    ctypes.sizeof(data),
+                    None,
+                    0,
+                    ctypes.byref(returned),
+                    None,
+                ):
+                    raise OSError(errno.EOPNOTSUPP, ctypes.FormatError(), str(dest))
+                offset += data.ByteCount
+        shutil.copystat(source, dest)
+
+else:
+    import fcntl
+
+    _FICLONE = 0x40049409
+
+    def reflink(source: Path, dest: Path):
+        """
+        btrfs / xfs 等文件系统上的写时复制克隆，不支持时抛出 OSError。
+        """
+        with open(source, "rb") as fsrc, open(dest, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(source, dest)
+
+
+class CopyEngine:
+    """
+    用有上限的线程池同时复制多个文件，按块复制以便及时响应取消。
+
+    进度回调会在工作线程里被调用，调用方需要自己处理线程安全
+    （Qt 里用信号即可）。
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        chunk_size: int = CHUNK_SIZE,
+        use_links: bool = False,
+    ):
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        # 链接模式：每个文件依次尝试 reflink、硬链接，都不行再复制
+        self.use_links = use_links
+        self._reflink_ok = use_links
+        self._hardlink_ok = use_links
+        self.linked_files = 0
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = CopyProgress(0, 0)
+        self._start = 0.0
+        self._last_report = 0.0
+        self._on_progress: Callable[[CopyProgress], None] | None = None
+        self._on_file: Callable[[CopyItem], None] | None = None
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(
+        self,
+        plan: CopyPlan,
+        on_progress: Callable[[CopyProgress], None] | None = None,
+        on_file: Callable[[CopyItem], None] | None = None,
+    ) -> CopyProgress:
+        """
+        执行复制计划，每个文件完整写好后在工作线程里调用 ``on_file``。
+
+        Raises:
+            CopyCancelled: 复制被取消，已经复制的文件会保留，写了一半的文件会被删除。
+        """
+        with diagnostics.span("copy.run", len(plan.files), plan.total_bytes):
+            return self._run(plan, on_progress, on_file)
+
+    def _run(
+        self,
+        plan: CopyPlan,
+        on_progress: Callable[[CopyProgress], None] | None,
+        on_file: Callable[[CopyItem], None] | None,
+    ) -> CopyProgress:
+        self._on_progress = on_progress
+        self._on_file = on_file
+        self._progress = CopyProgress(plan.total_bytes, len(plan.files))
+        self._start = time.perf_counter()
+        self._last_report = 0.0
+
+        plan.dest.mkdir(exist_ok=True, parents=True)
+        for folder in plan.folders:
+            folder.mkdir(exist_ok=True, parents=True)
+
+        # 大文件先复制，避免最后只剩一个大文件在单线程里跑
+        items = sorted(plan.files, key=lambda item: item.size, reverse=True)
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dd-copy"
+        ) as executor:
+            futures: list[Future[None]] = [
+                executor.submit(self._copy_item, item) for item in items
+            ]
+            done, _pending = wait(futures, return_when=FIRST_EXCEPTION)
+            if any(f.exception() is not None for f in done):
+                # 出错或者取消后通知其他线程尽快停下
+                self._cancel_event.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+                for future in futures:
+                    if future.done() and not future.cancelled():
+                        exc = future.exception()
+                        if exc is not None and not isinstance(exc, CopyCancelled):
+                            raise exc
+                raise CopyCancelled()
+
+        self._progress.elapsed = time.perf_counter() - self._start
+        self._report(force=True)
+        return self._progress.copy()
+
+    def _copy_item(self, item: CopyItem):
+        with diagnostics.span("copy.file", 1, item.size):
+            self._copy_file(item)
+
+    def _copy_file(self, item: CopyItem):
+        if self._cancel_event.is_set():
+            raise CopyCancelled()
+        with self._lock:
+            self._progress.current_file = str(item.source)
+        try:
+            item.dest.parent.mkdir(exist_ok=True, parents=True)
+            # 目标可能是指向源文件的硬链接，先删掉再写，避免改到源文件
+            if item.dest.exists():
+                item.dest.unlink()
+            if item.link and self._link_item(item):
+                with self._lock:
+                    self._progress.bytes_done += item.size
+                    self._progress.files_done += 1
+                    self.linked_files += 1
+                if self._on_file is not None:
+                    self._on_file(item)
+                self._report()
+                return
+            with open(item.source, "rb") as fsrc, open(item.dest, "wb") as fdst:
+                while True:
+                    if self._cancel_event.is_set():
+                        raise CopyCancelled()
+                    chunk = fsrc.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    fdst.write(chunk)
+                    self._add_bytes(len(chunk))
+            shutil.copystat(item.source, item.dest)
+        except BaseException:
+            self._remove_partial(item.dest)
+            raise
+        with self._lock:
+            self._progress.files_done += 1
+        if self._on_file is not None:
+            self._on_file(item)
+        self._report()
+
+    def _link_item(self, item: CopyItem) -> bool:
+        if self._reflink_ok:
+            try:
+                reflink(item.source, item.dest)
+                return True
+            except OSError as e:
+                self._remove_partial(item.dest)
+                if e.errno in _UNSUPPORTED_ERRNOS or e.errno is None:
+                    self._reflink_ok = False
+        if self._hardlink_ok:
+            try:
+                os.link(item.source, item.dest)
+                return True
+            except OSError as e:
+                if e.errno in _UNSUPPORTED_ERRNOS or e.errno is None:
+                    self._hardlink_ok = False
+        return False
+
+    @staticmethod
+    def _remove_partial(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _add_bytes(self, size: int):
+        with self._lock:
+            self._progress.bytes_done += size
+        self._report()
+
+    def _report(self, force: bool = False):
+        if self._on_progress is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self._last_report < PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self._on_progress(snapshot)
@@ -0,0 +1,505 @@
+"""
+找出 MO2 里各个模组之间内容相同的文件，可选地用硬链接合并。
+
+先按大小分组，再比较文件头尾的部分哈希，最后才计算完整哈希，大部分文件
+只需要 stat。哈希在线程池里并发计算，并按 (路径, 大小, mtime) 存进 SQLite，
+第一次扫描中途取消也不会白做，下一次从缓存里接着算。
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .copy_engine import DEFAULT_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# 表结构或哈希的算法变了就加一，旧缓存会被直接丢弃
+SCHEMA_VERSION = 2
+# 部分哈希读取文件开头和结尾各这么多字节，不超过两倍的文件整个读取
+PARTIAL_SIZE = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+# 缓存每攒够这么多条或者过了这么久就写一次盘
+FLUSH_ROWS = 500
+FLUSH_INTERVAL = 5.0
+PHASE_SCAN = "扫描文件"
+PHASE_PARTIAL = "部分哈希"
+PHASE_FULL = "完整哈希"
+PHASE_LINK = "创建硬链接"
+
+
+class DedupCancelled(Exception):
+    pass
+
+
+class FileInfo:
+    __slots__ = ("inode", "mtime_ns", "path", "size")
+
+    def __init__(self, path: str, size: int, mtime_ns: int, inode: tuple[int, int]):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # (设备号, inode)，已经是硬链接的文件只算一份
+        self.inode = inode
+
+    def __repr__(self):
+        return f"FileInfo({self.path}, {self.size})"
+
+
+class DuplicateGroup:
+    """
+    内容相同的一组文件，``copies`` 里每一项是同一个 inode 的所有路径。
+    """
+
+    __slots__ = ("copies", "digest", "size")
+
+    def __init__(self, size: int, digest: bytes, copies: list[list[FileInfo]]):
+        self.size = size
+        self.digest = digest
+        self.copies = copies
+
+    @property
+    def wasted_bytes(self) -> int:
+        return self.size * (len(self.copies) - 1)
+
+
+class DedupReport:
+    __slots__ = ("bytes", "files", "groups", "mods")
+
+    def __init__(self, mods: int, files: int, total_bytes: int):
+        self.mods = mods
+        self.files = files
+        self.bytes = total_bytes
+        self.groups: list[DuplicateGroup] = []
+
+    @property
+    def wasted_bytes(self) -> int:
+        return sum(group.wasted_bytes for group in self.groups)
+
+    @property
+    def duplicate_files(self) -> int:
+        return sum(len(group.copies) - 1 for group in self.groups)
+
+
+class HashStore:
+    """
+    文件哈希的持久化缓存，和 ModXmlCache 一样启动时整个读进内存。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._entries: dict[str, tuple[int, int, bytes | None, bytes | None]] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.perf_counter()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS file_hash")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_hash (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                partial BLOB,
+                full BLOB
+            )
+            """
+        )
+        return conn
+
+    def _load(self):
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT path, size, mtime_ns, partial, full FROM file_hash"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception(f"failed to load hash store {self.db_path}")
+            return
+        for path, size, mtime_ns, partial, full in rows:
+            self._entries[path] = (size, mtime_ns, partial, full)
+
+    def get(self, info: FileInfo, full: bool) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(info.path)
+            if (
+                entry is not None
+                and entry[0] == info.size
+                and entry[1] == info.mtime_ns
+                and (digest := entry[3 if full else 2]) is not None
+            ):
+                self.hits += 1
+                return digest
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        info: FileInfo,
+        partial: bytes | None = None,
+        full: bytes | None = None,
+    ):
+        with self._lock:
+            entry = self._entries.get(info.path)
+            if entry is not None and entry[:2] == (info.size, info.mtime_ns):
+                partial = partial or entry[2]
+                full = full or entry[3]
+            self._entries[info.path] = (info.size, info.mtime_ns, partial, full)
+            self._dirty.add(info.path)
+
+    def flush(self, force: bool = False):
+        with self._lock:
+            now = time.perf_counter()
+            if not force and (
+                len(self._dirty) < FLUSH_ROWS
+                and now - self._last_flush < FLUSH_INTERVAL
+            ):
+                return
+            self._last_flush = now
+            rows = [
+                (path, *entry)
+                for path in self._dirty
+                if (entry := self._entries.get(path)) is not None
+            ]
+            self._dirty.clear()
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO file_hash VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception(f"failed to save hash store {self.db_path}")
+
+    def prune(self, paths: set[str]):
+        """
+        删除不在 ``paths`` 里的条目（已经删掉的文件）。
+        """
+        with self._lock:
+            stale = [path for path in self._entries if path not in paths]
+            for path in stale:
+                del self._entries[path]
+                self._dirty.discard(path)
+        if not stale:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "DELETE FROM file_hash WHERE path = ?",
+                        [(path,) for path in stale],
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception(f"failed to prune hash store {self.db_path}")
+
+
+def _walk(root: str) -> Iterator[FileInfo]:
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    # Windows 上 DirEntry.stat 里的 inode 是 0，等按大小筛过之后再补
+                    st = entry.stat()
+                    yield FileInfo(
+                        entry.path, st.st_size, st.st_mtime_ns, (st.st_dev, st.st_ino)
+                    )
+            except OSError:
+                continue
+
+
+def _fill_inode(info: FileInfo):
+    if info.inode[1] == 0:
+        try:
+            st = os.stat(info.path)
+            info.inode = (st.st_dev, st.st_ino)
+        except OSError:
+            # 拿不到 inode 时当成独立的文件
+            info.inode = (-1, id(info))
+
+
+def _group_size(copies_by_inode: dict[tuple[int, int], list[FileInfo]]) -> int:
+    return next(iter(copies_by_inode.values()))[0].size
+
+
+def partial_digest(path: str, size: int) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 2 * PARTIAL_SIZE:
+            # 小文件的部分哈希就是完整的哈希，之后不再算一遍
+            h.update(f.read())
+        else:
+            h.update(f.read(PARTIAL_SIZE))
+            f.seek(-PARTIAL_SIZE, os.SEEK_END)
+            h.update(f.read(PARTIAL_SIZE))
+    return h.digest()
+
+
+def full_digest(path: str) -> bytes:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.digest()
+
+
+class DedupAnalyzer:
+    def __init__(
+        self,
+        mod_folders: Iterable[Path],
+        store: HashStore | None = None,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        self.mod_folders = list(mod_folders)
+        self.store = store
+        self.workers = max(1, workers)
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(
+        self, on_progress: Callable[[str, int, int], None] | None = None
+    ) -> DedupReport:
+        """
+        分析重复文件，``on_progress(阶段, 已完成, 总数)`` 在工作线程里调用。
+
+        Raises:
+            DedupCancelled: 分析被取消，已经算好的哈希仍然会保存。
+        """
+
+        def report(phase: str, done: int, total: int):
+            if on_progress is not None:
+                on_progress(phase, done, total)
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dd-dedup"
+        ) as pool:
+            files: list[FileInfo] = []
+            for i, mod_files in enumerate(
+                pool.map(lambda folder: list(_walk(str(folder))), self.mod_folders)
+            ):
+                files.extend(mod_files)
+                report(PHASE_SCAN, i + 1, len(self.mod_folders))
+                self._check_cancelled()
+            result = DedupReport(
+                len(self.mod_folders), len(files), sum(f.size for f in files)
+            )
+
+            # 大小相同、inode 不同的文件才可能是重复的
+            by_size: dict[int, list[FileInfo]] = {}
+            for info in files:
+                if info.size > 0:
+                    by_size.setdefault(info.size, []).append(info)
+            same_size = [
+                info for infos in by_size.values() if len(infos) > 1 for info in infos
+            ]
+            for _ in pool.map(_fill_inode, same_size):
+                pass
+            candidates: list[dict[tuple[int, int], list[FileInfo]]] = []
+            for infos in by_size.values():
+                if len(infos) < 2:
+                    continue
+                by_inode: dict[tuple[int, int], list[FileInfo]] = {}
+                for info in infos:
+                    by_inode.setdefault(info.inode, []).append(info)
+                if len(by_inode) > 1:
+                    candidates.append(by_inode)
+
+            groups = self._group(
+                pool, candidates, PHASE_PARTIAL, full=False, report=report
+            )
+            # 部分哈希已经覆盖整个文件时不用再算完整哈希
+            finished = [(d, g) for d, g in groups if _group_size(g) <= 2 * PARTIAL_SIZE]
+            large = [g for _d, g in groups if _group_size(g) > 2 * PARTIAL_SIZE]
+            finished += self._group(pool, large, PHASE_FULL, full=True, report=report)
+        if self.store is not None:
+            self.store.flush(force=True)
+            self.store.prune({info.path for info in files})
+
+        for digest, copies_by_inode in finished:
+            copies = sorted(copies_by_inode.values(), key=lambda c: c[0].path)
+            result.groups.append(DuplicateGroup(copies[0][0].size, digest, copies))
+        result.groups.sort(key=lambda g: g.wasted_bytes, reverse=True)
+        logger.debug(
+            f"dedup: {result.files} files, {len(result.groups)} groups, "
+            f"{result.wasted_bytes} bytes wasted"
+        )
+        return result
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            if self.store is not None:
+                self.store.flush(force=True)
+            raise DedupCancelled()
+
+    def _hash(self, info: FileInfo, full: bool) -> bytes | None:
+        if self.cancelled:
+            return None
+        if self.store is not None:
+            digest = self.store.get(info, full)
+            if digest is not None:
+                return digest
+        try:
+            if full:
+                digest = full_digest(info.path)
+            else:
+                digest = partial_digest(info.path, info.size)
+        except OSError:
+            logger.debug(f"failed to hash {info.path}", exc_info=True)
+            return None
+        if self.store is not None:
+            if full:
+                self.store.put(info, full=digest)
+            else:
+                # 小文件的部分哈希就是完整内容的哈希
+                self.store.put(
+                    info,
+                    partial=digest,
+                    full=digest if info.size <= 2 * PARTIAL_SIZE else None,
+                )
+        return digest
+
+    def _group(
+        self,
+        pool: ThreadPoolExecutor,
+        candidates: list[dict[tuple[int, int], list[FileInfo]]],
+        phase: str,
+        full: bool,
+        report: Callable[[str, int, int], None],
+    ) -> list[tuple[bytes, dict[tuple[int, int], list[FileInfo]]]]:
+        """
+        把每组候选按哈希再细分，只保留还有两个以上 inode 的组。
+        """
+        # 每个 inode 只算一次哈希
+        jobs = [
+            (i, inode, copies[0])
+            for i, group in enumerate(candidates)
+            for inode, copies in group.items()
+        ]
+        by_digest: dict[tuple[int, bytes], dict[tuple[int, int], list[FileInfo]]] = {}
+        for done, ((i, inode, _info), digest) in enumerate(
+            zip(
+                jobs,
+                pool.map(lambda job: self._hash(job[2], full), jobs),
+                strict=True,
+            )
+        ):
+            if done % 100 == 0:
+                report(phase, done, len(jobs))
+                self._check_cancelled()
+                if self.store is not None:
+                    self.store.flush()
+            if digest is None:
+                continue
+            by_digest.setdefault((i, digest), {})[inode] = candidates[i][inode]
+        self._check_cancelled()
+        report(phase, len(jobs), len(jobs))
+        return [
+            (digest, group)
+            for (_i, digest), group in by_digest.items()
+            if len(group) > 1
+        ]
+
+
+def _changed_since_analysis(info: FileInfo) -> str | None:
+    """
+    文件在分析之后被修改或替换时返回原因，没变时返回 None。
+    """
+    try:
+        st = os.stat(info.path)
+    except OSError as e:
+        return str(e)
+    if (st.st_size, st.st_mtime_ns) != (info.size, info.mtime_ns):
+        return "分析之后被修改过"
+    # 拿不到 inode 的文件（设备号记为 -1）只能比较大小和 mtime
+    if info.inode[0] != -1 and (st.st_dev, st.st_ino) != info.inode:
+        return "分析之后被替换过"
+    return None
+
+
+def hardlink_duplicates(
+    groups: list[DuplicateGroup],
+    on_progress: Callable[[str, int, int], None] | None = None,
+) -> tuple[int, int, list[str]]:
+    """
+    每组保留第一份，其余的路径换成指向它的硬链接。
+
+    返回 (替换的文件数, 释放的字节数, 错误信息)。换之前会重新 stat，
+    分析之后被改过的文件不动，保留的那份被改过或替换过时整组都不动；
+    不在同一个分区的文件没法硬链接，会记为错误。
+    """
+    linked = 0
+    saved = 0
+    errors: list[str] = []
+    for done, group in enumerate(groups):
+        if on_progress is not None and done % 20 == 0:
+            on_progress(PHASE_LINK, done, len(groups))
+        keep = group.copies[0][0]
+        # 保留的那份变了的话，其他文件都会链接到新内容上，原来的内容就丢了
+        reason = _changed_since_analysis(keep)
+        if reason is not None:
+            errors.append(f"{keep.path}: {reason}，整组已跳过")
+            continue
+        for copies in group.copies[1:]:
+            replaced = 0
+            for info in copies:
+                try:
+                    reason = _changed_since_analysis(info)
+                    if reason is not None:
+                        errors.append(f"{info.path}: {reason}，已跳过")
+                        continue
+                    tmp_path = info.path + ".ddlink"
+                    os.link(keep.path, tmp_path)
+                    try:
+                        os.replace(tmp_path, info.path)
+                    except OSError:
+                        os.unlink(tmp_path)
+                        raise
+                    replaced += 1
+                except OSError as e:
+                    errors.append(f"{info.path}: {e}")
+            linked += replaced
+            # 同一个 inode 的所有路径都换掉了，这份内容才真正被释放
+            if replaced == len(copies):
+                saved += group.size
+    if on_progress is not None:
+        on_progress(PHASE_LINK, len(groups), len(groups))
+    return linked, saved, errors
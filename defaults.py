@@ -0,0 +1,17 @@
+"""
+插件设置的默认值。
+
+MO2 启动时会调用插件的 settings()，这里只放常量，不导入其他模块，
+实际用到这些值的模块从这里导入。
+"""
+
+import os
+
+# 复制一个模组时同时复制的文件数
+DEFAULT_WORKERS = min(8, os.cpu_count() or 4)
+# 批量安装时同时安装的模组数
+DEFAULT_INSTALL_JOBS = 4
+# 同时读取 project.xml 的线程数
+DEFAULT_SCAN_WORKERS = 16
+# 表格里预览图的边长（像素）
+DEFAULT_THUMBNAIL_SIZE = 48
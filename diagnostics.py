@@ -0,0 +1,191 @@
+"""
+热点路径的计时统计。
+
+默认关闭，关闭时 ``span`` 只返回同一个空对象，代价是一次全局变量读取和一次函数调用。
+打开后每个名字累计次数、处理的项目数、总耗时、按项目平均的 p50/p95 延迟和字节数，
+可以在诊断窗口里查看，或者导出成 JSON 附在问题报告里。
+"""
+
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 每个名字最多保留多少个延迟样本，超过后做蓄水池抽样
+MAX_SAMPLES = 4096
+
+
+class _Stat:
+    __slots__ = ("bytes", "count", "items", "max_ns", "samples", "seen", "total_ns")
+
+    def __init__(self):
+        self.count = 0
+        self.items = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.bytes = 0
+        # 每个项目的平均耗时（纳秒）
+        self.samples: list[float] = []
+        self.seen = 0
+
+    def add(self, duration_ns: int, items: int, nbytes: int, rnd: random.Random):
+        self.count += 1
+        self.items += items
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.bytes += nbytes
+        if items <= 0:
+            return
+        sample = duration_ns / items
+        self.seen += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(sample)
+        elif (i := rnd.randrange(self.seen)) < MAX_SAMPLES:
+            self.samples[i] = sample
+
+    def summary(self) -> dict[str, float | int]:
+        samples = sorted(self.samples)
+        total_s = self.total_ns / 1e9
+        return {
+            "count": self.count,
+            "items": self.items,
+            "total_ms": self.total_ns / 1e6,
+            "mean_ms": self.total_ns / 1e6 / self.count if self.count else 0.0,
+            "max_ms": self.max_ns / 1e6,
+            "p50_item_ms": _percentile(samples, 0.50) / 1e6,
+            "p95_item_ms": _percentile(samples, 0.95) / 1e6,
+            "bytes": self.bytes,
+            "bytes_per_second": self.bytes / total_s if total_s > 0 else 0.0,
+        }
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Recorder:
+    def __init__(self):
+        self._stats: dict[str, _Stat] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.started = time.time()
+
+    def add(self, name: str, duration_ns: int, items: int = 1, nbytes: int = 0):
+        with self._lock:
+            stat = self._stats.get(name)
+            if stat is None:
+                stat = self._stats[name] = _Stat()
+            stat.add(duration_ns, items, nbytes, self._random)
+
+    def snapshot(self) -> dict[str, dict[str, float | int]]:
+        with self._lock:
+            return {name: stat.summary() for name, stat in sorted(self._stats.items())}
+
+
+class _Span:
+    __slots__ = ("_bytes", "_items", "_name", "_recorder", "_start")
+
+    def __init__(self, recorder: Recorder, name: str, items: int, nbytes: int):
+        self._recorder = recorder
+        self._name = name
+        self._items = items
+        self._bytes = nbytes
+        self._start = 0
+
+    def set(self, items: int | None = None, nbytes: int | None = None):
+        """
+        在计时结束前补上处理的项目数或字节数。
+        """
+        if items is not None:
+            self._items = items
+        if nbytes is not None:
+            self._bytes = nbytes
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: object):
+        self._recorder.add(
+            self._name, time.perf_counter_ns() - self._start, self._items, self._bytes
+        )
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, items: int | None = None, nbytes: int | None = None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: object):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_recorder: Recorder | None = None
+
+
+def enable(on: bool = True):
+    """
+    打开或关闭统计；从关闭切换到打开时重新开始累计。
+    """
+    global _recorder
+    if not on:
+        _recorder = None
+    elif _recorder is None:
+        _recorder = Recorder()
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def reset():
+    global _recorder
+    if _recorder is not None:
+        _recorder = Recorder()
+
+
+def span(name: str, items: int = 1, nbytes: int = 0) -> _Span | _NullSpan:
+    """
+    ``with span("name") as s:`` 计时一段代码，``items`` 个项目共用这段时间。
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, items, nbytes)
+
+
+def record(name: str, seconds: float, items: int = 1, nbytes: int = 0):
+    """
+    记录一段没法用 with 包住的耗时，例如跨越多个信号的后台扫描。
+    """
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add(name, int(seconds * 1e9), items, nbytes)
+
+
+def report() -> dict[str, object]:
+    recorder = _recorder
+    return {
+        "enabled": recorder is not None,
+        "since": None
+        if recorder is None
+        else time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(recorder.started)),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "spans": {} if recorder is None else recorder.snapshot(),
+    }
+
+
+def dump(path: Path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,126 @@
+"""
+诊断窗口：列出每个计时点的统计，可以复制或保存成 JSON。
+"""
+
+import json
+from pathlib import Path
+
+from PyQt6.QtWidgets import (
+    QApplication,
+    QDialog,
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from . import diagnostics
+from .copy_engine import format_bytes
+
+# (表头, report 里的键, 格式)
+_COLUMNS = (
+    ("计时点", None, ""),
+    ("次数", "count", "{:d}"),
+    ("项目数", "items", "{:d}"),
+    ("总耗时 ms", "total_ms", "{:.1f}"),
+    ("平均 ms", "mean_ms", "{:.2f}"),
+    ("最长 ms", "max_ms", "{:.1f}"),
+    ("p50/项 ms", "p50_item_ms", "{:.3f}"),
+    ("p95/项 ms", "p95_item_ms", "{:.3f}"),
+    ("字节", "bytes", ""),
+    ("速度", "bytes_per_second", ""),
+)
+
+
+class _NumericItem(QTableWidgetItem):
+    # 按数值而不是显示的文字排序
+    def __init__(self, text: str, value: float):
+        super().__init__(text)
+        self._value = value
+
+    def __lt__(self, other: QTableWidgetItem) -> bool:
+        if isinstance(other, _NumericItem):
+            return self._value < other._value
+        return super().__lt__(other)
+
+
+class DiagnosticsDialog(QDialog):
+    def __init__(self, dump_path: Path, parent: QWidget | None = None):
+        super().__init__(parent)
+        self._dump_path = dump_path
+        self.setWindowTitle("诊断")
+        self.resize(1100, 500)
+
+        self.status = QLabel()
+        self.table = QTableWidget(0, len(_COLUMNS))
+        self.table.setHorizontalHeaderLabels([column[0] for column in _COLUMNS])
+        self.table.setColumnWidth(0, 260)
+        self.table.setSortingEnabled(True)
+        if vertical_header := self.table.verticalHeader():
+            vertical_header.setVisible(False)
+
+        buttons = QHBoxLayout()
+        for text, slot in (
+            ("刷新", self.reload),
+            ("清空", self._on_reset),
+            ("复制 JSON", self._on_copy),
+            ("保存 JSON...", self._on_save),
+        ):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch(1)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.status)
+        layout.addWidget(self.table, 1)
+        layout.addLayout(buttons)
+        self.reload()
+
+    def reload(self):
+        report = diagnostics.report()
+        spans: dict[str, dict[str, float]] = report["spans"]  # type: ignore
+        if not report["enabled"]:
+            self.status.setText("诊断没有开启，在插件设置里打开 diagnostics 后重新操作")
+        else:
+            self.status.setText(
+                f"从 {report['since']} 开始统计，共 {len(spans)} 个计时点"
+            )
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(spans))
+        for row, (name, stat) in enumerate(spans.items()):
+            for column, (_header, key, fmt) in enumerate(_COLUMNS):
+                if key is None:
+                    item = QTableWidgetItem(name)
+                else:
+                    value = stat[key]
+                    if key == "bytes":
+                        text = format_bytes(value) if value else ""
+                    elif key == "bytes_per_second":
+                        text = f"{format_bytes(value)}/s" if value else ""
+                    else:
+                        text = fmt.format(value)
+                    item = _NumericItem(text, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+    def _on_reset(self):
+        diagnostics.reset()
+        self.reload()
+
+    def _on_copy(self):
+        if clipboard := QApplication.clipboard():
+            clipboard.setText(
+                json.dumps(diagnostics.report(), ensure_ascii=False, indent=2)
+            )
+
+    def _on_save(self):
+        path, _filter = QFileDialog.getSaveFileName(
+            self, "保存诊断", str(self._dump_path), "JSON (*.json)"
+        )
+        if path:
+            diagnostics.dump(Path(path))
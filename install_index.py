@@ -0,0 +1,236 @@
+"""
+PublishedFileId -> MO2 模组名的持久化反向索引。
+
+原来每次打开窗口都要对 modsPath 做 ``*/project_file/w*.manifest`` 的 glob，
+每个模组至少列一次目录。索引保存在插件数据目录下，打开时只 stat
+modsPath 和每个模组的 project_file（没有 project_file 时 stat 模组文件夹），
+mtime 变了的模组才重新列目录。索引文件缺失、损坏或者属于别的 modsPath 时
+整个重建。
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 格式变了就加一，旧索引会被直接丢弃
+INDEX_VERSION = 1
+_MANIFEST_SUFFIX = ".manifest"
+
+
+class _ModEntry:
+    __slots__ = ("has_project_file", "local_ids", "mtime_ns", "workshop_ids")
+
+    def __init__(
+        self,
+        mtime_ns: int,
+        has_project_file: bool,
+        workshop_ids: list[str],
+        local_ids: list[str],
+    ):
+        # 有 project_file 时是它的 mtime，否则是模组文件夹的 mtime
+        self.mtime_ns = mtime_ns
+        self.has_project_file = has_project_file
+        self.workshop_ids = workshop_ids
+        self.local_ids = local_ids
+
+
+def _scan_mod(mod_folder: Path) -> _ModEntry | None:
+    project_file = mod_folder / "project_file"
+    try:
+        names = os.listdir(project_file)
+        mtime_ns = os.stat(project_file).st_mtime_ns
+        has_project_file = True
+    except OSError:
+        try:
+            mtime_ns = os.stat(mod_folder).st_mtime_ns
+        except OSError:
+            return None
+        names = []
+        has_project_file = False
+    workshop_ids: list[str] = []
+    local_ids: list[str] = []
+    for name in names:
+        lower = name.lower()
+        if not lower.endswith(_MANIFEST_SUFFIX):
+            continue
+        # 和原来的 glob 一样，Windows 上文件名不区分大小写
+        if lower.startswith("w"):
+            workshop_ids.append(name[1 : -len(_MANIFEST_SUFFIX)])
+        elif lower.startswith("l"):
+            local_ids.append(name[1 : -len(_MANIFEST_SUFFIX)])
+    return _ModEntry(mtime_ns, has_project_file, workshop_ids, local_ids)
+
+
+class InstallIndex:
+    def __init__(self, mods_path: Path, index_file: Path):
+        self.mods_path = mods_path
+        self.index_file = index_file
+        self._mods: dict[str, _ModEntry] = {}
+        self._mods_mtime_ns: int | None = None
+        self._workshop: dict[str, str] = {}
+        self._local: dict[str, str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, encoding="utf-8") as f:
+                raw = json.load(f)
+            if raw["version"] != INDEX_VERSION or raw["mods_path"] != str(
+                self.mods_path
+            ):
+                logger.debug(f"install index {self.index_file} is stale, rebuilding")
+                return
+            self._mods_mtime_ns = raw["mods_mtime_ns"]
+            self._mods = {
+                name: _ModEntry(mtime_ns, has_project_file, workshop_ids, local_ids)
+                for name, (
+                    mtime_ns,
+                    has_project_file,
+                    workshop_ids,
+                    local_ids,
+                ) in raw["mods"].items()
+            }
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.exception(f"failed to load install index {self.index_file}")
+            self._mods = {}
+            self._mods_mtime_ns = None
+            return
+        self._rebuild_maps()
+
+    def _rebuild_maps(self):
+        self._workshop = {}
+        self._local = {}
+        # 同一个模组被复制了多份时，和原来的 glob 一样按名字顺序后面的生效
+        for name in sorted(self._mods):
+            entry = self._mods[name]
+            for published_file_id in entry.workshop_ids:
+                self._workshop[published_file_id] = name
+            for local_id in entry.local_ids:
+                self._local[local_id] = name
+
+    def refresh(self) -> bool:
+        """
+        按 mtime 检查索引，只重新扫描有变化的模组，返回索引是否有变化。
+        """
+        with self._lock:
+            try:
+                mods_mtime_ns = os.stat(self.mods_path).st_mtime_ns
+            except OSError:
+                changed = bool(self._mods)
+                self._mods = {}
+                self._mods_mtime_ns = None
+            else:
+                changed = self._refresh(mods_mtime_ns)
+            if changed:
+                self._dirty = True
+                self._rebuild_maps()
+            return changed
+
+    def _refresh(self, mods_mtime_ns: int) -> bool:
+        changed = False
+        if mods_mtime_ns != self._mods_mtime_ns:
+            # 模组文件夹有增删或改名，重新列一次 modsPath
+            with os.scandir(self.mods_path) as it:
+                # . 开头的是安装或恢复时的临时文件夹，不是模组
+                names = {
+                    entry.name
+                    for entry in it
+                    if entry.is_dir() and not entry.name.startswith(".")
+                }
+            for name in set(self._mods) - names:
+                del self._mods[name]
+                changed = True
+            for name in names - set(self._mods):
+                if (entry := _scan_mod(self.mods_path / name)) is not None:
+                    self._mods[name] = entry
+                    changed = True
+            self._mods_mtime_ns = mods_mtime_ns
+            changed = True
+        for name, entry in list(self._mods.items()):
+            folder = self.mods_path / name
+            if entry.has_project_file:
+                folder = folder / "project_file"
+            try:
+                mtime_ns = os.stat(folder).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != entry.mtime_ns:
+                changed = self._rescan(name) or changed
+        return changed
+
+    def _rescan(self, name: str) -> bool:
+        entry = _scan_mod(self.mods_path / name)
+        if entry is None:
+            return self._mods.pop(name, None) is not None
+        self._mods[name] = entry
+        return True
+
+    def update_mod(self, name: str):
+        """
+        安装或更新模组之后立即更新这个模组的条目。
+        """
+        with self._lock:
+            if self._rescan(name):
+                self._dirty = True
+                self._rebuild_maps()
+
+    def workshop_mods(self) -> dict[str, str]:
+        """
+        PublishedFileId -> MO2 模组名。
+        """
+        with self._lock:
+            return dict(self._workshop)
+
+    def local_mods(self) -> dict[str, str]:
+        """
+        本地模组 l<id>.manifest 里的 id -> MO2 模组名。
+        """
+        with self._lock:
+            return dict(self._local)
+
+    def managed_mods(self) -> list[str]:
+        """
+        有 w<id> 或 l<id> 清单的模组，也就是由这个插件复制的模组。
+        """
+        with self._lock:
+            return sorted(
+                name
+                for name, entry in self._mods.items()
+                if entry.workshop_ids or entry.local_ids
+            )
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            raw = {
+                "version": INDEX_VERSION,
+                "mods_path": str(self.mods_path),
+                "mods_mtime_ns": self._mods_mtime_ns,
+                "mods": {
+                    name: [
+                        entry.mtime_ns,
+                        entry.has_project_file,
+                        entry.workshop_ids,
+                        entry.local_ids,
+                    ]
+                    for name, entry in self._mods.items()
+                },
+            }
+            try:
+                self.index_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.index_file.with_name(self.index_file.name + ".tmp")
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    json.dump(raw, f, ensure_ascii=False)
+                os.replace(tmp_file, self.index_file)
+                self._dirty = False
+            except OSError:
+                logger.exception(f"failed to save install index {self.index_file}")
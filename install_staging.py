@@ -0,0 +1,145 @@
+"""
+安装用的临时文件夹和日志。
+
+只依赖标准库里的轻量模块，插件初始化时清理临时文件夹不用导入复制和解析相关的模块。
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = ".installing"
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+# 超过这么久没有继续的安装，在插件初始化时清理掉
+STALE_STAGING_SECONDS = 7 * 24 * 3600
+
+
+def staging_path(dest: Path) -> Path:
+    return dest.with_name(f".{dest.name}{STAGING_SUFFIX}")
+
+
+def journal_path(staging: Path) -> Path:
+    return staging.with_name(staging.name + JOURNAL_SUFFIX)
+
+
+class InstallJournal:
+    """
+    一次安装已经复制完的文件。第一行记录来源，之后每行一个文件
+    （相对路径、大小、源文件 mtime），写完立即 flush，崩溃时最多丢掉最后一行。
+    """
+
+    def __init__(self, path: Path, source: Path):
+        self.path = path
+        self.source = source
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, tuple[int, int]]:
+        """
+        相对路径 -> (大小, mtime)；日志不存在、损坏或来源不同时返回空字典。
+        """
+        done: dict[str, tuple[int, int]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != JOURNAL_VERSION or header.get(
+                    "source"
+                ) != str(self.source):
+                    return {}
+                for line in f:
+                    try:
+                        rel_path, size, mtime_ns = json.loads(line)
+                    except ValueError:
+                        # 写到一半的最后一行
+                        break
+                    done[rel_path] = (size, mtime_ns)
+        except (OSError, ValueError, AttributeError):
+            return {}
+        return done
+
+    def open(self, done: dict[str, tuple[int, int]]):
+        """
+        重写日志，只保留 ``done`` 里仍然有效的条目，之后追加新完成的文件。
+        """
+        # 安装过程中一直打开，close() 时关闭
+        self._file = open(self.path, "w", encoding="utf-8")  # noqa: SIM115
+        self._file.write(
+            json.dumps(
+                {"version": JOURNAL_VERSION, "source": str(self.source)},
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+        for rel_path, (size, mtime_ns) in done.items():
+            self._file.write(
+                json.dumps([rel_path, size, mtime_ns], ensure_ascii=False) + "\n"
+            )
+        self._file.flush()
+
+    def append(self, rel_path: str, size: int, mtime_ns: int):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(
+                json.dumps([rel_path, size, mtime_ns], ensure_ascii=False) + "\n"
+            )
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def clean_staging(mods_path: Path, max_age: float = STALE_STAGING_SECONDS) -> int:
+    """
+    删除不能续装的临时文件夹：没有日志、源文件夹已经不在或者太久没动过的。
+    返回删除的个数。
+    """
+    removed = 0
+    now = time.time()
+    try:
+        entries = list(os.scandir(mods_path))
+    except OSError:
+        return 0
+    names = {entry.name for entry in entries}
+    for entry in entries:
+        if not entry.name.startswith("."):
+            continue
+        if entry.name.endswith(STAGING_SUFFIX + JOURNAL_SUFFIX):
+            # 临时文件夹已经不在的日志
+            if entry.name[: -len(JOURNAL_SUFFIX)] not in names:
+                Path(entry.path).unlink(missing_ok=True)
+            continue
+        if not entry.name.endswith(STAGING_SUFFIX) or not entry.is_dir():
+            continue
+        staging = Path(entry.path)
+        journal = journal_path(staging)
+        try:
+            with open(journal, encoding="utf-8") as f:
+                source = json.loads(f.readline()).get("source")
+            fresh = now - journal.stat().st_mtime < max_age
+        except (OSError, ValueError, AttributeError):
+            source, fresh = None, False
+        if fresh and isinstance(source, str) and os.path.isdir(source):
+            continue
+        logger.info(f"removing unfinished install {staging}")
+        shutil.rmtree(staging, ignore_errors=True)
+        journal.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -0,0 +1,484 @@
+"""
+由本插件复制的模组的压缩备份和恢复。
+
+每次备份是备份目录下的一个快照文件夹，里面是每个模组的 zip（大模组按大小
+拆成几个分卷，分卷之间并发压缩，zlib 压缩时会释放 GIL）和记录每个文件
+大小、mtime、哈希以及所在分卷的 snapshot.json。增量备份和上一个快照比较，
+大小和 mtime 都没变、或者大小没变且哈希相同的文件直接引用旧快照里的分卷，
+只压缩变过的文件。恢复时按模组并发解压到临时文件夹，全部成功后再替换。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .copy_engine import DEFAULT_WORKERS
+
+logger = logging.getLogger(__name__)
+
+BACKUP_VERSION = 1
+SNAPSHOT_FILE = "snapshot.json"
+# 一个分卷最多放这么多字节的原始数据，大模组也能用上多个核
+PART_BYTES = 256 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+# 超过这个大小的文件用 zip64 写，避免写到一半才发现超过 4 GB
+ZIP64_THRESHOLD = 1024 * 1024 * 1024
+PHASE_SCAN = "扫描模组"
+PHASE_ARCHIVE = "压缩文件"
+PHASE_RESTORE = "恢复文件"
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+class FileEntry:
+    __slots__ = ("archive", "digest", "mtime_ns", "size")
+
+    def __init__(self, size: int, mtime_ns: int, digest: str, archive: str):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        # 数据所在的分卷，相对备份目录，例如 20240101-120000/模组名.0.zip
+        self.archive = archive
+
+
+class Snapshot:
+    def __init__(
+        self,
+        path: Path,
+        base: str | None = None,
+        created: float | None = None,
+        mods: dict[str, dict[str, FileEntry]] | None = None,
+    ):
+        self.path = path
+        # 增量快照基于的快照名，完整快照为 None
+        self.base = base
+        self.created = time.time() if created is None else created
+        self.mods: dict[str, dict[str, FileEntry]] = {} if mods is None else mods
+        # 这次备份实际压缩的文件数和原始字节数
+        self.stored_files = 0
+        self.stored_bytes = 0
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def files(self) -> int:
+        return sum(len(files) for files in self.mods.values())
+
+    @property
+    def bytes(self) -> int:
+        return sum(
+            entry.size for files in self.mods.values() for entry in files.values()
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "Snapshot":
+        with open(path / SNAPSHOT_FILE, encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw["version"] != BACKUP_VERSION:
+            raise ValueError(f"unsupported backup version {raw['version']} in {path}")
+        snapshot = cls(
+            path,
+            raw["base"],
+            raw["created"],
+            {
+                mod: {
+                    rel_path: FileEntry(size, mtime_ns, digest, archive)
+                    for rel_path, (size, mtime_ns, digest, archive) in files.items()
+                }
+                for mod, files in raw["mods"].items()
+            },
+        )
+        snapshot.stored_files = raw["stored_files"]
+        snapshot.stored_bytes = raw["stored_bytes"]
+        return snapshot
+
+    def save(self):
+        raw = {
+            "version": BACKUP_VERSION,
+            "base": self.base,
+            "created": self.created,
+            "stored_files": self.stored_files,
+            "stored_bytes": self.stored_bytes,
+            "mods": {
+                mod: {
+                    rel_path: [entry.size, entry.mtime_ns, entry.digest, entry.archive]
+                    for rel_path, entry in files.items()
+                }
+                for mod, files in self.mods.items()
+            },
+        }
+        tmp_file = self.path / (SNAPSHOT_FILE + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False)
+        os.replace(tmp_file, self.path / SNAPSHOT_FILE)
+
+
+def list_snapshots(backup_root: Path) -> list[Snapshot]:
+    """
+    备份目录下所有完整的快照，按时间从旧到新。
+    """
+    snapshots: list[Snapshot] = []
+    try:
+        folders = [entry for entry in os.scandir(backup_root) if entry.is_dir()]
+    except OSError:
+        return []
+    for entry in folders:
+        # 没写完的快照以 . 开头
+        if entry.name.startswith("."):
+            continue
+        try:
+            snapshots.append(Snapshot.load(Path(entry.path)))
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.debug(f"skip backup folder {entry.path}")
+    return sorted(snapshots, key=lambda snapshot: snapshot.created)
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _scan_mod(mod_folder: Path) -> dict[str, tuple[int, int]]:
+    """
+    相对路径 -> (大小, mtime_ns)。
+    """
+    files: dict[str, tuple[int, int]] = {}
+    stack = [("", str(mod_folder))]
+    while stack:
+        rel, folder = stack.pop()
+        with os.scandir(folder) as it:
+            entries = list(it)
+        for entry in entries:
+            rel_path = f"{rel}/{entry.name}" if rel else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((rel_path, entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                files[rel_path] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def _zip_time(mtime_ns: int) -> tuple[int, int, int, int, int, int]:
+    # zip 的时间不能早于 1980 年，准确的 mtime 记在 snapshot.json 里
+    t = time.localtime(max(mtime_ns // 1_000_000_000, 315532800 + 86400))
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+
+
+class _Part:
+    __slots__ = ("archive", "files", "mod")
+
+    def __init__(self, mod: str, archive: str):
+        self.mod = mod
+        self.archive = archive
+        self.files: list[tuple[str, int, int]] = []
+
+
+class _Progress:
+    def __init__(
+        self,
+        phase: str,
+        total: int,
+        on_progress: Callable[[str, int, int], None] | None,
+    ):
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self._on_progress = on_progress
+        self._lock = threading.Lock()
+        self._last_report = 0.0
+
+    def add(self, count: int = 1):
+        with self._lock:
+            self.done += count
+            done = self.done
+            now = time.perf_counter()
+            if done < self.total and now - self._last_report < 0.1:
+                return
+            self._last_report = now
+        if self._on_progress is not None:
+            self._on_progress(self.phase, done, self.total)
+
+
+class BackupWriter:
+    def __init__(
+        self,
+        mods_path: Path,
+        mod_names: Iterable[str],
+        backup_root: Path,
+        base: Snapshot | None = None,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        """
+        ``base`` 给出时做增量备份，只压缩和它相比变过的文件。
+        """
+        self.mods_path = mods_path
+        self.mod_names = list(mod_names)
+        self.backup_root = backup_root
+        self.base = base
+        self.workers = max(1, workers)
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise BackupCancelled()
+
+    def run(
+        self, on_progress: Callable[[str, int, int], None] | None = None
+    ) -> Snapshot:
+        """
+        写一个新快照，``on_progress(阶段, 已完成, 总数)`` 在工作线程里调用。
+
+        Raises:
+            BackupCancelled: 被取消，没写完的快照会被删除。
+        """
+        name = time.strftime("%Y%m%d-%H%M%S")
+        while (self.backup_root / name).exists():
+            name += "_"
+        staging = self.backup_root / f".{name}.partial"
+        staging.mkdir(parents=True)
+        try:
+            snapshot = Snapshot(staging, None if self.base is None else self.base.name)
+            self._write(snapshot, name, on_progress)
+            snapshot.save()
+            staging.rename(self.backup_root / name)
+            snapshot.path = self.backup_root / name
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.debug(
+            f"backup {name}: {snapshot.files} files, "
+            f"stored {snapshot.stored_files} files / {snapshot.stored_bytes} bytes"
+        )
+        return snapshot
+
+    def _write(
+        self,
+        snapshot: Snapshot,
+        name: str,
+        on_progress: Callable[[str, int, int], None] | None,
+    ):
+        scan_progress = _Progress(PHASE_SCAN, len(self.mod_names), on_progress)
+        base_mods = {} if self.base is None else self.base.mods
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dd-backup"
+        ) as executor:
+
+            def scan(mod: str):
+                self._check_cancelled()
+                files = _scan_mod(self.mods_path / mod)
+                scan_progress.add()
+                return files
+
+            changed: dict[str, list[tuple[str, int, int]]] = {}
+            # 大小一样但 mtime 变了的文件，比较哈希后才知道要不要再存一份
+            recheck: list[tuple[str, str, int, int, FileEntry]] = []
+            for mod, files in zip(
+                self.mod_names, executor.map(scan, self.mod_names), strict=True
+            ):
+                entries = snapshot.mods[mod] = {}
+                old_files = base_mods.get(mod, {})
+                changed[mod] = []
+                for rel_path, (size, mtime_ns) in sorted(files.items()):
+                    old = old_files.get(rel_path)
+                    if old is None or old.size != size:
+                        changed[mod].append((rel_path, size, mtime_ns))
+                    elif old.mtime_ns == mtime_ns:
+                        entries[rel_path] = old
+                    else:
+                        recheck.append((mod, rel_path, size, mtime_ns, old))
+
+            digests = executor.map(
+                lambda c: _file_digest(self.mods_path / c[0] / c[1]), recheck
+            )
+            for (mod, rel_path, size, mtime_ns, old), digest in zip(
+                recheck, digests, strict=True
+            ):
+                if digest == old.digest:
+                    snapshot.mods[mod][rel_path] = FileEntry(
+                        size, mtime_ns, digest, old.archive
+                    )
+                else:
+                    changed[mod].append((rel_path, size, mtime_ns))
+            self._check_cancelled()
+            parts = [
+                part
+                for mod, files in changed.items()
+                for part in self._split(mod, name, files)
+            ]
+
+            archive_progress = _Progress(
+                PHASE_ARCHIVE, sum(len(part.files) for part in parts), on_progress
+            )
+            for part, entries in zip(
+                parts,
+                executor.map(
+                    lambda part: self._archive(snapshot.path, part, archive_progress),
+                    parts,
+                ),
+                strict=True,
+            ):
+                snapshot.mods[part.mod].update(entries)
+                snapshot.stored_files += len(entries)
+                snapshot.stored_bytes += sum(entry.size for entry in entries.values())
+
+    @staticmethod
+    def _split(
+        mod: str, snapshot_name: str, files: list[tuple[str, int, int]]
+    ) -> list[_Part]:
+        parts: list[_Part] = []
+        part_bytes = PART_BYTES
+        for rel_path, size, mtime_ns in files:
+            if part_bytes + size > PART_BYTES and (not parts or parts[-1].files):
+                parts.append(_Part(mod, f"{snapshot_name}/{mod}.{len(parts)}.zip"))
+                part_bytes = 0
+            parts[-1].files.append((rel_path, size, mtime_ns))
+            part_bytes += size
+        return parts
+
+    def _archive(
+        self, staging: Path, part: _Part, progress: _Progress
+    ) -> dict[str, FileEntry]:
+        entries: dict[str, FileEntry] = {}
+        mod_folder = self.mods_path / part.mod
+        archive_path = staging / Path(part.archive).name
+        with zipfile.ZipFile(
+            archive_path, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL
+        ) as zf:
+            for rel_path, size, mtime_ns in part.files:
+                self._check_cancelled()
+                info = zipfile.ZipInfo(rel_path, _zip_time(mtime_ns))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                h = hashlib.blake2b(digest_size=20)
+                with (
+                    open(mod_folder / rel_path, "rb") as src,
+                    zf.open(info, "w", force_zip64=size >= ZIP64_THRESHOLD) as dst,
+                ):
+                    while chunk := src.read(CHUNK_SIZE):
+                        h.update(chunk)
+                        dst.write(chunk)
+                entries[rel_path] = FileEntry(
+                    size, mtime_ns, h.hexdigest(), part.archive
+                )
+                progress.add()
+        return entries
+
+
+class BackupRestorer:
+    def __init__(
+        self,
+        snapshot: Snapshot,
+        backup_root: Path,
+        mods_path: Path,
+        mod_names: Iterable[str] | None = None,
+        workers: int = DEFAULT_WORKERS,
+    ):
+        """
+        把快照里的模组（默认全部）恢复到 ``mods_path``，已有的同名模组会被整个替换。
+        """
+        self.snapshot = snapshot
+        self.backup_root = backup_root
+        self.mods_path = mods_path
+        self.mod_names = list(snapshot.mods if mod_names is None else mod_names)
+        self.workers = max(1, workers)
+        self.errors: dict[str, Exception] = {}
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(
+        self, on_progress: Callable[[str, int, int], None] | None = None
+    ) -> list[str]:
+        """
+        返回成功恢复的模组，失败或取消的模组原来的文件夹保持不变，失败原因在 ``errors`` 里。
+        """
+        progress = _Progress(
+            PHASE_RESTORE,
+            sum(len(self.snapshot.mods[mod]) for mod in self.mod_names),
+            on_progress,
+        )
+        restored: list[str] = []
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dd-restore"
+        ) as executor:
+            for mod, error in zip(
+                self.mod_names,
+                executor.map(lambda mod: self._restore(mod, progress), self.mod_names),
+                strict=True,
+            ):
+                if error is None:
+                    restored.append(mod)
+                elif not isinstance(error, BackupCancelled):
+                    self.errors[mod] = error
+        # 取消时已经替换好的模组也要返回，调用方需要更新它们的索引
+        return restored
+
+    def _restore(self, mod: str, progress: _Progress) -> Exception | None:
+        dest = self.mods_path / mod
+        staging = self.mods_path / f".{mod}.restoring"
+        try:
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            self._extract(self.snapshot.mods[mod], staging, progress)
+            if dest.exists():
+                old = self.mods_path / f".{mod}.old"
+                shutil.rmtree(old, ignore_errors=True)
+                dest.rename(old)
+                staging.rename(dest)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                staging.rename(dest)
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not isinstance(e, BackupCancelled):
+                logger.exception(f"failed to restore {mod}")
+            return e
+        return None
+
+    def _extract(self, files: dict[str, FileEntry], staging: Path, progress: _Progress):
+        by_archive: dict[str, list[tuple[str, FileEntry]]] = {}
+        for rel_path, entry in files.items():
+            by_archive.setdefault(entry.archive, []).append((rel_path, entry))
+        for archive, members in by_archive.items():
+            with zipfile.ZipFile(self.backup_root / archive) as zf:
+                for rel_path, entry in members:
+                    if self.cancelled:
+                        raise BackupCancelled()
+                    dest = staging / rel_path
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    h = hashlib.blake2b(digest_size=20)
+                    with zf.open(rel_path) as src, open(dest, "wb") as dst:
+                        while chunk := src.read(CHUNK_SIZE):
+                            h.update(chunk)
+                            dst.write(chunk)
+                    if h.hexdigest() != entry.digest:
+                        raise ValueError(f"{archive}: {rel_path} is corrupted")
+                    os.utime(dest, ns=(entry.mtime_ns, entry.mtime_ns))
+                    progress.add()
@@ -0,0 +1,1356 @@
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import mobase
+from PyQt6.QtCore import (
+    QEventLoop,
+    QModelIndex,
+    QObject,
+    QSize,
+    Qt,
+    QThread,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QCloseEvent
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QHeaderView,
+    QInputDialog,
+    QLabel,
+    QLineEdit,
+    QMainWindow,
+    QMessageBox,
+    QProgressBar,
+    QProgressDialog,
+    QPushButton,
+    QTableView,
+    QToolBar,
+    QWidget,
+)
+
+from . import diagnostics
+from .conflict_index import ConflictIndex
+from .conflict_view import ConflictDialog
+from .copy_engine import (
+    DEFAULT_WORKERS,
+    CopyCancelled,
+    CopyEngine,
+    CopyItem,
+    CopyPlan,
+    CopyProgress,
+    format_bytes,
+)
+from .dedup import (
+    DedupAnalyzer,
+    DedupCancelled,
+    DedupReport,
+    HashStore,
+    hardlink_duplicates,
+)
+from .diagnostics_view import DiagnosticsDialog
+from .mod_backup import (
+    BackupCancelled,
+    BackupRestorer,
+    BackupWriter,
+    Snapshot,
+    list_snapshots,
+)
+from .mod_core import ModCore, WorkshopDiff
+from .mod_installer import (
+    DEFAULT_INSTALL_JOBS,
+    InstallQueue,
+    QueueProgress,
+    StagedInstall,
+    is_valid_filename,
+)
+from .mod_record import ModRecord
+from .mod_sizes import SpaceCheck
+from .staleness import load_install_state
+from .table_copy import (
+    OUTDATED_COLUMN,
+    PREVIEW_COLUMN,
+    SIZE_COLUMN,
+    ButtonDelegate,
+    ModFilterProxy,
+    MyTableModel,
+)
+from .thumbnails import DEFAULT_THUMBNAIL_SIZE, ThumbnailCache
+from .workshop_acf import WorkshopItem
+from .workshop_scan import DEFAULT_SCAN_WORKERS
+from .workshop_watch import WorkshopWatcher
+from .xml_cache import ModXmlCache
+
+logger = logging.getLogger()
+
+
+class CopyThread(QThread):
+    # 复制引擎在工作线程里回调，用信号转回 GUI 线程
+    progressChanged = pyqtSignal(object)
+
+    def __init__(
+        self,
+        engine: CopyEngine,
+        plan: CopyPlan | Callable[[], CopyPlan],
+        parent: QWidget | None,
+        on_file: Callable[[CopyItem], None] | None = None,
+    ):
+        super().__init__(parent)
+        self.engine = engine
+        # 增量更新要先比较文件，计划也放到线程里生成
+        self.plan = plan
+        self.on_file = on_file
+        self.result: CopyProgress | None = None
+        self.error: Exception | None = None
+
+    def run(self):
+        try:
+            plan = self.plan if isinstance(self.plan, CopyPlan) else self.plan()
+            if self.engine.cancelled:
+                return
+            self.result = self.engine.run(plan, self.progressChanged.emit, self.on_file)
+        except CopyCancelled:
+            pass
+        except Exception as e:
+            logger.exception("copy failed")
+            self.error = e
+
+
+class InstallThread(QThread):
+    progressChanged = pyqtSignal(object)
+
+    def __init__(self, queue: InstallQueue, parent: QWidget | None):
+        super().__init__(parent)
+        self.queue = queue
+        self.result: QueueProgress | None = None
+        self.error: Exception | None = None
+
+    def run(self):
+        try:
+            self.result = self.queue.run(self.progressChanged.emit)
+        except Exception as e:
+            logger.exception("batch install failed")
+            self.error = e
+
+
+class RefreshThread(QThread):
+    """
+    在后台比较创意工坊和表格的差异。
+    """
+
+    def __init__(self, diff: Callable[[], WorkshopDiff], parent: QObject | None):
+        super().__init__(parent)
+        self._diff = diff
+        self.result: WorkshopDiff | None = None
+        self.error: Exception | None = None
+
+    def run(self):
+        try:
+            self.result = self._diff()
+        except Exception as e:
+            logger.exception("refresh workshop failed")
+            self.error = e
+
+
+class TaskThread(QThread):
+    """
+    在后台运行 ``task(progress)``，``progress(阶段, 已完成, 总数)`` 以信号转回 GUI 线程。
+    """
+
+    progressChanged = pyqtSignal(str, int, int)
+
+    def __init__(
+        self,
+        task: Callable[[Callable[[str, int, int], None]], object],
+        parent: QObject | None,
+    ):
+        super().__init__(parent)
+        self._task = task
+        self.result: object = None
+        self.error: Exception | None = None
+
+    def run(self):
+        try:
+            self.result = self._task(self.progressChanged.emit)
+        except (DedupCancelled, BackupCancelled):
+            pass
+        except Exception as e:
+            logger.exception("task failed")
+            self.error = e
+
+
+class ScanThread(QThread):
+    """
+    在后台扫描创意工坊，把行按批次发回 GUI 线程。
+    """
+
+    rowsReady = pyqtSignal(list)
+    totalChanged = pyqtSignal(int)
+    # 至少攒够这么多行或者过了这么久才发一次，第一行会立即发出
+    BATCH_ROWS = 100
+    BATCH_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        rows: Callable[[Callable[[int], None]], Iterator[ModRecord]],
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent)
+        self._rows = rows
+        self._cancelled = False
+        self.error: Exception | None = None
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self):
+        rows = self._rows(self.totalChanged.emit)
+        batch: list[ModRecord] = []
+        last = 0.0
+        try:
+            for row in rows:
+                if self._cancelled:
+                    break
+                batch.append(row)
+                now = time.perf_counter()
+                if len(batch) >= self.BATCH_ROWS or now - last >= self.BATCH_INTERVAL:
+                    self.rowsReady.emit(batch)
+                    batch = []
+                    last = now
+            if batch:
+                self.rowsReady.emit(batch)
+        except Exception as e:
+            logger.exception("scan workshop failed")
+            self.error = e
+        finally:
+            rows.close()
+
+
+class SizeThread(QThread):
+    """
+    在后台统计模组大小，结果按批次发回 GUI 线程。
+    """
+
+    sizesReady = pyqtSignal(list)
+    BATCH_INTERVAL = 0.2
+
+    def __init__(
+        self,
+        sizes: Callable[[], Iterator[tuple[str, int, int]]],
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent)
+        self._sizes = sizes
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        sizes = self._sizes()
+        batch: list[tuple[str, int, int]] = []
+        last = time.perf_counter()
+        try:
+            for size in sizes:
+                if self._cancelled:
+                    break
+                batch.append(size)
+                now = time.perf_counter()
+                if now - last >= self.BATCH_INTERVAL:
+                    self.sizesReady.emit(batch)
+                    batch = []
+                    last = now
+            if batch:
+                self.sizesReady.emit(batch)
+        except Exception:
+            logger.exception("measure mod sizes failed")
+        finally:
+            sizes.close()
+
+
+class ToolWindow(QMainWindow):
+    """
+    插件窗口，关闭时发出 ``closed``，让监视和后台任务跟着停下。
+    """
+
+    closed = pyqtSignal()
+
+    def closeEvent(self, event: QCloseEvent | None):
+        super().closeEvent(event)
+        if event is None or event.isAccepted():
+            self.closed.emit()
+
+
+class ModCopyTool:
+    """
+    插件窗口和它用到的扫描、安装等功能，第一次打开窗口时才创建。
+    """
+
+    def __init__(self, organizer: mobase.IOrganizer, parent: QWidget, name: str):
+        self._organizer = organizer
+        self.__parentWidget = parent
+        # 读插件设置时用的插件名
+        self._name = name
+        self.model: MyTableModel
+        self.proxy: ModFilterProxy
+        self.data: list[ModRecord] = []
+        self.scan_thread: ScanThread | None = None
+        self.scan_total = 0
+        self._scan_started = 0.0
+        self._xml_cache: ModXmlCache
+        self.watcher: WorkshopWatcher | None = None
+        self.core: ModCore | None = None
+        # 第一次打开冲突窗口时才建立
+        self.conflict_index: ConflictIndex | None = None
+        self.thumbnails: ThumbnailCache | None = None
+        self.refresh_thread: RefreshThread | None = None
+        self.size_thread: SizeThread | None = None
+        # 打开着的窗口，关闭后为 None，不再开始新的刷新和统计
+        self.window: ToolWindow | None = None
+        # 统计大小时新增或更新的模组，当前的统计结束后再算
+        self._size_pending: list[str] = []
+        # 扫描或上一次刷新还没结束时收到的变化，结束后再刷新一次
+        self._refresh_pending = False
+        self._apply_diagnostics_setting()
+
+    def _setting(self, key: str) -> object:
+        return self._organizer.pluginSetting(self._name, key)
+
+    def _apply_diagnostics_setting(self):
+        diagnostics.enable(bool(self._setting("diagnostics")))
+
+    def _data_path(self) -> Path:
+        # 插件自己的缓存等数据放在 MO2 的插件数据目录下
+        return Path(self._organizer.pluginDataPath()) / "DarkestDungeonModCopy"
+
+    def set_parent_widget(self, parent: QWidget):
+        self.__parentWidget = parent
+
+    def display(self) -> None:
+        # 设置可能在 MO2 运行时改过
+        self._apply_diagnostics_setting()
+        windows = ToolWindow(self.__parentWidget)
+        windows.closed.connect(lambda: windows is self.window and self._on_closed())
+        self.window = windows
+        windows.setWindowTitle("Darkest Dungeon Mod Copy")
+        windows.setGeometry(100, 100, 1720, 900)  # 设置窗口位置和大小
+        self.table_view = QTableView()
+        self.init_data()
+        self.table_view.setColumnWidth(0, 600)
+        self.table_view.setColumnWidth(1, 200)
+        self.table_view.setColumnWidth(2, 10)
+        self.table_view.setColumnWidth(3, 10)
+        self.table_view.setColumnWidth(4, 200)
+        self.table_view.setColumnWidth(5, 600)
+        self.table_view.setColumnWidth(OUTDATED_COLUMN, 60)
+        self.table_view.setColumnWidth(SIZE_COLUMN, 80)
+        self.table_view.hideColumn(6)
+        self.table_view.hideColumn(2)
+        thumbnail_size = self._thumbnail_size()
+        if horizontalHeader := self.table_view.horizontalHeader():
+            horizontalHeader.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
+            horizontalHeader.setSectionResizeMode(3, QHeaderView.ResizeMode.Fixed)
+            # 预览图放在最前面
+            horizontalHeader.moveSection(PREVIEW_COLUMN, 0)
+            # 点表头排序，默认保持扫描的顺序
+            horizontalHeader.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        if verticalHeader := self.table_view.verticalHeader():
+            verticalHeader.setDefaultSectionSize(
+                thumbnail_size + 4 if thumbnail_size else 10
+            )
+        if thumbnail_size:
+            self.table_view.setIconSize(QSize(thumbnail_size, thumbnail_size))
+            self.table_view.setColumnWidth(PREVIEW_COLUMN, thumbnail_size + 8)
+        else:
+            self.table_view.hideColumn(PREVIEW_COLUMN)
+        self.table_view.setShowGrid(False)
+        # 可以多选，批量安装选中的行
+        self.table_view.setSelectionBehavior(
+            QAbstractItemView.SelectionBehavior.SelectRows
+        )
+        self.table_view.setSelectionMode(
+            QAbstractItemView.SelectionMode.ExtendedSelection
+        )
+        windows.setCentralWidget(self.table_view)
+        if verticalHeader := self.table_view.verticalHeader():
+            verticalHeader.setVisible(False)
+        self._init_tool_bar(windows)
+        self._init_search_bar(windows)
+        self._init_status_bar(windows)
+        windows.show()
+        self.start_scan()
+        self.start_watching()
+        pass
+
+    def _on_closed(self):
+        """
+        窗口关闭后停止监视文件夹，取消扫描和大小统计，之后的变化不再刷新。
+        正在运行的刷新不能中断，结束后结果会被丢弃。
+        """
+        self.window = None
+        self._refresh_pending = False
+        self._size_pending = []
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+        if self.size_thread is not None and self.size_thread.isRunning():
+            self.size_thread.cancel()
+
+    def _init_tool_bar(self, windows: QMainWindow):
+        tool_bar = QToolBar("安装", windows)
+        tool_bar.setMovable(False)
+        if action := tool_bar.addAction("安装选中的模组"):
+            action.triggered.connect(self.install_selected)
+        if action := tool_bar.addAction("安装全部未复制的模组"):
+            action.triggered.connect(self.install_all_missing)
+        tool_bar.addSeparator()
+        if action := tool_bar.addAction("只显示过期的模组"):
+            action.setCheckable(True)
+            action.toggled.connect(self.proxy.set_outdated_only)
+        tool_bar.addSeparator()
+        if action := tool_bar.addAction("分析重复文件"):
+            action.triggered.connect(self.analyze_duplicates)
+        if action := tool_bar.addAction("文件冲突"):
+            action.triggered.connect(self.show_conflicts)
+        tool_bar.addSeparator()
+        if action := tool_bar.addAction("备份模组"):
+            action.triggered.connect(self.backup_mods)
+        if action := tool_bar.addAction("恢复备份"):
+            action.triggered.connect(self.restore_backup)
+        tool_bar.addSeparator()
+        if action := tool_bar.addAction("诊断"):
+            action.triggered.connect(self.show_diagnostics)
+        windows.addToolBar(tool_bar)
+
+    def _init_search_bar(self, windows: QMainWindow):
+        tool_bar = QToolBar("搜索", windows)
+        tool_bar.setMovable(False)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索标题、标签和描述")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.apply_search)
+        self.tag_combo = QComboBox()
+        self.tag_combo.setMinimumContentsLength(16)
+        self.tag_combo.addItem("全部标签", None)
+        self.tag_combo.currentIndexChanged.connect(self.apply_search)
+        tool_bar.addWidget(self.search_edit)
+        tool_bar.addWidget(self.tag_combo)
+        windows.addToolBarBreak()
+        windows.addToolBar(tool_bar)
+
+    def apply_search(self):
+        """
+        按搜索框和标签筛选表格，标签后面的数字是当前搜索结果里带这个标签的模组数。
+        """
+        search_index = self._get_core().search_index
+        query = self.search_edit.text()
+        tag: str | None = self.tag_combo.currentData()
+        with diagnostics.span("search.query"):
+            text_ids = search_index.search(query)
+            matched = search_index.search(query, tag) if tag else text_ids
+            facets = search_index.facets(text_ids)
+        self.tag_combo.blockSignals(True)
+        self.tag_combo.clear()
+        self.tag_combo.addItem(
+            "全部标签" if text_ids is None else f"全部标签 ({len(text_ids)})", None
+        )
+        if tag and tag not in (name for name, _count in facets):
+            facets.insert(0, (tag, 0))
+        for name, count in facets:
+            self.tag_combo.addItem(f"{name} ({count})", name)
+        self.tag_combo.setCurrentIndex(max(0, self.tag_combo.findData(tag)))
+        self.tag_combo.blockSignals(False)
+        self.proxy.set_matched_ids(matched)
+
+    def _init_status_bar(self, windows: QMainWindow):
+        self.scan_label = QLabel("正在扫描创意工坊...")
+        self.scan_progress = QProgressBar()
+        self.scan_progress.setMaximumWidth(240)
+        self.scan_progress.setRange(0, 0)
+        self.scan_cancel = QPushButton("停止扫描")
+        if status_bar := windows.statusBar():
+            status_bar.addWidget(self.scan_label, 1)
+            status_bar.addPermanentWidget(self.scan_progress)
+            status_bar.addPermanentWidget(self.scan_cancel)
+
+    def start_scan(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.cancel()
+            self.scan_thread.wait()
+        if self.size_thread is not None and self.size_thread.isRunning():
+            self.size_thread.cancel()
+            self.size_thread.wait()
+        self._size_pending = []
+        core = self._get_core()
+        # 之后的增量刷新沿用同一个缓存
+        xml_cache = self._xml_cache = core.open_xml_cache()
+        workers = self._scan_workers()
+        use_processes = self._use_processes()
+        thread = ScanThread(
+            lambda on_total: core.iter_workshop_items(
+                xml_cache, workers, use_processes, on_total
+            )
+        )
+        # 重新打开窗口时旧线程排队中的信号不能再落到新模型上
+        thread.totalChanged.connect(
+            lambda total: thread is self.scan_thread and self._on_scan_total(total)
+        )
+        thread.rowsReady.connect(
+            lambda rows: thread is self.scan_thread and self._on_scan_rows(rows)
+        )
+        thread.finished.connect(
+            lambda: thread is self.scan_thread and self._on_scan_finished()
+        )
+        self.scan_cancel.clicked.connect(thread.cancel)
+        self.scan_thread = thread
+        self._scan_started = time.perf_counter()
+        thread.start()
+
+    def _on_scan_total(self, total: int):
+        self.scan_total = total
+        self.scan_progress.setRange(0, max(total, 1))
+
+    def _on_scan_rows(self, rows: list[ModRecord]):
+        with diagnostics.span("model.append_rows", len(rows)):
+            self.model.append_rows(rows)
+        self.scan_progress.setValue(len(self.data))
+        self.scan_label.setText(f"正在扫描创意工坊: {len(self.data)}/{self.scan_total}")
+        self._fetch_if_at_bottom()
+        # 新扫描到的模组已经在索引里，更新标签计数和筛选结果
+        self.apply_search()
+
+    def _fetch_if_at_bottom(self):
+        # 视图已经显示到最后一行（或者还没填满）时，它不会再主动要数据
+        scroll_bar = self.table_view.verticalScrollBar()
+        if scroll_bar is None or scroll_bar.value() >= scroll_bar.maximum():
+            self.model.fetchMore(QModelIndex())
+
+    def _on_scan_finished(self):
+        thread = self.scan_thread
+        self.scan_progress.hide()
+        self.scan_cancel.hide()
+        if thread is not None and thread.error is not None:
+            self.scan_label.setText(f"扫描失败: {thread.error}")
+            QMessageBox.critical(self.__parentWidget, "扫描失败", str(thread.error))
+        elif thread is not None and thread.cancelled:
+            self.scan_label.setText(f"扫描已停止: {len(self.data)}/{self.scan_total}")
+        else:
+            diagnostics.record(
+                "scan.total", time.perf_counter() - self._scan_started, len(self.data)
+            )
+            self.update_outdated()
+            self.start_measuring([record.source_path for record in self.data], True)
+        if self._refresh_pending:
+            self.refresh_workshop_items()
+
+    def start_measuring(self, sources: list[str], prune: bool = False):
+        """
+        在后台统计模组大小，填到大小列里。已经在统计时先记下，结束后再算。
+        """
+        if self.window is None:
+            return
+        if self.size_thread is not None and self.size_thread.isRunning():
+            self._size_pending.extend(sources)
+            return
+        if not sources:
+            return
+        core = self._get_core()
+        workers = self._scan_workers()
+        thread = SizeThread(
+            lambda: core.iter_sizes(sources, workers, prune), self.table_view
+        )
+        thread.sizesReady.connect(
+            lambda sizes: thread is self.size_thread and self.model.set_sizes(sizes)
+        )
+        thread.finished.connect(
+            lambda: thread is self.size_thread and self._on_sizes_finished()
+        )
+        self.size_thread = thread
+        thread.start()
+
+    def _on_sizes_finished(self):
+        sources, self._size_pending = self._size_pending, []
+        self.start_measuring(sources)
+
+    def start_watching(self):
+        """
+        监视 acf、各个库的 content/262060 和 MO2 的模组文件夹，有变化时增量刷新表格。
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+        paths = [Path(self._organizer.modsPath())]
+        for workshop_path in self._get_core().find_workshop_paths():
+            paths.append(workshop_path / "appworkshop_262060.acf")
+            paths.append(workshop_path / "content" / "262060")
+        watcher = WorkshopWatcher(
+            paths,
+            bool(self._setting("watch_polling")),
+            self.table_view,
+        )
+        watcher.changed.connect(
+            lambda: watcher is self.watcher and self.refresh_workshop_items()
+        )
+        self.watcher = watcher
+
+    def refresh_workshop_items(self):
+        if self.window is None:
+            return
+        if (self.scan_thread is not None and self.scan_thread.isRunning()) or (
+            self.refresh_thread is not None and self.refresh_thread.isRunning()
+        ):
+            self._refresh_pending = True
+            return
+        self._refresh_pending = False
+        core = self._get_core()
+        xml_cache = self._xml_cache
+        # 后台线程只读这份快照，不碰模型
+        known = {
+            record.published_file_id: (
+                record.source_path,
+                record.mo2_path,
+                item.manifest
+                if (item := self.workshop_items.get(record.published_file_id))
+                else "",
+            )
+            for record in self.data
+        }
+        thread = RefreshThread(
+            lambda: core.diff_workshop_items(xml_cache, known),
+            self.table_view,
+        )
+        thread.finished.connect(
+            lambda: thread is self.refresh_thread and self._on_refresh_finished()
+        )
+        self.refresh_thread = thread
+        thread.start()
+
+    def _on_refresh_finished(self):
+        thread = self.refresh_thread
+        if thread is not None and thread.error is not None:
+            self.scan_label.setText(f"刷新失败: {thread.error}")
+        elif thread is not None and thread.result is not None:
+            logger.debug(f"refresh workshop: {thread.result}")
+            if self.window is not None:
+                self.apply_workshop_diff(thread.result)
+        if self._refresh_pending:
+            self.refresh_workshop_items()
+
+    def apply_workshop_diff(self, diff: WorkshopDiff):
+        self.workshop_items = diff.workshop_items
+        if not diff:
+            return
+        if diff.removed:
+            self.model.remove_rows(
+                [
+                    row
+                    for PublishedFileId in diff.removed
+                    if (row := self.model.row_of_id(PublishedFileId)) is not None
+                ]
+            )
+        for record in diff.updated:
+            row = self.model.row_of_id(record.published_file_id)
+            if row is not None:
+                self.model.replace_record(row, record)
+        if diff.added:
+            self.model.append_rows(diff.added)
+            self._fetch_if_at_bottom()
+        self.update_outdated()
+        self.apply_search()
+        self.start_measuring(
+            [record.source_path for record in (*diff.updated, *diff.added)]
+        )
+
+    def update_outdated(self):
+        """
+        按当前的 acf 重新标记过期的行，只比较内存里的数据。
+        """
+        outdated = self.model.update_outdated(self.workshop_items)
+        text = f"共 {len(self.data)} 个模组"
+        if outdated:
+            text += f"，{outdated} 个已过期"
+        self.scan_label.setText(text)
+
+    def _set_installed(self, row: int, mo2_name: str, mo2_path: Path):
+        # 安装或更新后重新读取清单，过期标记随之更新
+        record = self.model.record(row)
+        load_install_state(record, Path(record.source_path), mo2_path)
+        self.model.set_installed(row, mo2_name, str(mo2_path))
+        self.update_outdated()
+
+    def _get_core(self) -> ModCore:
+        # 先在 GUI 线程里创建好，后台线程只会拿到同一个实例
+        mods_path = Path(self._organizer.modsPath())
+        if self.core is None or self.core.mods_path != mods_path:
+            self.core = ModCore(mods_path, self._data_path())
+        return self.core
+
+    @property
+    def workshop_items(self) -> dict[str, WorkshopItem]:
+        return self._get_core().workshop_items
+
+    @workshop_items.setter
+    def workshop_items(self, workshop_items: dict[str, WorkshopItem]):
+        self._get_core().workshop_items = workshop_items
+
+    def _index_installed_mod(self, name: str):
+        self._get_core().index_installed_mod(name)
+        if self.conflict_index is not None:
+            self.conflict_index.update_mod(name)
+
+    def _use_processes(self) -> bool:
+        return bool(self._setting("scan_use_processes"))
+
+    def get_workshop_items(self):
+        return self._get_core().scan(self._scan_workers(), self._use_processes())
+
+    def handleButtonClicked(self, index: QModelIndex):
+        # 视图显示的是排序/筛选后的代理模型
+        row = self.proxy.source_row(index)
+        record = self.model.record(row)
+        if record.mo2_path is not None and record.is_workshop:
+            # 已经复制过的创意工坊模组，只同步改动的文件
+            if (
+                QMessageBox.question(
+                    self.__parentWidget,
+                    "模组更新",
+                    f"模组已存在: {record.mo2_name}\n是否只复制改动过的文件来更新？",
+                )
+                == QMessageBox.StandardButton.Yes
+            ):
+                dest = Path(record.mo2_path)
+                if self.update_mod(Path(record.source_path), dest):
+                    self._index_installed_mod(dest.name)
+                    self._set_installed(row, dest.name, dest)
+            return
+        input = QInputDialog(self.__parentWidget, Qt.WindowType.Dialog)
+        text, ok = input.getText(
+            self.__parentWidget,
+            "模组安装",
+            "模组名",
+            QLineEdit.EchoMode.Normal,
+            record.title,
+        )
+        # input.show()
+        if ok:
+            text: str = text.strip()
+            if self.is_valid_filename(text):
+                if text not in self._organizer.modList().allModsByProfilePriority():
+                    dest = Path(self._organizer.modsPath()) / text
+                    if not self.scopy_mod(
+                        Path(record.source_path), dest, record.is_workshop
+                    ):
+                        return
+                    self._index_installed_mod(text)
+                    self._set_installed(row, text, dest)
+                    input.close()
+                else:
+                    QMessageBox.critical(
+                        self.__parentWidget,
+                        "模组名错误",
+                        "模组已存在",
+                    )
+            else:
+                QMessageBox.critical(
+                    self.__parentWidget,
+                    "模组名错误",
+                    "模组名含有非法字符",
+                )
+
+    def is_valid_filename(self, filename: str):
+        """
+        验证给定的字符串是否是有效的文件名。
+
+        参数:
+        filename (str): 要验证的文件名。
+
+        返回:
+        bool: 如果文件名有效，则返回 True；否则返回 False。
+        """
+        return is_valid_filename(filename)
+
+    def install_selected(self):
+        if selection_model := self.table_view.selectionModel():
+            rows = sorted(
+                self.proxy.source_row(index) for index in selection_model.selectedRows()
+            )
+            if not rows:
+                QMessageBox.information(
+                    self.__parentWidget, "批量安装", "请先在表格里选中要安装的模组"
+                )
+                return
+            self.batch_install(rows)
+
+    def install_all_missing(self):
+        # 包括还没滚动到的行
+        self.batch_install(list(range(len(self.data))))
+
+    def batch_install(self, rows: list[int]):
+        """
+        按模组标题自动命名，批量安装还没复制过的模组，最后刷新一次 MO2 的模组列表。
+        """
+        records = [
+            self.model.record(row)
+            for row in rows
+            if not self.model.record(row).installed
+        ]
+        if not records:
+            QMessageBox.information(
+                self.__parentWidget, "批量安装", "选中的模组都已经复制过了"
+            )
+            return
+        core = self._get_core()
+        jobs = core.plan_installs(
+            records, core.taken_names(self._organizer.modList().allMods())
+        )
+        if (
+            QMessageBox.question(
+                self.__parentWidget,
+                "批量安装",
+                f"将安装 {len(jobs)} 个模组，模组名按标题自动生成。是否继续？",
+            )
+            != QMessageBox.StandardButton.Yes
+        ):
+            return
+        if not self.confirm_space([job.source for job in jobs]):
+            return
+
+        queue = core.install_queue(
+            jobs,
+            self._install_jobs(),
+            self._copy_workers(),
+            self._use_links(),
+        )
+        self.run_install_queue(queue)
+
+        done = [job for job in jobs if job.done]
+        for job in done:
+            row = self.model.row_of_source(str(job.source))
+            self._index_installed_mod(job.name)
+            if row is not None:
+                self._set_installed(row, job.name, job.dest)
+        if done:
+            self._organizer.refresh()
+
+        failed = [job for job in jobs if job.error is not None]
+        skipped = len(jobs) - len(done) - len(failed)
+        message = f"已安装 {len(done)} 个模组"
+        if failed:
+            message += f"，{len(failed)} 个失败"
+        if skipped:
+            message += f"，{skipped} 个已取消"
+        box = QMessageBox(self.__parentWidget)
+        box.setWindowTitle("批量安装")
+        box.setText(message)
+        if failed:
+            box.setIcon(QMessageBox.Icon.Warning)
+            box.setDetailedText("\n".join(f"{job.name}: {job.error}" for job in failed))
+        box.exec()
+
+    def _copy_workers(self) -> int:
+        try:
+            workers = int(self._setting("copy_workers"))  # type: ignore
+        except (TypeError, ValueError):
+            workers = DEFAULT_WORKERS
+        return max(1, workers)
+
+    def _scan_workers(self) -> int:
+        try:
+            workers = int(self._setting("scan_workers"))  # type: ignore
+        except (TypeError, ValueError):
+            workers = DEFAULT_SCAN_WORKERS
+        return max(1, workers)
+
+    def _install_jobs(self) -> int:
+        try:
+            jobs = int(self._setting("install_jobs"))  # type: ignore
+        except (TypeError, ValueError):
+            jobs = DEFAULT_INSTALL_JOBS
+        return max(1, jobs)
+
+    def _thumbnail_size(self) -> int:
+        try:
+            size = int(self._setting("thumbnail_size"))  # type: ignore
+        except (TypeError, ValueError):
+            size = DEFAULT_THUMBNAIL_SIZE
+        return max(0, size)
+
+    def _use_links(self) -> bool:
+        return self._setting("install_mode") == "link"
+
+    def run_copy(
+        self,
+        plan: CopyPlan | Callable[[], CopyPlan],
+        on_file: Callable[[CopyItem], None] | None = None,
+    ) -> bool:
+        """
+        在后台线程里执行复制计划，前台显示进度，返回是否完整复制。
+        """
+        engine = CopyEngine(self._copy_workers(), use_links=self._use_links())
+        progress = QProgressDialog(
+            "复制文件...",
+            "终止",
+            0,
+            1000,
+            self.__parentWidget,
+            Qt.WindowType.Dialog,
+        )
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        thread = CopyThread(engine, plan, self.__parentWidget, on_file)
+
+        def on_progress(p: CopyProgress):
+            progress.setLabelText(
+                f"正在复制: {p.current_file}\n"
+                f"{p.files_done}/{p.files_total} 文件  "
+                f"{format_bytes(p.bytes_done)}/{format_bytes(p.bytes_total)}  "
+                f"{format_bytes(p.bytes_per_second)}/s"
+            )
+            progress.setValue(p.permille)
+
+        loop = QEventLoop()
+        thread.progressChanged.connect(on_progress)
+        progress.canceled.connect(engine.cancel)
+        thread.finished.connect(loop.quit)
+        thread.start()
+        loop.exec()
+        progress.close()
+
+        if thread.error is not None:
+            QMessageBox.critical(self.__parentWidget, "复制失败", str(thread.error))
+            return False
+        if thread.result is None:
+            logger.debug("copy canceled")
+            return False
+        logger.debug(
+            f"copied {thread.result.files_done} files "
+            f"({engine.linked_files} linked) "
+            f"({format_bytes(thread.result.bytes_done)}) in {thread.result.elapsed:.2f}s"
+        )
+        return True
+
+    def run_install_queue(self, queue: InstallQueue) -> QueueProgress | None:
+        """
+        在后台线程里执行批量安装，前台显示总进度；各任务的结果记录在 ``queue.jobs`` 里。
+        """
+        progress = QProgressDialog(
+            "准备安装...",
+            "终止",
+            0,
+            1000,
+            self.__parentWidget,
+            Qt.WindowType.Dialog,
+        )
+        progress.setWindowTitle("批量安装")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        thread = InstallThread(queue, self.__parentWidget)
+
+        def on_progress(p: QueueProgress):
+            failed = f"  失败 {p.jobs_failed}" if p.jobs_failed else ""
+            progress.setLabelText(
+                f"正在安装: {p.current_job}\n"
+                f"{p.jobs_done}/{p.jobs_total} 个模组{failed}  "
+                f"{format_bytes(p.bytes_done)}/{format_bytes(p.bytes_total)}  "
+                f"{format_bytes(p.bytes_per_second)}/s"
+            )
+            progress.setValue(p.permille)
+
+        loop = QEventLoop()
+        thread.progressChanged.connect(on_progress)
+        progress.canceled.connect(queue.cancel)
+        thread.finished.connect(loop.quit)
+        thread.start()
+        loop.exec()
+        progress.close()
+
+        if thread.error is not None:
+            QMessageBox.critical(self.__parentWidget, "安装失败", str(thread.error))
+            return None
+        if thread.result is not None:
+            logger.debug(
+                f"installed {thread.result.jobs_done}/{thread.result.jobs_total} mods "
+                f"({format_bytes(thread.result.bytes_done)}) "
+                f"in {thread.result.elapsed:.2f}s"
+            )
+        return thread.result
+
+    def run_task(
+        self,
+        title: str,
+        task: Callable[[Callable[[str, int, int], None]], object],
+        cancel: Callable[[], None] | None = None,
+    ) -> object:
+        """
+        在后台线程里运行耗时任务并显示进度，取消或出错时返回 None。
+        """
+        progress = QProgressDialog(
+            title, "终止", 0, 1000, self.__parentWidget, Qt.WindowType.Dialog
+        )
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        if cancel is None:
+            progress.setCancelButton(None)
+        else:
+            progress.canceled.connect(cancel)
+        thread = TaskThread(task, self.__parentWidget)
+
+        def on_progress(phase: str, done: int, total: int):
+            progress.setLabelText(f"{phase}: {done}/{total}")
+            progress.setValue(done * 1000 // total if total else 0)
+
+        loop = QEventLoop()
+        thread.progressChanged.connect(on_progress)
+        thread.finished.connect(loop.quit)
+        thread.start()
+        loop.exec()
+        progress.close()
+        if thread.error is not None:
+            QMessageBox.critical(self.__parentWidget, title, str(thread.error))
+            return None
+        return thread.result
+
+    def analyze_duplicates(self):
+        """
+        找出由本插件复制的模组之间内容相同的文件，可选地用硬链接合并。
+        """
+        mods_path = Path(self._organizer.modsPath())
+        install_index = self._get_core().install_index
+        install_index.refresh()
+        install_index.save()
+        mod_folders = [mods_path / name for name in install_index.managed_mods()]
+        if not mod_folders:
+            QMessageBox.information(
+                self.__parentWidget, "重复文件", "还没有由本插件复制的模组"
+            )
+            return
+        analyzer = DedupAnalyzer(mod_folders, workers=self._copy_workers())
+        hash_store = self._data_path() / "file_hashes.sqlite"
+
+        def analyze(progress: Callable[[str, int, int], None]) -> DedupReport:
+            # 哈希缓存可能很大，也放在后台线程里读
+            analyzer.store = HashStore(hash_store)
+            return analyzer.run(progress)
+
+        report = self.run_task("分析重复文件", analyze, analyzer.cancel)
+        if not isinstance(report, DedupReport):
+            return
+
+        box = QMessageBox(self.__parentWidget)
+        box.setWindowTitle("重复文件")
+        box.setText(
+            f"扫描了 {report.mods} 个模组的 {report.files} 个文件 "
+            f"({format_bytes(report.bytes)})\n"
+            f"发现 {len(report.groups)} 组内容相同的文件，多出 "
+            f"{report.duplicate_files} 份，共 {format_bytes(report.wasted_bytes)}"
+        )
+        link_button = None
+        if report.groups:
+            box.setDetailedText(
+                "\n".join(
+                    f"{format_bytes(group.wasted_bytes)}  x{len(group.copies)}  "
+                    + ", ".join(
+                        os.path.relpath(copies[0].path, mods_path)
+                        for copies in group.copies
+                    )
+                    for group in report.groups[:200]
+                )
+            )
+            link_button = box.addButton(
+                "用硬链接合并", QMessageBox.ButtonRole.AcceptRole
+            )
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if link_button is None or box.clickedButton() is not link_button:
+            return
+        if (
+            QMessageBox.warning(
+                self.__parentWidget,
+                "用硬链接合并",
+                "合并后这些文件共用同一份数据，修改其中一个会同时改动所有模组里的副本。"
+                "是否继续？",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            )
+            != QMessageBox.StandardButton.Yes
+        ):
+            return
+        result = self.run_task(
+            "用硬链接合并",
+            lambda progress: hardlink_duplicates(report.groups, progress),
+        )
+        if not isinstance(result, tuple):
+            return
+        linked, saved, errors = result
+        box = QMessageBox(self.__parentWidget)
+        box.setWindowTitle("用硬链接合并")
+        box.setText(f"替换了 {linked} 个文件，释放了 {format_bytes(saved)}")
+        if errors:
+            box.setIcon(QMessageBox.Icon.Warning)
+            box.setInformativeText(f"{len(errors)} 个文件没有替换")
+            box.setDetailedText("\n".join(errors))
+        box.exec()
+
+    def _backup_root(self) -> Path:
+        path = self._setting("backup_path")
+        if isinstance(path, str) and path.strip():
+            return Path(path.strip())
+        return self._data_path() / "backups"
+
+    def backup_mods(self):
+        """
+        把由本插件复制的模组压缩备份，有上一次的快照时可以只备份变过的文件。
+        """
+        mods_path = Path(self._organizer.modsPath())
+        install_index = self._get_core().install_index
+        install_index.refresh()
+        install_index.save()
+        mod_names = install_index.managed_mods()
+        if not mod_names:
+            QMessageBox.information(
+                self.__parentWidget, "备份模组", "还没有由本插件复制的模组"
+            )
+            return
+        backup_root = self._backup_root()
+        snapshots = list_snapshots(backup_root)
+        base = snapshots[-1] if snapshots else None
+        box = QMessageBox(self.__parentWidget)
+        box.setWindowTitle("备份模组")
+        box.setText(f"将备份 {len(mod_names)} 个模组到\n{backup_root}")
+        incremental_button = None
+        if base is not None:
+            incremental_button = box.addButton(
+                "增量备份", QMessageBox.ButtonRole.AcceptRole
+            )
+            box.setInformativeText(f"增量备份只保存 {base.name} 之后变过的文件")
+        full_button = box.addButton("完整备份", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton(QMessageBox.StandardButton.Cancel)
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked is not full_button and clicked is not incremental_button:
+            return
+        writer = BackupWriter(
+            mods_path,
+            mod_names,
+            backup_root,
+            base if clicked is incremental_button else None,
+            self._copy_workers(),
+        )
+        snapshot = self.run_task("备份模组", writer.run, writer.cancel)
+        if not isinstance(snapshot, Snapshot):
+            return
+        QMessageBox.information(
+            self.__parentWidget,
+            "备份模组",
+            f"已备份 {len(snapshot.mods)} 个模组的 {snapshot.files} 个文件 "
+            f"({format_bytes(snapshot.bytes)})\n"
+            f"本次压缩了 {snapshot.stored_files} 个文件 "
+            f"({format_bytes(snapshot.stored_bytes)})\n{snapshot.path}",
+        )
+
+    def restore_backup(self):
+        """
+        从选中的快照恢复模组，同名的模组会被整个替换。
+        """
+        backup_root = self._backup_root()
+        snapshots = list_snapshots(backup_root)[::-1]
+        if not snapshots:
+            QMessageBox.information(
+                self.__parentWidget, "恢复备份", f"{backup_root} 里没有备份"
+            )
+            return
+        labels = [
+            f"{snapshot.name}  {len(snapshot.mods)} 个模组  "
+            f"{format_bytes(snapshot.bytes)}"
+            + ("  (增量)" if snapshot.base is not None else "")
+            for snapshot in snapshots
+        ]
+        label, ok = QInputDialog.getItem(
+            self.__parentWidget, "恢复备份", "选择快照", labels, 0, False
+        )
+        if not ok:
+            return
+        snapshot = snapshots[labels.index(label)]
+        if (
+            QMessageBox.warning(
+                self.__parentWidget,
+                "恢复备份",
+                f"将恢复 {len(snapshot.mods)} 个模组，MO2 里同名的模组会被替换。"
+                "是否继续？",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            )
+            != QMessageBox.StandardButton.Yes
+        ):
+            return
+        restorer = BackupRestorer(
+            snapshot,
+            backup_root,
+            Path(self._organizer.modsPath()),
+            workers=self._copy_workers(),
+        )
+        restored = self.run_task("恢复备份", restorer.run, restorer.cancel)
+        if not isinstance(restored, list):
+            return
+        for name in restored:
+            self._index_installed_mod(name)
+        if restored:
+            self._organizer.refresh()
+            self.refresh_workshop_items()
+        box = QMessageBox(self.__parentWidget)
+        box.setWindowTitle("恢复备份")
+        box.setText(f"已恢复 {len(restored)} 个模组")
+        if restorer.errors:
+            box.setIcon(QMessageBox.Icon.Warning)
+            box.setText(box.text() + f"，{len(restorer.errors)} 个失败")
+            box.setDetailedText(
+                "\n".join(f"{name}: {error}" for name, error in restorer.errors.items())
+            )
+        box.exec()
+
+    def show_conflicts(self):
+        """
+        显示由本插件复制的模组之间的文件冲突。
+        """
+        mods_path = Path(self._organizer.modsPath())
+        install_index = self._get_core().install_index
+        install_index.refresh()
+        install_index.save()
+        mod_names = install_index.managed_mods()
+        conflict_index = self.conflict_index
+        if conflict_index is None or conflict_index.mods_path != mods_path:
+            conflict_index = ConflictIndex(mods_path)
+
+            def build(progress: Callable[[str, int, int], None]) -> ConflictIndex:
+                conflict_index.build(mod_names, self._copy_workers(), progress)
+                return conflict_index
+
+            if self.run_task("文件冲突", build) is None:
+                return
+            self.conflict_index = conflict_index
+        else:
+            # 已经建好的索引只补上增删的模组
+            indexed = set(conflict_index.mods)
+            for name in indexed - set(mod_names):
+                conflict_index.remove_mod(name)
+            for name in set(mod_names) - indexed:
+                conflict_index.update_mod(name)
+        dialog = ConflictDialog(
+            conflict_index, conflict_index.conflict_counts(), self.__parentWidget
+        )
+        dialog.show()
+
+    def show_diagnostics(self):
+        dialog = DiagnosticsDialog(
+            self._data_path() / "diagnostics.json", self.__parentWidget
+        )
+        dialog.show()
+
+    def confirm_space(self, sources: list[Path]) -> bool:
+        """
+        安装前检查 MO2 模组文件夹所在分区的剩余空间，不够时询问是否仍然安装。
+        """
+        core = self._get_core()
+        use_links = self._use_links()
+        workers = self._scan_workers()
+        if len(sources) == 1:
+            # 一个模组遍历很快，不用弹进度窗口
+            try:
+                check = core.check_space(sources, use_links, workers)
+            except OSError as e:
+                QMessageBox.critical(self.__parentWidget, "安装失败", str(e))
+                return False
+        else:
+            check = self.run_task(
+                "检查剩余空间",
+                lambda progress: core.check_space(
+                    sources, use_links, workers, progress
+                ),
+            )
+            if not isinstance(check, SpaceCheck):
+                return False
+        logger.debug(f"install {check}")
+        if check.enough:
+            return True
+        return (
+            QMessageBox.question(
+                self.__parentWidget,
+                "剩余空间不足",
+                f"安装 {check.mods} 个模组大约需要 {format_bytes(check.required)}，"
+                f"\n{core.mods_path} 所在分区只剩 {format_bytes(check.free)}。"
+                "\n是否仍然安装？",
+                defaultButton=QMessageBox.StandardButton.No,
+            )
+            == QMessageBox.StandardButton.Yes
+        )
+
+    def update_mod(self, source: Path, dest: Path) -> bool:
+        """
+        增量更新已经复制过的创意工坊模组，重命名规则和 scopy_mod 一致。
+        """
+        core = self._get_core()
+        PublishedFileId = core.update_mod_id(source)
+        workers = self._copy_workers()
+        if not self.run_copy(
+            lambda: core.plan_update(source, dest, PublishedFileId, workers)
+        ):
+            return False
+        core.finish_update(dest, PublishedFileId)
+        return True
+
+    def scopy_mod(self, source: Path, dest: Path, is_from_workshop: bool) -> bool:
+        """
+        复制到 dest 旁边的临时文件夹，完成后才重命名到位；取消或失败时
+        临时文件夹留着，下次安装同一个模组到同一个名字时续装。
+        """
+        if not self.confirm_space([source]):
+            return False
+        # 检查空间时的遍历结果直接用来生成复制计划
+        install = StagedInstall(
+            source, dest, is_from_workshop, self._get_core().sizes.walk
+        )
+        try:
+            with diagnostics.span("scopy_mod.plan") as span:
+                plan = install.plan()
+                span.set(items=len(plan.files))
+            with diagnostics.span("scopy_mod.copy", len(plan.files), plan.total_bytes):
+                if not self.run_copy(plan, install.record_file):
+                    install.suspend()
+                    return False
+            with diagnostics.span("scopy_mod.finish"):
+                install.commit(self.workshop_items)
+        except OSError as e:
+            install.suspend()
+            QMessageBox.critical(self.__parentWidget, "安装失败", str(e))
+            return False
+        return True
+
+    def init_data(self):
+        # 先放一个空模型，数据由 start_scan 在后台逐步填充
+        self.data = []
+        self.model = MyTableModel(self.data)
+        button_delegate = ButtonDelegate(
+            self.handleButtonClicked, self.table_view
+        )  # 创建按钮委托实例
+        self.table_view.setItemDelegateForColumn(
+            3, button_delegate
+        )  # 在第一列使用按钮委托
+        self.proxy = ModFilterProxy(self.model)
+        self.table_view.setModel(self.proxy)
+        # 上一次打开的窗口留下的解码线程
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+            self.thumbnails = None
+        if thumbnail_size := self._thumbnail_size():
+            self.thumbnails = ThumbnailCache(
+                self._data_path() / "thumbnails", thumbnail_size
+            )
+            self.model.set_thumbnails(self.thumbnails)
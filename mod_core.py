@@ -0,0 +1,500 @@
+"""
+不依赖 Qt 和 mobase 的扫描、安装和更新，插件和命令行（cli.py）共用。
+
+一个 ModCore 对应一个 MO2 模组文件夹：找到 Steam 的各个库，读取 acf 和
+project.xml，得到表格里的每一行；安装和更新也在这里规划。插件只负责
+在 QThread 里调用这些方法并显示进度。
+"""
+
+import logging
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from . import diagnostics
+from .copy_engine import DEFAULT_WORKERS, CopyEngine, CopyProgress
+from .install_index import InstallIndex
+from .mod_installer import (
+    DEFAULT_INSTALL_JOBS,
+    InstallJob,
+    InstallQueue,
+    QueueProgress,
+    suggest_mod_name,
+)
+from .mod_record import NOT_COPIED, ModRecord
+from .mod_sizes import SizeCache, SpaceCheck, free_bytes, required_bytes
+from .mod_sync import SyncPlan
+from .mod_xml import dd_xml_data
+from .search_index import SearchIndex
+from .staleness import is_outdated, load_install_state
+from .steam_utils import discover_libraries, find_steam_path
+from .workshop_acf import WorkshopItem, parse_workshop_acf
+from .workshop_scan import DEFAULT_SCAN_WORKERS, iter_mod_xml
+from .xml_cache import ModXmlCache
+
+logger = logging.getLogger(__name__)
+
+GAME_ID = "262060"
+WORKSHOP_ACF = f"appworkshop_{GAME_ID}.acf"
+
+
+class WorkshopDiff:
+    """
+    两次读取之间的差异：新增的行、需要替换的行和已经不存在的 PublishedFileId。
+    """
+
+    __slots__ = ("added", "removed", "updated", "workshop_items")
+
+    def __init__(self, workshop_items: dict[str, WorkshopItem]):
+        self.added: list[ModRecord] = []
+        self.updated: list[ModRecord] = []
+        self.removed: list[str] = []
+        self.workshop_items = workshop_items
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+    def __repr__(self):
+        return f"WorkshopDiff(+{len(self.added)}, ~{len(self.updated)}, -{len(self.removed)})"
+
+
+class ModCore:
+    def __init__(
+        self, mods_path: Path, data_path: Path, steam_path: Path | None = None
+    ):
+        """
+        ``data_path`` 存放缓存和索引；``steam_path`` 为 None 时从注册表查找 Steam。
+        """
+        self.mods_path = mods_path
+        self.data_path = data_path
+        self.steam_path = steam_path
+        self.library_cache_file = data_path / "steam_libraries.json"
+        self.workshop_items: dict[str, WorkshopItem] = {}
+        self.install_index = InstallIndex(mods_path, data_path / "install_index.json")
+        # 扫描和刷新时顺带建立，搜索框直接查询
+        self.search_index = SearchIndex()
+        # 模组大小列和安装前的空间检查共用，安装时直接用它的遍历结果生成复制计划
+        self.sizes = SizeCache(data_path / "mod_sizes.json")
+
+    def open_xml_cache(self) -> ModXmlCache:
+        return ModXmlCache(self.data_path / "mod_xml_cache.sqlite")
+
+    def find_workshop_paths(self) -> list[Path]:
+        """
+        所有装了暗黑地牢创意工坊模组的 steamapps/workshop 文件夹。
+        """
+        with diagnostics.span("steam.discover_libraries") as span:
+            workshop_paths = self._find_workshop_paths()
+            span.set(items=len(workshop_paths))
+        return workshop_paths
+
+    def _find_workshop_paths(self) -> list[Path]:
+        workshop_paths: list[Path] = []
+        steam_path = self.steam_path or find_steam_path()
+        if steam_path is not None:
+            library_folders = discover_libraries(
+                steam_path / "steamapps" / "libraryfolders.vdf",
+                self.library_cache_file,
+            )
+            for library_folder in library_folders:
+                workshop_path = library_folder.path / "steamapps" / "workshop"
+                if (workshop_path / WORKSHOP_ACF).exists():
+                    workshop_paths.append(workshop_path)
+        logger.debug(f"Found {len(workshop_paths)} workshop: {workshop_paths}")
+        return workshop_paths
+
+    def read_workshop_state(
+        self,
+    ) -> tuple[dict[Path, dict[str, WorkshopItem]], dict[str, Path]]:
+        """
+        读取各个库的 acf，以及 MO2 里已经安装的创意工坊模组。
+        """
+        workshop_path_workshop_items: dict[Path, dict[str, WorkshopItem]] = {}
+        for workshop_path in self.find_workshop_paths():
+            acf_path = workshop_path / WORKSHOP_ACF
+            if acf_path.exists():
+                with diagnostics.span("workshop.parse_acf") as span:
+                    workshop_path_workshop_items[workshop_path] = parse_workshop_acf(
+                        acf_path
+                    )
+                    span.set(items=len(workshop_path_workshop_items[workshop_path]))
+                logger.debug(
+                    f"found {len(workshop_path_workshop_items[workshop_path])} mod-records in {workshop_path}"
+                )
+            else:
+                logger.debug(f"darkest_dungeon acf file not exist in {workshop_path}")
+        # PublishedFileId -> MO2 里的模组文件夹，文件夹名就是 MO2 的模组名
+        with diagnostics.span("install_index.refresh"):
+            self.install_index.refresh()
+            self.install_index.save()
+        mo_workshop_PublishedFileId: dict[str, Path] = {
+            PublishedFileId: self.mods_path / name
+            for PublishedFileId, name in self.install_index.workshop_mods().items()
+        }
+        return workshop_path_workshop_items, mo_workshop_PublishedFileId
+
+    def index_installed_mod(self, name: str):
+        self.install_index.update_mod(name)
+        self.install_index.save()
+
+    def diff_workshop_items(
+        self,
+        xml_cache: ModXmlCache,
+        known: dict[str, tuple[str, str | None, str]],
+    ) -> WorkshopDiff:
+        """
+        和表格现有的行比较，只重新解析新增、manifest 变了或 project.xml 变了的模组。
+
+        ``known`` 是 PublishedFileId -> (源路径, mo2 路径, manifest)。
+        """
+        workshop_path_workshop_items, mo_workshop_PublishedFileId = (
+            self.read_workshop_state()
+        )
+        workshop_items: dict[str, WorkshopItem] = {}
+        for i in workshop_path_workshop_items.values():
+            workshop_items.update(i)
+        diff = WorkshopDiff(workshop_items)
+        for game_workshop_path, items in workshop_path_workshop_items.items():
+            for PublishedFileId, item in items.items():
+                mod_folder = game_workshop_path / "content" / GAME_ID / PublishedFileId
+                mo_mod_folder = mo_workshop_PublishedFileId.get(PublishedFileId)
+                source_path = str(mod_folder.absolute())
+                mo2_path = None if mo_mod_folder is None else str(mo_mod_folder)
+                old = known.get(PublishedFileId)
+                xml_file = mod_folder / "project.xml"
+                if old == (source_path, mo2_path, item.manifest):
+                    # 只有 project.xml 本身变了（例如下载刚完成）才需要重新解析
+                    data, st = xml_cache.lookup(xml_file)
+                    if data is not None or st is None:
+                        continue
+                xml_data = xml_cache.parse(xml_file)
+                self._index_search(PublishedFileId, xml_data)
+                record = ModRecord(
+                    source_path,
+                    xml_data.mod_title,
+                    PublishedFileId,
+                    None if mo_mod_folder is None else mo_mod_folder.name,
+                    mo2_path,
+                )
+                load_install_state(record, mod_folder, mo_mod_folder)
+                (diff.added if old is None else diff.updated).append(record)
+        diff.removed = [
+            PublishedFileId
+            for PublishedFileId in known
+            if PublishedFileId not in workshop_items
+        ]
+        for PublishedFileId in diff.removed:
+            self.search_index.remove(PublishedFileId)
+        xml_cache.save(prune=False)
+        return diff
+
+    def iter_workshop_items(
+        self,
+        xml_cache: ModXmlCache,
+        workers: int = DEFAULT_SCAN_WORKERS,
+        use_processes: bool = False,
+        on_total: Callable[[int], None] | None = None,
+    ) -> Iterator[ModRecord]:
+        """
+        按表格的最终顺序逐行产出数据，找到的模组总数通过 ``on_total`` 通知。
+        """
+        workshop_path_workshop_items, mo_workshop_PublishedFileId = (
+            self.read_workshop_state()
+        )
+        for i in workshop_path_workshop_items.values():
+            self.workshop_items.update(i)
+        self.search_index.clear()
+        # 固定顺序：先按库的顺序，再按 acf 里的顺序；
+        # 然后和原来一样按 mo2 路径倒序稳定排序，这样可以边解析边按最终顺序显示
+        with diagnostics.span("scan.sort") as span:
+            mod_folders: list[tuple[str, Path]] = sorted(
+                (
+                    (
+                        PublishedFileId,
+                        game_workshop_path / "content" / GAME_ID / PublishedFileId,
+                    )
+                    for game_workshop_path, workshop_items in workshop_path_workshop_items.items()
+                    for PublishedFileId in workshop_items
+                ),
+                key=lambda x: (
+                    str(mo_workshop_PublishedFileId[x[0]])
+                    if x[0] in mo_workshop_PublishedFileId
+                    else NOT_COPIED
+                ),
+                reverse=True,
+            )
+            span.set(items=len(mod_folders))
+        if on_total is not None:
+            on_total(len(mod_folders))
+
+        xml_datas = iter_mod_xml(
+            (mod_folder / "project.xml" for _id, mod_folder in mod_folders),
+            xml_cache,
+            workers,
+            use_processes,
+        )
+        completed = False
+        try:
+            for (PublishedFileId, mod_folder), xml_data in zip(
+                mod_folders, xml_datas, strict=False
+            ):
+                mo_mod_folder = mo_workshop_PublishedFileId.get(PublishedFileId)
+                self._index_search(PublishedFileId, xml_data)
+                record = ModRecord(
+                    str(mod_folder.absolute()),
+                    xml_data.mod_title,
+                    PublishedFileId,
+                    None if mo_mod_folder is None else mo_mod_folder.name,
+                    None if mo_mod_folder is None else str(mo_mod_folder),
+                )
+                load_install_state(record, mod_folder, mo_mod_folder)
+                record.outdated = is_outdated(
+                    record, self.workshop_items.get(PublishedFileId)
+                )
+                yield record
+            completed = True
+        finally:
+            xml_datas.close()
+            # 扫描被取消时不清理缓存里没访问到的条目
+            xml_cache.save(prune=completed)
+
+    def _index_search(self, published_file_id: str, xml_data: dd_xml_data):
+        with diagnostics.span("search_index.add"):
+            self.search_index.add(
+                published_file_id,
+                xml_data.mod_title,
+                xml_data.mod_tags,
+                xml_data.mod_description,
+            )
+
+    def scan(
+        self, workers: int = DEFAULT_SCAN_WORKERS, use_processes: bool = False
+    ) -> list[ModRecord]:
+        return list(
+            self.iter_workshop_items(self.open_xml_cache(), workers, use_processes)
+        )
+
+    def iter_sizes(
+        self,
+        sources: list[str],
+        workers: int = DEFAULT_SCAN_WORKERS,
+        prune: bool = False,
+    ) -> Iterator[tuple[str, int, int]]:
+        """
+        并发统计每个源文件夹的 (源路径, 字节数, 文件数)，先完成的先产出；
+        读不到的文件夹大小和文件数都是 -1。``sources`` 是全部模组时给 ``prune``，
+        全部完成后删掉缓存里其他的源文件夹。
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="dd-size"
+        )
+        futures = {
+            executor.submit(self.sizes.size, Path(source)): source for source in sources
+        }
+        completed = False
+        try:
+            with diagnostics.span("sizes.measure", len(sources)):
+                for future in as_completed(futures):
+                    source = futures[future]
+                    try:
+                        total_bytes, file_count = future.result()
+                    except OSError as e:
+                        logger.debug(f"can not measure {source}: {e}")
+                        total_bytes, file_count = -1, -1
+                    yield source, total_bytes, file_count
+            completed = True
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if completed and prune:
+                self.sizes.prune(set(sources))
+            self.sizes.save()
+
+    def check_space(
+        self,
+        sources: list[Path],
+        use_links: bool = False,
+        workers: int = DEFAULT_SCAN_WORKERS,
+        progress: Callable[[str, int, int], None] | None = None,
+    ) -> SpaceCheck:
+        """
+        统计要安装的模组总共要占用的空间，和 MO2 模组文件夹所在分区的剩余空间比较。
+        遍历结果留在 ``sizes`` 里，随后的安装直接用来生成复制计划。
+        """
+        required = 0
+        with diagnostics.span("install.check_space", len(sources)) as span:
+            with ThreadPoolExecutor(
+                max_workers=max(1, workers), thread_name_prefix="dd-size"
+            ) as executor:
+                for done, walk in enumerate(executor.map(self.sizes.walk, sources), 1):
+                    required += required_bytes(walk, self.mods_path, use_links)
+                    if progress is not None:
+                        progress("统计模组大小", done, len(sources))
+            span.set(nbytes=required)
+        self.sizes.save()
+        return SpaceCheck(required, free_bytes(self.mods_path), len(sources))
+
+    def taken_names(self, extra: Iterable[str] = ()) -> set[str]:
+        """
+        已经被占用的模组名（casefold），``extra`` 是 MO2 里还没落到磁盘上的模组。
+        """
+        taken = {name.casefold() for name in extra}
+        if self.mods_path.is_dir():
+            taken.update(name.casefold() for name in os.listdir(self.mods_path))
+        return taken
+
+    def plan_installs(
+        self, records: Iterable[ModRecord], taken: set[str]
+    ) -> list[InstallJob]:
+        """
+        按模组标题自动命名，为还没复制过的模组生成安装任务，``taken`` 会被更新。
+        """
+        jobs: list[InstallJob] = []
+        for record in records:
+            if record.installed:
+                continue
+            name = suggest_mod_name(record.title, record.published_file_id, taken)
+            taken.add(name.casefold())
+            jobs.append(
+                InstallJob(
+                    Path(record.source_path),
+                    self.mods_path / name,
+                    name,
+                    record.is_workshop,
+                )
+            )
+        return jobs
+
+    def install_queue(
+        self,
+        jobs: list[InstallJob],
+        install_jobs: int = DEFAULT_INSTALL_JOBS,
+        copy_workers: int = DEFAULT_WORKERS,
+        use_links: bool = False,
+    ) -> InstallQueue:
+        return InstallQueue(
+            jobs,
+            self.workshop_items,
+            install_jobs,
+            copy_workers,
+            use_links,
+            self.sizes.walk,
+        )
+
+    def install(
+        self,
+        jobs: list[InstallJob],
+        install_jobs: int = DEFAULT_INSTALL_JOBS,
+        copy_workers: int = DEFAULT_WORKERS,
+        use_links: bool = False,
+        on_progress: Callable[[QueueProgress], None] | None = None,
+    ) -> list[InstallJob]:
+        """
+        运行批量安装并更新索引，返回成功安装的任务。
+        """
+        queue = self.install_queue(jobs, install_jobs, copy_workers, use_links)
+        queue.run(on_progress)
+        done = [job for job in jobs if job.done]
+        for job in done:
+            self.install_index.update_mod(job.name)
+        self.install_index.save()
+        return done
+
+    @staticmethod
+    def update_mod_id(source: Path) -> str:
+        return (
+            dd_xml_data.mod_xml_parser(source / "project.xml").mod_PublishedFileId
+            or source.name
+        )
+
+    def plan_update(
+        self,
+        source: Path,
+        dest: Path,
+        published_file_id: str,
+        workers: int = DEFAULT_WORKERS,
+    ) -> SyncPlan:
+        """
+        增量更新已经复制过的创意工坊模组：先删掉源里已经没有的文件，返回要复制的文件。
+        """
+        with diagnostics.span("update_mod.plan") as span:
+            plan = SyncPlan.build(source, dest, published_file_id, workers)
+            span.set(items=len(plan.files))
+        logger.debug(
+            f"update {dest}: {len(plan.files)} changed, "
+            f"{len(plan.deletions)} removed, {plan.unchanged} unchanged"
+        )
+        plan.apply_deletions()
+        return plan
+
+    def finish_update(self, dest: Path, published_file_id: str):
+        if published_file_id in self.workshop_items:
+            (dest / "project_file").mkdir(exist_ok=True)
+            (dest / "project_file" / f"w{published_file_id}.manifest").write_text(
+                self.workshop_items[published_file_id].manifest
+            )
+
+    def update_mod(
+        self,
+        record: ModRecord,
+        workers: int = DEFAULT_WORKERS,
+        use_links: bool = False,
+        on_progress: Callable[[CopyProgress], None] | None = None,
+    ) -> CopyProgress:
+        """
+        在当前线程里更新一个已经复制过的模组。
+
+        Raises:
+            CopyCancelled: 复制失败或被取消。
+        """
+        if record.mo2_path is None:
+            raise ValueError(f"{record.title} is not installed")
+        source = Path(record.source_path)
+        dest = Path(record.mo2_path)
+        published_file_id = self.update_mod_id(source)
+        plan = self.plan_update(source, dest, published_file_id, workers)
+        progress = CopyEngine(workers, use_links=use_links).run(plan, on_progress)
+        self.finish_update(dest, published_file_id)
+        self.index_installed_mod(dest.name)
+        return progress
+
+
+def record_to_dict(record: ModRecord) -> dict[str, object]:
+    """
+    导出 JSON 时一行的内容，字段和表格的列对应。
+    """
+    return {
+        "published_file_id": record.published_file_id,
+        "title": record.title,
+        "source_path": record.source_path,
+        "mo2_name": record.mo2_name,
+        "mo2_path": record.mo2_path,
+        "installed": record.installed,
+        "outdated": record.outdated,
+        "installed_manifest": record.installed_manifest,
+        "size_bytes": record.size_bytes,
+        "file_count": record.file_count,
+    }
+
+
+def enable_in_profile(profile_path: Path, names: Iterable[str]) -> int:
+    """
+    把模组加到 MO2 配置的 modlist.txt 顶部并启用，已经在列表里的保持原样。
+
+    MO2 运行时会覆盖这个文件，只能在 MO2 关闭时使用。返回新加入的模组数。
+    """
+    modlist = profile_path / "modlist.txt"
+    try:
+        lines = modlist.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        lines = []
+    # 第一行可能是 MO2 写的注释
+    header = [line for line in lines[:1] if line.startswith("#")]
+    body = lines[len(header) :]
+    listed = {line[1:].casefold() for line in body if line[:1] in "+-*"}
+    added = [f"+{name}" for name in names if name.casefold() not in listed]
+    if added:
+        tmp_file = modlist.with_name(modlist.name + ".tmp")
+        tmp_file.write_text("\n".join(header + added + body) + "\n", encoding="utf-8")
+        os.replace(tmp_file, modlist)
+    return len(added)
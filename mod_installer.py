@@ -0,0 +1,460 @@
+"""
+模组安装：复制完成后的重命名和清单处理，以及批量安装队列。
+
+不依赖 Qt 和 mobase，插件里用 QThread 包一层显示进度；批量安装时每个模组
+一个任务，同时运行的任务数有上限，单个任务失败不影响其他任务。
+
+安装先复制到目标旁边的 ``.<模组名>.installing`` 文件夹，旁边的日志文件
+逐行记下已经复制完的文件；全部完成并整理好之后才一次重命名成模组文件夹，
+安装过程不会写源文件夹。被取消或 MO2 崩溃时
+临时文件夹留着，下次安装同一个模组到同一个名字时按日志跳过已经复制好的文件。
+"""
+
+import logging
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .copy_engine import (
+    DEFAULT_WORKERS,
+    PROGRESS_INTERVAL,
+    CopyCancelled,
+    CopyEngine,
+    CopyItem,
+    CopyPlan,
+    CopyProgress,
+    TreeWalk,
+    walk_tree,
+)
+from .defaults import DEFAULT_INSTALL_JOBS
+from .install_staging import InstallJournal, journal_path, staging_path
+from .mod_xml import dd_xml_data
+from .workshop_acf import WorkshopItem
+
+logger = logging.getLogger(__name__)
+
+MAX_FILENAME_LENGTH = 255
+_ILLEGAL_CHARS = re.compile(r'[\\/:*?"<>|]')
+_RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL"} | {
+    f"{prefix}{i}" for prefix in ("COM", "LPT") for i in range(1, 10)
+}
+
+
+def is_valid_filename(filename: str) -> bool:
+    """
+    验证给定的字符串是否是有效的文件名。
+    """
+    # 检查文件名是否为空
+    if not filename:
+        return False
+    # 检查文件名是否包含非法字符
+    # Windows: \ / : * ? " < > |
+    # Unix: /
+    if _ILLEGAL_CHARS.search(filename):
+        return False
+    # 检查文件名是否以空格或点开头，是否以空格结尾
+    if filename.startswith((" ", ".")) or filename.endswith(" "):
+        return False
+    # 检查文件名长度是否超过操作系统限制
+    if len(filename) > MAX_FILENAME_LENGTH:
+        return False
+    # 检查文件名是否为保留名称（Windows 特定）
+    if os.name == "nt":
+        name, _ext = os.path.splitext(filename)
+        if name.upper() in _RESERVED_NAMES:
+            return False
+    return True
+
+
+def suggest_mod_name(title: str, published_file_id: str, taken: set[str]) -> str:
+    """
+    根据模组标题生成一个合法且不重名的 MO2 模组名。
+
+    ``taken`` 是已经占用的名字（casefold 之后），Windows 上文件夹名不区分大小写；
+    重名时在后面加上 PublishedFileId。
+    """
+    suffix = f" ({published_file_id})"
+    name = _ILLEGAL_CHARS.sub("_", title).strip().lstrip(".").strip()
+    name = name[: MAX_FILENAME_LENGTH - len(suffix) - 8].rstrip()
+    if not is_valid_filename(name):
+        name = published_file_id
+    if name.casefold() not in taken:
+        return name
+    if not name.endswith(suffix):
+        name += suffix
+    candidate = name
+    index = 2
+    while candidate.casefold() in taken:
+        candidate = f"{name[: -len(suffix)]} ({published_file_id}-{index})"
+        index += 1
+    return candidate
+
+
+def finish_install(
+    source: Path,
+    dest: Path,
+    is_from_workshop: bool,
+    workshop_items: dict[str, WorkshopItem],
+) -> None:
+    """
+    复制完成后整理模组文件夹：删除上传器生成的文件，把 project.xml 和预览图
+    挪到 project_file / preview_file 下，并写入清单文件。不会写源文件夹。
+    """
+    if is_from_workshop:
+        PublishedFileId = dd_xml_data.mod_xml_parser(
+            source / "project.xml"
+        ).mod_PublishedFileId
+        mo_mod_folder = dest
+        log_file = mo_mod_folder / "steam_workshop_uploader.log"
+        txt_file = mo_mod_folder / "modfiles.txt"
+        xml_file = mo_mod_folder / "project.xml"
+        preview_file = mo_mod_folder / "preview_icon.png"
+        manifest_file = mo_mod_folder / "project_file" / f"w{PublishedFileId}.manifest"
+
+        (mo_mod_folder / "preview_file").mkdir(exist_ok=True)
+        (mo_mod_folder / "project_file").mkdir(exist_ok=True)
+
+        if txt_file.exists():
+            txt_file.unlink()
+        if log_file.exists():
+            log_file.unlink()
+
+        if preview_file.exists():
+            preview_file.rename(
+                mo_mod_folder / "preview_file" / f"{PublishedFileId}.png"
+            )
+
+        if xml_file.exists():
+            xml_file.rename(mo_mod_folder / "project_file" / f"{PublishedFileId}.xml")
+            # project.xml 里的 id 和 acf 对不上时清单留空，扫描时仍能认出已安装
+            item = workshop_items.get(PublishedFileId)
+            manifest_file.write_text(item.manifest if item is not None else "")
+    else:
+        id = str(random.randint(1, 9999999))
+        mo_mod_folder = dest
+        preview_file = mo_mod_folder / "preview_icon.png"
+        txt_file = mo_mod_folder / "modfiles.txt"
+        xml_file = mo_mod_folder / "project.xml"
+        log_file = mo_mod_folder / "steam_workshop_uploader.log"
+
+        if log_file.exists():
+            log_file.unlink()
+        if txt_file.exists():
+            txt_file.unlink()
+        # 旧版本安装时写进源文件夹的 l<id>.manifest，跟着复制过来了
+        for stale in mo_mod_folder.glob("l*.manifest"):
+            stale.unlink()
+
+        (mo_mod_folder / "preview_file").mkdir(exist_ok=True)
+        if preview_file.exists():
+            preview_file.rename(mo_mod_folder / "preview_file" / f"{id}.png")
+
+        (mo_mod_folder / "project_file").mkdir(exist_ok=True)
+        if xml_file.exists():
+            xml_file.rename(xml_file.parent / "project_file" / f"{id}.xml")
+            (xml_file.parent / "project_file" / f"l{id}.manifest").write_text(
+                "", encoding="utf-8"
+            )
+
+
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class StagedInstall:
+    """
+    把 ``source`` 原子地安装到 ``dest``：先复制到临时文件夹，完成后再重命名。
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        dest: Path,
+        is_workshop: bool,
+        walk: Callable[[Path], TreeWalk] = walk_tree,
+    ):
+        self.source = source
+        self.dest = dest
+        self.is_workshop = is_workshop
+        # 遍历源文件夹的函数，传入 SizeCache.walk 时沿用检查空间时的遍历结果
+        self._walk = walk
+        self.staging = staging_path(dest)
+        self.journal = InstallJournal(journal_path(self.staging), source)
+        # 从上一次中断的安装里直接沿用的文件
+        self.resumed_files = 0
+        self.resumed_bytes = 0
+
+    def plan(self) -> CopyPlan:
+        """
+        生成复制到临时文件夹的计划，跳过日志里记录过、源文件也没变的文件。
+        """
+        if self.dest.exists():
+            raise FileExistsError(f"模组已存在: {self.dest}")
+        done = self.journal.load() if self.staging.is_dir() else {}
+        if not done:
+            self.discard()
+        full = CopyPlan.from_walk(self._walk(self.source), self.staging)
+        plan = CopyPlan(self.source, self.staging)
+        plan.folders = full.folders
+        kept: dict[str, tuple[int, int]] = {}
+        for item in full.files:
+            rel_path = item.dest.relative_to(self.staging).as_posix()
+            entry = done.get(rel_path)
+            if (
+                entry is not None
+                and entry == (item.size, _mtime_ns(item.source))
+                and _file_size(item.dest) == item.size
+            ):
+                kept[rel_path] = entry
+                self.resumed_files += 1
+                self.resumed_bytes += item.size
+            else:
+                plan.files.append(item)
+        if self.resumed_files:
+            logger.info(
+                f"resume install of {self.dest.name}: "
+                f"{self.resumed_files} files already copied"
+            )
+        self.staging.mkdir(parents=True, exist_ok=True)
+        self.journal.open(kept)
+        return plan
+
+    def record_file(self, item: CopyItem):
+        """
+        传给 CopyEngine.run 的 on_file，在复制线程里调用。
+        """
+        mtime_ns = _mtime_ns(item.source)
+        if mtime_ns is not None:
+            self.journal.append(
+                item.dest.relative_to(self.staging).as_posix(), item.size, mtime_ns
+            )
+
+    def commit(self, workshop_items: dict[str, WorkshopItem]):
+        """
+        整理临时文件夹并重命名成模组文件夹。整理时先删掉日志，
+        之后再中断的临时文件夹不会被续装，只会被清理。
+        """
+        self.journal.remove()
+        finish_install(self.source, self.staging, self.is_workshop, workshop_items)
+        os.rename(self.staging, self.dest)
+
+    def suspend(self):
+        """
+        复制被取消或出错时关闭日志，临时文件夹留给下次续装。
+        """
+        self.journal.close()
+
+    def discard(self):
+        self.journal.remove()
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+
+def _file_size(path: Path) -> int | None:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return None
+
+
+class InstallJob:
+    __slots__ = ("dest", "done", "error", "is_workshop", "name", "source")
+
+    def __init__(self, source: Path, dest: Path, name: str, is_workshop: bool):
+        self.source = source
+        self.dest = dest
+        self.name = name
+        self.is_workshop = is_workshop
+        self.error: Exception | None = None
+        # 既没完成也没有错误的任务是被取消的
+        self.done = False
+
+    def __repr__(self):
+        return f"InstallJob({self.source} -> {self.name})"
+
+
+class QueueProgress:
+    __slots__ = (
+        "bytes_done",
+        "bytes_total",
+        "current_job",
+        "elapsed",
+        "jobs_done",
+        "jobs_failed",
+        "jobs_total",
+    )
+
+    def __init__(self, jobs_total: int):
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.jobs_total = jobs_total
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.elapsed = 0.0
+        self.current_job = ""
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_done / self.elapsed
+
+    @property
+    def permille(self) -> int:
+        if self.bytes_total <= 0:
+            finished = self.jobs_done + self.jobs_failed
+            return int(finished * 1000 / self.jobs_total) if self.jobs_total else 1000
+        return int(self.bytes_done * 1000 / self.bytes_total)
+
+    def copy(self) -> "QueueProgress":
+        other = QueueProgress(self.jobs_total)
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+
+class InstallQueue:
+    """
+    同时安装多个模组。
+
+    先并发遍历所有源文件夹得到总字节数，然后最多 ``workers`` 个模组同时复制，
+    每个模组内部再用 ``copy_workers`` 个线程复制文件。每个任务都是一次
+    StagedInstall，失败或取消的任务不会留下模组文件夹，再次安装时续装；
+    错误记在 ``InstallJob.error`` 里。
+    """
+
+    def __init__(
+        self,
+        jobs: Iterable[InstallJob],
+        workshop_items: dict[str, WorkshopItem],
+        workers: int = DEFAULT_INSTALL_JOBS,
+        copy_workers: int = DEFAULT_WORKERS,
+        use_links: bool = False,
+        walk: Callable[[Path], TreeWalk] = walk_tree,
+    ):
+        self.jobs = list(jobs)
+        self.workshop_items = workshop_items
+        self.workers = max(1, workers)
+        self.copy_workers = max(1, copy_workers)
+        self.use_links = use_links
+        self._walk = walk
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._engines: set[CopyEngine] = set()
+        self._progress = QueueProgress(len(self.jobs))
+        self._start = 0.0
+        self._last_report = 0.0
+        self._on_progress: Callable[[QueueProgress], None] | None = None
+
+    def cancel(self):
+        self._cancel_event.set()
+        with self._lock:
+            engines = list(self._engines)
+        for engine in engines:
+            engine.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def run(
+        self, on_progress: Callable[[QueueProgress], None] | None = None
+    ) -> QueueProgress:
+        """
+        执行所有任务，返回最终进度；各任务的结果看 ``jobs``。
+        """
+        self._on_progress = on_progress
+        self._progress = QueueProgress(len(self.jobs))
+        self._start = time.perf_counter()
+        self._last_report = 0.0
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="dd-install"
+        ) as executor:
+            plans = list(executor.map(self._plan, self.jobs))
+            with self._lock:
+                # 续装时已经复制好的部分不算在内
+                self._progress.bytes_total = sum(
+                    plan.total_bytes for _install, plan in plans if plan is not None
+                )
+            self._report(force=True)
+            for _ in executor.map(self._install, self.jobs, plans):
+                pass
+        self._progress.elapsed = time.perf_counter() - self._start
+        self._report(force=True)
+        return self._progress.copy()
+
+    def _plan(self, job: InstallJob) -> tuple[StagedInstall, CopyPlan | None]:
+        install = StagedInstall(job.source, job.dest, job.is_workshop, self._walk)
+        if self.cancelled:
+            return install, None
+        try:
+            return install, install.plan()
+        except Exception as e:
+            logger.exception(f"plan {job.source} failed")
+            install.suspend()
+            job.error = e
+            with self._lock:
+                self._progress.jobs_failed += 1
+            return install, None
+
+    def _install(self, job: InstallJob, planned: tuple[StagedInstall, CopyPlan | None]):
+        install, plan = planned
+        if plan is None:
+            return
+        if self.cancelled:
+            install.suspend()
+            return
+        engine = CopyEngine(self.copy_workers, use_links=self.use_links)
+        copied = 0
+
+        def on_copy_progress(p: CopyProgress):
+            nonlocal copied
+            with self._lock:
+                self._progress.bytes_done += p.bytes_done - copied
+                self._progress.current_job = job.name
+            copied = p.bytes_done
+            self._report()
+
+        with self._lock:
+            self._engines.add(engine)
+        try:
+            engine.run(plan, on_copy_progress, install.record_file)
+            install.commit(self.workshop_items)
+            job.done = True
+        except CopyCancelled:
+            install.suspend()
+        except Exception as e:
+            logger.exception(f"install {job.source} failed")
+            job.error = e
+            install.suspend()
+        finally:
+            with self._lock:
+                self._engines.discard(engine)
+                if job.done:
+                    self._progress.jobs_done += 1
+                else:
+                    # 没有装好的模组不算进度，复制好的文件留在临时文件夹里续装
+                    self._progress.bytes_done -= copied
+                    if job.error is not None:
+                        self._progress.jobs_failed += 1
+            self._report(force=True)
+
+    def _report(self, force: bool = False):
+        if self._on_progress is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self._last_report < PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self._on_progress(snapshot)
@@ -0,0 +1,58 @@
+import sys
+
+# 还没有复制进 MO2 的模组在表格里显示的文字，也用作排序键
+NOT_COPIED = "尚未复制"
+
+
+class ModRecord:
+    """
+    表格里的一行：一个创意工坊模组以及它在 MO2 里的副本（如果有）。
+    """
+
+    __slots__ = (
+        "file_count",
+        "installed_manifest",
+        "installed_mtime_ns",
+        "is_workshop",
+        "mo2_name",
+        "mo2_path",
+        "outdated",
+        "published_file_id",
+        "size_bytes",
+        "source_mtime_ns",
+        "source_path",
+        "title",
+    )
+
+    def __init__(
+        self,
+        source_path: str,
+        title: str,
+        published_file_id: str,
+        mo2_name: str | None = None,
+        mo2_path: str | None = None,
+        is_workshop: bool = True,
+    ):
+        self.source_path = source_path
+        self.title = title
+        # 同一个 id 会同时出现在索引和清单文件名里，驻留后只保存一份
+        self.published_file_id = sys.intern(published_file_id)
+        self.mo2_name = mo2_name
+        self.mo2_path = mo2_path
+        self.is_workshop = is_workshop
+        # MO2 副本里 w<id>.manifest 的内容和修改时间，由 staleness.load_install_state 填充
+        self.installed_manifest: str | None = None
+        self.installed_mtime_ns = 0
+        # 创意工坊文件夹的修改时间
+        self.source_mtime_ns = 0
+        self.outdated = False
+        # 创意工坊文件夹的大小和文件数，由 ModCore.iter_sizes 在扫描后填充，-1 表示还不知道
+        self.size_bytes = -1
+        self.file_count = -1
+
+    @property
+    def installed(self) -> bool:
+        return self.mo2_name is not None
+
+    def __repr__(self):
+        return f"ModRecord({self.published_file_id}, {self.title}, {self.mo2_name})"
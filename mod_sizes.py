@@ -0,0 +1,212 @@
+"""
+每个模组的大小和文件数，以及安装前的剩余空间检查。
+
+大小来自 copy_engine.walk_tree 的一次遍历，按源文件夹路径缓存。文件增删或改名
+都会改变所在文件夹的 mtime，所以只要每个文件夹的 mtime 都没变，缓存的大小就
+还能用，检查时只 stat 文件夹而不是每个文件。大小和文件夹 mtime 存到磁盘，
+下次打开窗口时不用重新遍历；完整的文件列表只留在内存里，安装时直接拿来生成
+复制计划，同一个模组不会为了算大小和复制各遍历一次。
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .copy_engine import CopyPlan, TreeWalk, walk_tree
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+# 内存里保留完整文件列表的文件总数，超过时丢掉最久没用的遍历结果
+MAX_WALK_FILES = 200_000
+# 安装后至少还要剩下的空间，留给 MO2 和游戏写日志、存档
+FREE_SPACE_MARGIN = 64 * 1024 * 1024
+
+
+class _SizeEntry:
+    __slots__ = ("dir_mtimes", "file_count", "total_bytes")
+
+    def __init__(self, dir_mtimes: dict[str, int], total_bytes: int, file_count: int):
+        self.dir_mtimes = dir_mtimes
+        self.total_bytes = total_bytes
+        self.file_count = file_count
+
+
+def _unchanged(root: Path, dir_mtimes: dict[str, int]) -> bool:
+    try:
+        return all(
+            os.stat(root / rel if rel else root).st_mtime_ns == mtime_ns
+            for rel, mtime_ns in dir_mtimes.items()
+        )
+    except OSError:
+        return False
+
+
+class SizeCache:
+    """
+    源文件夹路径 -> 大小和文件数，可以在多个线程里同时使用。
+    """
+
+    def __init__(self, cache_file: Path, max_walk_files: int = MAX_WALK_FILES):
+        self.cache_file = cache_file
+        self.max_walk_files = max_walk_files
+        self._entries: dict[str, _SizeEntry] = {}
+        self._walks: OrderedDict[str, TreeWalk] = OrderedDict()
+        self._walk_files = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                raw = json.load(f)
+            if raw["version"] != CACHE_VERSION:
+                return
+            self._entries = {
+                path: _SizeEntry(dir_mtimes, total_bytes, file_count)
+                for path, (dir_mtimes, total_bytes, file_count) in raw["mods"].items()
+            }
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.debug(f"size cache {self.cache_file} is broken, rebuilding: {e}")
+            self._entries = {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            raw = {
+                "version": CACHE_VERSION,
+                "mods": {
+                    path: [entry.dir_mtimes, entry.total_bytes, entry.file_count]
+                    for path, entry in self._entries.items()
+                },
+            }
+            self._dirty = False
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(raw, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            logger.exception(f"failed to save size cache {self.cache_file}")
+
+    def size(self, source: Path) -> tuple[int, int]:
+        """
+        返回 (字节数, 文件数)，缓存过期时重新遍历。
+        """
+        key = str(source)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and _unchanged(source, entry.dir_mtimes):
+            return entry.total_bytes, entry.file_count
+        walk = self.walk(source)
+        return walk.total_bytes, walk.file_count
+
+    def walk(self, source: Path) -> TreeWalk:
+        """
+        返回 ``source`` 的完整遍历结果，内存里的结果还有效时直接返回。
+        """
+        key = str(source)
+        with self._lock:
+            walk = self._walks.get(key)
+        if walk is not None and _unchanged(source, walk.dir_mtimes):
+            with self._lock:
+                if key in self._walks:
+                    self._walks.move_to_end(key)
+            return walk
+        walk = walk_tree(source)
+        with self._lock:
+            self._entries[key] = _SizeEntry(
+                walk.dir_mtimes, walk.total_bytes, walk.file_count
+            )
+            self._dirty = True
+            old = self._walks.pop(key, None)
+            if old is not None:
+                self._walk_files -= old.file_count
+            self._walks[key] = walk
+            self._walk_files += walk.file_count
+            while self._walk_files > self.max_walk_files and len(self._walks) > 1:
+                _old_key, old = self._walks.popitem(last=False)
+                self._walk_files -= old.file_count
+        return walk
+
+    def discard(self, source: Path):
+        key = str(source)
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+            old = self._walks.pop(key, None)
+            if old is not None:
+                self._walk_files -= old.file_count
+
+    def prune(self, keep: set[str]):
+        """
+        删掉不在 ``keep`` 里的源文件夹，扫描完整结束后调用。
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key not in keep]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._dirty = True
+
+
+def required_bytes(walk: TreeWalk, dest_dir: Path, use_links: bool) -> int:
+    """
+    把 ``walk`` 安装到 ``dest_dir`` 下大约要占用的空间。链接模式下同一分区的文件
+    不占空间，只算必须真实复制的几个文件。
+    """
+    if use_links:
+        try:
+            same_volume = os.stat(walk.root).st_dev == os.stat(dest_dir).st_dev
+        except OSError:
+            same_volume = False
+        if same_volume:
+            return sum(
+                size for rel_path, size in walk.files if CopyPlan.must_copy(rel_path)
+            )
+    return walk.total_bytes
+
+
+def free_bytes(path: Path) -> int:
+    """
+    ``path`` 所在分区的剩余空间，``path`` 还不存在时看最近的上级文件夹。
+    """
+    for folder in (path, *path.parents):
+        if folder.exists():
+            return shutil.disk_usage(folder).free
+    raise FileNotFoundError(path)
+
+
+class SpaceCheck:
+    """
+    安装前的空间检查结果。
+    """
+
+    __slots__ = ("free", "mods", "required")
+
+    def __init__(self, required: int, free: int, mods: int):
+        self.required = required
+        self.free = free
+        self.mods = mods
+
+    @property
+    def enough(self) -> bool:
+        # 全部是链接时不占空间，不受余量限制
+        return self.required == 0 or self.free - self.required >= FREE_SPACE_MARGIN
+
+    def __repr__(self):
+        return (
+            f"SpaceCheck({self.mods} mods, required={self.required}, free={self.free})"
+        )
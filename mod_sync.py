@@ -0,0 +1,150 @@
+"""
+增量更新已经复制到 MO2 的模组：只复制新增或改动的文件，删除源里已经没有的文件。
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .conflict_index import IGNORED_ROOT_ENTRIES
+from .copy_engine import DEFAULT_WORKERS, CopyItem, CopyPlan
+
+# scopy_mod 复制完会删除的文件
+REMOVED_FILES = ("modfiles.txt", "steam_workshop_uploader.log")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: Path) -> bytes:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.digest()
+
+
+def _scan(root: Path) -> tuple[dict[str, os.stat_result], set[str]]:
+    """
+    遍历文件夹，返回 {相对路径: stat} 和所有子文件夹的相对路径（统一用 / 分隔）。
+    """
+    files: dict[str, os.stat_result] = {}
+    folders: set[str] = set()
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        try:
+            entries = list(os.scandir(root / rel))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            rel_path = f"{rel}/{entry.name}" if rel else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                folders.add(rel_path)
+                stack.append(rel_path)
+            else:
+                files[rel_path] = entry.stat(follow_symlinks=False)
+    return files, folders
+
+
+def _is_mo2_entry(rel_path: str) -> bool:
+    """
+    MO2 的 meta.ini 和 scopy_mod 生成的文件夹（以及里面的文件）不在源里，
+    更新时既不能当成多余文件删掉，也不能被源里的同名文件覆盖。
+    """
+    return rel_path.split("/", 1)[0].casefold() in IGNORED_ROOT_ENTRIES
+
+
+class SyncPlan(CopyPlan):
+    """
+    源文件夹到已有 MO2 模组的差异：``files`` 是要复制的文件，``deletions`` 是要删除的文件。
+    """
+
+    def __init__(self, source: Path, dest: Path):
+        super().__init__(source, dest)
+        self.deletions: list[Path] = []
+        self.unchanged = 0
+
+    @staticmethod
+    def dest_name(rel_path: str, mod_id: str) -> str | None:
+        """
+        源里的相对路径在 MO2 模组里对应的位置，和 scopy_mod 的重命名保持一致。
+        """
+        if rel_path == "project.xml":
+            return f"project_file/{mod_id}.xml"
+        if rel_path == "preview_icon.png":
+            return f"preview_file/{mod_id}.png"
+        if rel_path in REMOVED_FILES or _is_mo2_entry(rel_path):
+            return None
+        return rel_path
+
+    @classmethod
+    def build(
+        cls, source: Path, dest: Path, mod_id: str, workers: int = DEFAULT_WORKERS
+    ) -> "SyncPlan":
+        plan = cls(source, dest)
+        source_files, source_folders = _scan(source)
+        dest_files, dest_folders = _scan(dest)
+
+        expected: set[str] = set()
+        unclear: list[CopyItem] = []
+        for rel_path, src_stat in source_files.items():
+            dest_rel = cls.dest_name(rel_path, mod_id)
+            if dest_rel is None:
+                continue
+            expected.add(dest_rel)
+            item = CopyItem(
+                source / rel_path,
+                dest / dest_rel,
+                src_stat.st_size,
+                not cls.must_copy(rel_path),
+            )
+            dest_stat = dest_files.get(dest_rel)
+            if dest_stat is None or dest_stat.st_size != src_stat.st_size:
+                plan.files.append(item)
+            elif dest_stat.st_mtime_ns == src_stat.st_mtime_ns:
+                plan.unchanged += 1
+            else:
+                # 大小一样但时间不一样（比如不同文件系统的时间精度不同），比较内容
+                unclear.append(item)
+
+        if unclear:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                same = executor.map(
+                    lambda item: file_digest(item.source) == file_digest(item.dest),
+                    unclear,
+                )
+                for item, is_same in zip(unclear, same, strict=True):
+                    if is_same:
+                        plan.unchanged += 1
+                        # 同步时间，下次比较就不用再算哈希
+                        shutil.copystat(item.source, item.dest)
+                    else:
+                        plan.files.append(item)
+
+        for dest_rel in dest_files:
+            if _is_mo2_entry(dest_rel):
+                continue
+            if dest_rel not in expected:
+                plan.deletions.append(dest / dest_rel)
+        for folder in sorted(dest_folders, reverse=True):
+            if _is_mo2_entry(folder):
+                continue
+            if folder not in source_folders:
+                plan.deletions.append(dest / folder)
+        plan.folders = [dest / folder for folder in sorted(source_folders)]
+        return plan
+
+    def apply_deletions(self):
+        # 先删文件，再从深到浅删空文件夹
+        for path in self.deletions:
+            try:
+                if path.is_dir() and not path.is_symlink():
+                    path.rmdir()
+                else:
+                    if not os.access(path, os.W_OK):
+                        path.chmod(stat.S_IWRITE | stat.S_IREAD)
+                    path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,153 @@
+import re
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from xml.etree import ElementTree as ET
+from xml.etree.ElementTree import Element
+
+_READ_SIZE = 256 * 1024
+_XML_DECLARATION = re.compile(rb"(?:\xef\xbb\xbf)?<\?xml([^>]*)\?>")
+_ENCODING = re.compile(rb"encoding\s*=\s*[\"']([\w.:-]+)[\"']")
+_SCALAR_FIELDS = (
+    "Title",
+    "VersionMajor",
+    "VersionMinor",
+    "TargetBuild",
+    "ItemDescription",
+    "PublishedFileId",
+)
+
+
+class dd_xml_data:
+    mod_title: str
+    mod_versions: list[int]
+    mod_tags: list[str]
+    mod_description: str
+    mod_PublishedFileId: str
+
+    def __init__(
+        self,
+        mod_title: str,
+        mod_versions: list[int],
+        mod_tags: list[str],
+        mod_description: str,
+        mod_PublishedFileId: str,
+    ):
+        self.mod_title = mod_title
+        self.mod_versions = mod_versions
+        self.mod_tags = mod_tags
+        self.mod_description = mod_description
+        self.mod_PublishedFileId = mod_PublishedFileId
+
+    @classmethod
+    def etree_text_iter(cls, tree: Element, name: str):
+        for elem in tree.iter(name):
+            if isinstance(elem.text, str):
+                return elem.text
+        return ""
+
+    @staticmethod
+    def _is_utf8(head: bytes) -> bool:
+        declaration = _XML_DECLARATION.match(head)
+        if declaration is None:
+            return True
+        encoding = _ENCODING.search(declaration.group(1))
+        return encoding is None or encoding.group(1).lower() in (b"utf-8", b"utf8")
+
+    @classmethod
+    def _events(
+        cls, xml_file: str | Path, binary: bool
+    ) -> Iterator[tuple[str, Element]]:
+        parser = ET.XMLPullParser(events=("start", "end"))
+        # 文本模式和原来一样按 utf-8 读取并忽略非法字符
+        with open(
+            xml_file,
+            "rb" if binary else "r",
+            encoding=None if binary else "utf-8",
+            errors=None if binary else "ignore",
+        ) as f:
+            first = True
+            while chunk := f.read(_READ_SIZE):
+                if first:
+                    # 和原来的 strip() 一样，去掉声明前的空白
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                    first = False
+                    if binary and not cls._is_utf8(chunk):
+                        # 声明了其他编码，原来的解析会忽略声明按 utf-8 处理
+                        raise ET.ParseError("not a utf-8 document")
+                parser.feed(chunk)
+                yield from parser.read_events()
+        if first:
+            raise ET.ParseError("no element found")
+        parser.close()
+        yield from parser.read_events()
+
+    @classmethod
+    def _extract_fields(cls, events: Iterable[tuple[str, Element]]):
+        """
+        一次遍历取出所有字段，找齐后就停止。
+
+        每个字段取文档中第一个有文本的同名元素，和 etree_text_iter 一致；
+        Tags 按出现顺序收集所有非空文本。解析出错时抛出 ParseError。
+        """
+        fields: dict[str, str] = {}
+        # Tags 可以嵌套，按开始标签的顺序占位，结束时再填文本
+        tags: list[str | None] = []
+        open_tags: list[int] = []
+        tags_closed = False
+        depth = 0
+        for event, elem in events:
+            if event == "start":
+                depth += 1
+                if elem.tag == "Tags":
+                    open_tags.append(len(tags))
+                    tags.append(None)
+                continue
+            depth -= 1
+            tag = elem.tag
+            if tag == "Tags":
+                tags[open_tags.pop()] = elem.text
+                if not open_tags:
+                    tags_closed = True
+            elif tag in _SCALAR_FIELDS and tag not in fields and elem.text is not None:
+                fields[tag] = elem.text
+            if depth == 1:
+                # 根节点的直接子节点用完就释放，长描述不会一直留在内存里
+                elem.clear()
+                if tags_closed and len(fields) == len(_SCALAR_FIELDS):
+                    break
+        mod_tags = [t for t in tags if isinstance(t, str) and t.strip()]
+        return fields, mod_tags
+
+    @classmethod
+    def _parse_fields(cls, xml_file: str | Path):
+        try:
+            # 直接把 utf-8 字节交给 expat，省掉整个文件的解码和再编码
+            return cls._extract_fields(cls._events(xml_file, binary=True))
+        except ET.ParseError:
+            # 有非法字节等情况时，按原来的文本方式再试一次
+            return cls._extract_fields(cls._events(xml_file, binary=False))
+
+    @classmethod
+    def mod_xml_parser(cls, xml_file: str | Path):
+        mod_title: str = ""
+        mod_versions: list[int] = [0, 0, 0]
+        mod_tags: list[str] = []
+        mod_description: str = ""
+        mod_PublishedFileId: str = ""
+        try:
+            fields, tags = cls._parse_fields(xml_file)
+            mod_title = fields.get("Title") or mod_title
+            mod_title = re.sub(r'[\/:*?"<>|]', "_", mod_title).strip()
+            mod_versions[0] = int(fields.get("VersionMajor") or mod_versions[0])
+            mod_versions[1] = int(fields.get("VersionMinor") or mod_versions[1])
+            mod_versions[2] = int(fields.get("TargetBuild") or mod_versions[2])
+            mod_description = fields.get("ItemDescription") or mod_description
+            mod_PublishedFileId = fields.get("PublishedFileId") or mod_PublishedFileId
+            mod_tags.extend(tags)
+        except Exception:
+            pass
+        return cls(
+            mod_title, mod_versions, mod_tags, mod_description, mod_PublishedFileId
+        )
@@ -0,0 +1,192 @@
+"""
+模组标题、标签和描述的倒排索引。
+
+扫描时每解析一个 project.xml 就把它加进索引，搜索框每次输入只查索引，
+不再逐行做子串比较。英文等用空白分隔的文字按词索引，查询的每个词按前缀匹配，
+方便边输入边筛选；中日韩文字没有分隔，按单字和相邻两字索引，查询时
+长度大于一的片段拆成相邻两字取交集。所有文字先做 NFKC 规范化并 casefold，
+全角字母和大小写都不影响匹配。
+"""
+
+import bisect
+import re
+import sys
+import threading
+import unicodedata
+from collections.abc import Iterable
+
+# 中日韩文字（假名、汉字、谚文）
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_TOKEN = re.compile(rf"([{_CJK_CHARS}]+)|([^\W_{_CJK_CHARS}]+)")
+_CJK_RUN = re.compile(rf"[{_CJK_CHARS}]+")
+_WORD = re.compile(rf"[^\W_{_CJK_CHARS}]+")
+# 描述只索引开头这么多字，很长的描述后面多半是更新日志
+DESCRIPTION_CHARS = 8192
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _split(text: str) -> Iterable[tuple[str, str]]:
+    """
+    产出 (中日韩片段, "") 或 ("", 单词)。
+    """
+    for match in _TOKEN.finditer(normalize(text)):
+        yield match.group(1) or "", match.group(2) or ""
+
+
+def _grams(run: str) -> set[str]:
+    grams = set(run)
+    grams.update(run[i : i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+class SearchIndex:
+    def __init__(self):
+        # 词 / 字 -> 包含它的 PublishedFileId
+        self._words: dict[str, set[str]] = {}
+        self._grams: dict[str, set[str]] = {}
+        # 前缀查找用的有序词表，索引变化后查询时再重建
+        self._sorted_words: list[str] = []
+        self._sorted_dirty = False
+        # 标签 -> PublishedFileId，标签保留第一次见到的写法
+        self._tags: dict[str, set[str]] = {}
+        self._tag_names: dict[str, str] = {}
+        # PublishedFileId -> (词, 字, 标签)，删除和更新时用
+        self._docs: dict[str, tuple[set[str], set[str], set[str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(
+        self, published_file_id: str, title: str, tags: list[str], description: str
+    ):
+        """
+        加入或替换一个模组，可以在扫描线程里调用。
+        """
+        text = normalize("\n".join((title, description[:DESCRIPTION_CHARS], *tags)))
+        # 描述里同一个词会出现很多次，先按空白切开去重，正则只处理不同的片段
+        words: set[str] = set()
+        runs: set[str] = set()
+        for chunk in set(text.split()):
+            words.update(_WORD.findall(chunk))
+            runs.update(_CJK_RUN.findall(chunk))
+        words = {sys.intern(word) for word in words}
+        grams: set[str] = set()
+        for run in runs:
+            grams |= _grams(run)
+        tag_keys = {normalize(tag.strip()) for tag in tags if tag.strip()}
+        with self._lock:
+            self._remove(published_file_id)
+            self._docs[published_file_id] = (words, grams, tag_keys)
+            for word in words:
+                ids = self._words.get(word)
+                if ids is None:
+                    ids = self._words[word] = set()
+                    self._sorted_dirty = True
+                ids.add(published_file_id)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(published_file_id)
+            for tag in tags:
+                key = normalize(tag.strip())
+                if key:
+                    self._tag_names.setdefault(key, tag.strip())
+                    self._tags.setdefault(key, set()).add(published_file_id)
+
+    def remove(self, published_file_id: str):
+        with self._lock:
+            self._remove(published_file_id)
+
+    def clear(self):
+        with self._lock:
+            self._words.clear()
+            self._grams.clear()
+            self._sorted_words = []
+            self._sorted_dirty = False
+            self._tags.clear()
+            self._tag_names.clear()
+            self._docs.clear()
+
+    def _remove(self, published_file_id: str):
+        doc = self._docs.pop(published_file_id, None)
+        if doc is None:
+            return
+        words, grams, tag_keys = doc
+        for postings, keys in (
+            (self._words, words),
+            (self._grams, grams),
+            (self._tags, tag_keys),
+        ):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is None:
+                    continue
+                ids.discard(published_file_id)
+                if not ids:
+                    del postings[key]
+                    if postings is self._words:
+                        self._sorted_dirty = True
+                    elif postings is self._tags:
+                        self._tag_names.pop(key, None)
+
+    def _prefix(self, prefix: str) -> set[str]:
+        if self._sorted_dirty:
+            self._sorted_words = sorted(self._words)
+            self._sorted_dirty = False
+        words = self._sorted_words
+        start = bisect.bisect_left(words, prefix)
+        # 一个词完全相等时不用合并
+        end = bisect.bisect_left(words, prefix + "\U0010ffff", start)
+        if end - start == 1:
+            return self._words[words[start]]
+        return set().union(*(self._words[word] for word in words[start:end]))
+
+    def search(self, query: str, tag: str | None = None) -> set[str] | None:
+        """
+        返回同时匹配查询里所有词和 ``tag`` 的 PublishedFileId；
+        查询为空且没有标签时返回 None，表示不筛选。
+        """
+        terms = list(_split(query))
+        if not terms and not tag:
+            return None
+        with self._lock:
+            # 先算结果小的，交集尽早变小
+            candidates: list[set[str]] = []
+            if tag:
+                candidates.append(self._tags.get(normalize(tag), set()))
+            for run, word in terms:
+                if word:
+                    candidates.append(self._prefix(word))
+                elif len(run) == 1:
+                    candidates.append(self._grams.get(run, set()))
+                else:
+                    candidates.extend(
+                        self._grams.get(run[i : i + 2], set())
+                        for i in range(len(run) - 1)
+                    )
+            candidates.sort(key=len)
+            result = set(candidates[0])
+            for ids in candidates[1:]:
+                if not result:
+                    break
+                result &= ids
+            return result
+
+    def facets(self, ids: set[str] | None = None) -> list[tuple[str, int]]:
+        """
+        ``ids``（默认全部模组）里每个标签的模组数，按数量从多到少排列。
+        """
+        with self._lock:
+            counts = [
+                (
+                    self._tag_names[key],
+                    len(tagged) if ids is None else len(tagged & ids),
+                )
+                for key, tagged in self._tags.items()
+            ]
+        return sorted(
+            ((name, count) for name, count in counts if count),
+            key=lambda item: (-item[1], normalize(item[0])),
+        )
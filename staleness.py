@@ -0,0 +1,67 @@
+"""
+判断复制到 MO2 的模组是否落后于创意工坊。
+
+比较 MO2 副本里保存的 w<id>.manifest 和 acf 里当前的 manifest；清单为空
+或 acf 里没有 manifest 时，退回比较创意工坊文件夹、acf 的 timeupdated 和
+清单文件的修改时间。读文件只发生在扫描时，之后的判断全在内存里完成。
+"""
+
+import os
+from collections.abc import Iterable
+from pathlib import Path
+
+from .mod_record import ModRecord
+from .workshop_acf import WorkshopItem
+
+
+def load_install_state(
+    record: ModRecord, source_folder: Path, mo_mod_folder: Path | None
+):
+    """
+    读取判断是否过期所需的信息：创意工坊文件夹的 mtime 和 MO2 副本的清单。
+    """
+    try:
+        record.source_mtime_ns = os.stat(source_folder).st_mtime_ns
+    except OSError:
+        record.source_mtime_ns = 0
+    record.installed_manifest = None
+    record.installed_mtime_ns = 0
+    if mo_mod_folder is None:
+        return
+    manifest_file = (
+        mo_mod_folder / "project_file" / f"w{record.published_file_id}.manifest"
+    )
+    try:
+        with open(manifest_file, encoding="utf-8", errors="replace") as f:
+            record.installed_manifest = f.read().strip()
+        record.installed_mtime_ns = os.stat(manifest_file).st_mtime_ns
+    except OSError:
+        pass
+
+
+def is_outdated(record: ModRecord, item: WorkshopItem | None) -> bool:
+    if not record.installed or record.installed_manifest is None or item is None:
+        return False
+    if record.installed_manifest and item.manifest:
+        return record.installed_manifest != item.manifest
+    # 没有 manifest 可比时看创意工坊是不是在复制之后又改过
+    try:
+        timeupdated_ns = int(item.timeupdated) * 1_000_000_000
+    except ValueError:
+        timeupdated_ns = 0
+    return max(record.source_mtime_ns, timeupdated_ns) > record.installed_mtime_ns
+
+
+def update_outdated(
+    records: Iterable[ModRecord], workshop_items: dict[str, WorkshopItem]
+) -> list[int]:
+    """
+    重新计算每一行是否过期，返回结果有变化的行号。
+    """
+    changed: list[int] = []
+    for row, record in enumerate(records):
+        outdated = is_outdated(record, workshop_items.get(record.published_file_id))
+        if outdated != record.outdated:
+            record.outdated = outdated
+            changed.append(row)
+    return changed
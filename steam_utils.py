@@ -1,7 +1,8 @@
 # Code greatly inspired by https://github.com/LostDragonist/steam-library-setup-tool
 
+import json
+import os
 import sys
-import winreg
 from pathlib import Path
 from typing import TypedDict, cast
 
@@ -29,8 +30,9 @@ class _AppManifest(TypedDict):
     AppState: _AppState
 
 
-class _LibraryFolder(TypedDict):
+class _LibraryFolder(TypedDict, total=False):
     path: str
+    apps: dict[str, str]
 
 
 class _LibraryFolders(TypedDict, total=False):
@@ -38,46 +40,85 @@ class _LibraryFolders(TypedDict, total=False):
     LibraryFolders: dict[str, str]
 
 
+def _read_app_manifest(filepath: Path) -> SteamGame | None:
+    try:
+        with open(filepath, "r", encoding="utf-8") as fp:
+            info = cast(
+                _AppManifest,
+                vdf.load(fp),  # pyright: ignore[reportUnknownMemberType]
+            )
+            app_state = info["AppState"]
+    except KeyError:
+        print(
+            f'Unable to read application state from "{filepath}"',
+            file=sys.stderr,
+        )
+        return None
+    except Exception as e:
+        print(f'Unable to parse file "{filepath}": {e}', file=sys.stderr)
+        return None
+
+    try:
+        return SteamGame(app_state["appid"], app_state["installdir"])
+    except KeyError:
+        print(
+            f'Unable to read application ID or installation folder from "{filepath}"',
+            file=sys.stderr,
+        )
+        return None
+
+
 class LibraryFolder:
-    def __init__(self, path: Path):
+    """
+    A Steam library. The app manifests are only read when ``games`` or
+    ``find_game`` is used.
+    """
+
+    def __init__(self, path: Path, apps: list[str] | None = None):
         self.path = path
+        # app ids from the new libraryfolders.vdf format, None when unknown
+        self.apps = apps
+        self._games: dict[str, SteamGame] | None = None
+        self._steamapps_mtime: int | None = None
 
-        self.games: list[SteamGame] = []
-        for filepath in path.joinpath("steamapps").glob("appmanifest_*.acf"):
-            try:
-                with open(filepath, "r", encoding="utf-8") as fp:
-                    info = cast(
-                        _AppManifest,
-                        vdf.load(fp),  # pyright: ignore[reportUnknownMemberType]
-                    )
-                    app_state = info["AppState"]
-            except KeyError:
-                print(
-                    f'Unable to read application state from "{filepath}"',
-                    file=sys.stderr,
-                )
-                continue
-            except Exception as e:
-                print(f'Unable to parse file "{filepath}": {e}', file=sys.stderr)
-                continue
-
-            try:
-                app_id = app_state["appid"]
-                install_dir = app_state["installdir"]
-                self.games.append(SteamGame(app_id, install_dir))
-            except KeyError:
-                print(
-                    f"Unable to read application ID or installation folder "
-                    f'from "{filepath}"',
-                    file=sys.stderr,
-                )
-                continue
+    def _steamapps_signature(self) -> int | None:
+        try:
+            return self.path.joinpath("steamapps").stat().st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def games(self) -> list[SteamGame]:
+        if self._games is None or self._steamapps_mtime != self._steamapps_signature():
+            self._steamapps_mtime = self._steamapps_signature()
+            self._games = {}
+            for filepath in self.path.joinpath("steamapps").glob("appmanifest_*.acf"):
+                game = _read_app_manifest(filepath)
+                if game is not None:
+                    self._games[game.appid] = game
+        return list(self._games.values())
+
+    def find_game(self, appid: str) -> SteamGame | None:
+        """
+        Look up a single game, reading only its own app manifest.
+        """
+        if self.apps is not None and appid not in self.apps:
+            return None
+        if (
+            self._games is not None
+            and self._steamapps_mtime == self._steamapps_signature()
+        ):
+            return self._games.get(appid)
+        filepath = self.path.joinpath("steamapps", f"appmanifest_{appid}.acf")
+        if not filepath.exists():
+            return None
+        return _read_app_manifest(filepath)
 
     def __repr__(self):
         return str(self)
 
     def __str__(self):
-        return "LibraryFolder at {}: {}".format(self.path, self.games)
+        return "LibraryFolder at {}: {}".format(self.path, self.apps)
 
 
 def parse_library_info(library_vdf_path: Path) -> list[LibraryFolder]:
@@ -120,13 +161,16 @@ def parse_library_info(library_vdf_path: Path) -> list[LibraryFolder]:
         except ValueError:
             continue
 
+        apps: list[str] | None = None
         if isinstance(value, str):
             path = value
         else:
             path = value["path"]
+            if "apps" in value:
+                apps = list(value["apps"].keys())
 
         try:
-            library_folders.append(LibraryFolder(Path(path)))
+            library_folders.append(LibraryFolder(Path(path), apps))
         except Exception as e:
             print(
                 'Failed to read steam library from "{}", {}'.format(path, repr(e)),
@@ -136,6 +180,127 @@ def parse_library_info(library_vdf_path: Path) -> list[LibraryFolder]:
     return library_folders
 
 
+class _CachedLibraries:
+    def __init__(
+        self, signature: dict[str, int | None], libraries: list[LibraryFolder]
+    ):
+        self.signature = signature
+        self.libraries = libraries
+
+
+# per process cache of discover_libraries, keyed by libraryfolders.vdf path
+_library_cache: dict[Path, _CachedLibraries] = {}
+
+_CACHE_VERSION = 1
+
+
+def _mtime_ns(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _library_signature(
+    library_vdf_path: Path, libraries: list[LibraryFolder]
+) -> dict[str, int | None]:
+    signature = {str(library_vdf_path): _mtime_ns(library_vdf_path)}
+    for library in libraries:
+        steamapps = library.path / "steamapps"
+        signature[str(steamapps)] = _mtime_ns(steamapps)
+    return signature
+
+
+def _load_library_cache(
+    cache_file: Path, library_vdf_path: Path
+) -> _CachedLibraries | None:
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if raw["version"] != _CACHE_VERSION or raw["vdf"] != str(library_vdf_path):
+            return None
+        libraries: list[LibraryFolder] = []
+        for item in raw["libraries"]:
+            library = LibraryFolder(Path(item["path"]), item["apps"])
+            if item["games"] is not None:
+                library._games = {
+                    appid: SteamGame(appid, installdir)
+                    for appid, installdir in item["games"].items()
+                }
+                library._steamapps_mtime = item["steamapps_mtime"]
+            libraries.append(library)
+        return _CachedLibraries(raw["signature"], libraries)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_library_cache(
+    cache_file: Path, library_vdf_path: Path, cached: _CachedLibraries
+):
+    raw = {
+        "version": _CACHE_VERSION,
+        "vdf": str(library_vdf_path),
+        "signature": cached.signature,
+        "libraries": [
+            {
+                "path": str(library.path),
+                "apps": library.apps,
+                "games": None
+                if library._games is None
+                else {g.appid: g.installdir for g in library._games.values()},
+                "steamapps_mtime": library._steamapps_mtime,
+            }
+            for library in cached.libraries
+        ],
+    }
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f'Unable to write library cache "{cache_file}": {e}', file=sys.stderr)
+
+
+def discover_libraries(
+    library_vdf_path: Path, cache_file: Path | None = None
+) -> list[LibraryFolder]:
+    """
+    Same as parse_library_info, but memoized per process and optionally
+    persisted to ``cache_file``.
+
+    The result is reused as long as the mtime of libraryfolders.vdf and of
+    every library's steamapps folder is unchanged.
+    """
+    cached = _library_cache.get(library_vdf_path)
+    if cached is None and cache_file is not None:
+        cached = _load_library_cache(cache_file, library_vdf_path)
+    if cached is not None and cached.signature == _library_signature(
+        library_vdf_path, cached.libraries
+    ):
+        _library_cache[library_vdf_path] = cached
+        return cached.libraries
+
+    libraries = parse_library_info(library_vdf_path)
+    cached = _CachedLibraries(
+        _library_signature(library_vdf_path, libraries), libraries
+    )
+    _library_cache[library_vdf_path] = cached
+    if cache_file is not None:
+        _save_library_cache(cache_file, library_vdf_path, cached)
+    return libraries
+
+
+def save_library_cache(library_vdf_path: Path, cache_file: Path):
+    """
+    Persist the games read lazily since the last discover_libraries call.
+    """
+    cached = _library_cache.get(library_vdf_path)
+    if cached is not None:
+        _save_library_cache(cache_file, library_vdf_path, cached)
+
+
 def find_steam_path() -> Path | None:
     """
     Retrieve the Steam path, if available.
@@ -143,6 +308,12 @@ def find_steam_path() -> Path | None:
     Returns:
         The Steam path, or None if Steam is not installed.
     """
+    try:
+        # winreg only exists on Windows; importing it here keeps the rest of
+        # the module usable elsewhere
+        import winreg
+    except ImportError:
+        return None
     try:
         with winreg.OpenKey(winreg.HKEY_CURRENT_USER, "Software\\Valve\\Steam") as key:
             value = winreg.QueryValueEx(key, "SteamExe")
@@ -151,10 +322,13 @@ def find_steam_path() -> Path | None:
         return None
 
 
-def find_games() -> dict[str, Path]:
+def find_games(cache_file: Path | None = None) -> dict[str, Path]:
     """
     Find the list of Steam games installed.
 
+    Args:
+        cache_file: Optional file used to persist the library discovery.
+
     Returns:
         A mapping from Steam game ID to install locations for available
         Steam games.
@@ -166,7 +340,7 @@ def find_games() -> dict[str, Path]:
     library_vdf_path = steam_path.joinpath("steamapps", "libraryfolders.vdf")
 
     try:
-        library_folders = parse_library_info(library_vdf_path)
+        library_folders = list(discover_libraries(library_vdf_path, cache_file))
         library_folders.append(LibraryFolder(steam_path))
     except FileNotFoundError:
         return {}
@@ -178,9 +352,40 @@ def find_games() -> dict[str, Path]:
                 "steamapps", "common", game.installdir
             )
 
+    if cache_file is not None:
+        save_library_cache(library_vdf_path, cache_file)
     return games
 
 
+def find_game(appid: str, cache_file: Path | None = None) -> Path | None:
+    """
+    Find the install location of a single Steam game.
+
+    Uses the ``apps`` map of libraryfolders.vdf to pick the library, so only
+    that game's app manifest is read.
+
+    Returns:
+        The install location, or None if the game is not installed.
+    """
+    steam_path = find_steam_path()
+    if not steam_path:
+        return None
+
+    library_vdf_path = steam_path.joinpath("steamapps", "libraryfolders.vdf")
+
+    try:
+        library_folders = list(discover_libraries(library_vdf_path, cache_file))
+    except FileNotFoundError:
+        library_folders = []
+    library_folders.append(LibraryFolder(steam_path))
+
+    for library in library_folders:
+        game = library.find_game(appid)
+        if game is not None:
+            return Path(library.path).joinpath("steamapps", "common", game.installdir)
+    return None
+
+
 if __name__ == "__main__":
     games = find_games()
     for k, v in games.items():
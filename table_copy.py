@@ -1,4 +1,5 @@
 import logging
+import os
 import typing
 from typing import Callable, Literal
 
@@ -7,9 +8,10 @@ from PyQt6.QtCore import (
     QAbstractTableModel,
     QEvent,
     QModelIndex,
+    QSortFilterProxyModel,
     Qt,
 )
-from PyQt6.QtGui import QPainter
+from PyQt6.QtGui import QImage, QPainter
 from PyQt6.QtWidgets import (
     QApplication,
     QStyle,
@@ -19,49 +21,267 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from .copy_engine import format_bytes
+from .mod_record import NOT_COPIED, ModRecord
+from .staleness import update_outdated
+from .thumbnails import ThumbnailCache
+from .workshop_acf import WorkshopItem
+
 logger = logging.getLogger(__name__)
 
+# 视图每次向模型多要的行数
+FETCH_BATCH = 200
+COLUMN_HEADERS = [
+    "mod 路径",
+    "mod 名",
+    "已存在",
+    "-》",
+    "mo2 名",
+    "mo2 路径",
+    "创意工坊模组",
+    "已过期",
+    "预览",
+    "大小",
+]
+OUTDATED_COLUMN = 7
+PREVIEW_COLUMN = 8
+SIZE_COLUMN = 9
+
 
 # 自定义数据模型类，继承自 QAbstractTableModel
 class MyTableModel(QAbstractTableModel):
-    def __init__(self, data: list[list[str]]):
+    def __init__(self, data: list[ModRecord]):
         super().__init__()
-        self._data = data  # 存储表格数据
+        self._data = data  # 存储表格数据，后台扫描到的行会追加在后面
+        # 已经交给视图的行数，其余的行等视图滚动到底部时通过 fetchMore 插入
+        self._loaded = 0
+        # PublishedFileId / 源路径 -> 行号
+        self._by_id: dict[str, int] = {}
+        self._by_source: dict[str, int] = {}
+        self._reindex(0)
+        # 预览图列的缩略图，没有设置时这一列为空
+        self.thumbnails: ThumbnailCache | None = None
+
+    def set_thumbnails(self, thumbnails: ThumbnailCache | None):
+        if self.thumbnails is not None:
+            self.thumbnails.ready.disconnect(self._on_thumbnail_ready)
+        self.thumbnails = thumbnails
+        if thumbnails is not None:
+            thumbnails.ready.connect(self._on_thumbnail_ready)
+
+    def _on_thumbnail_ready(self, source_path: str):
+        row = self._by_source.get(source_path)
+        if row is not None and row < self._loaded:
+            index = self.index(row, PREVIEW_COLUMN)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def thumbnail(self, record: ModRecord) -> QImage | None:
+        if self.thumbnails is None:
+            return None
+        # 创意工坊里的 preview_icon.png，找不到时用 MO2 副本里挪走的那份
+        paths = [os.path.join(record.source_path, "preview_icon.png")]
+        if record.mo2_path is not None:
+            paths.append(
+                os.path.join(
+                    record.mo2_path,
+                    "preview_file",
+                    f"{record.published_file_id}.png",
+                )
+            )
+        return self.thumbnails.get(record.source_path, tuple(paths))
+
+    def _reindex(self, start: int):
+        for row in range(start, len(self._data)):
+            record = self._data[row]
+            self._by_id[record.published_file_id] = row
+            self._by_source[record.source_path] = row
+
+    def append_rows(self, rows: list[ModRecord]):
+        start = len(self._data)
+        self._data.extend(rows)
+        self._reindex(start)
+
+    def replace_record(self, row: int, record: ModRecord):
+        """
+        用重新扫描得到的记录替换一行，源路径变了也能找到。
+        """
+        old = self._data[row]
+        if self.thumbnails is not None:
+            self.thumbnails.discard(old.source_path)
+        if self._by_source.get(old.source_path) == row:
+            del self._by_source[old.source_path]
+        self._data[row] = record
+        self._by_id[record.published_file_id] = row
+        self._by_source[record.source_path] = row
+        self.update_row(row)
+
+    def remove_rows(self, rows: list[int]):
+        """
+        删除若干行，已经交给视图的行会通知视图。
+        """
+        for row in sorted(set(rows), reverse=True):
+            if row < self._loaded:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._data[row]
+                self._loaded -= 1
+                self.endRemoveRows()
+            else:
+                del self._data[row]
+        # 删除后后面的行号都变了，索引整个重建
+        self._by_id.clear()
+        self._by_source.clear()
+        self._reindex(0)
+
+    def record(self, row: int) -> ModRecord:
+        return self._data[row]
+
+    def row_of_id(self, published_file_id: str) -> int | None:
+        return self._by_id.get(published_file_id)
+
+    def row_of_source(self, source_path: str) -> int | None:
+        return self._by_source.get(source_path)
+
+    def update_row(self, row: int):
+        """
+        记录被修改后通知视图刷新这一行。
+        """
+        if row < self._loaded:
+            self.dataChanged.emit(
+                self.index(row, 0), self.index(row, len(COLUMN_HEADERS) - 1)
+            )
+
+    def set_installed(self, row: int, mo2_name: str | None, mo2_path: str | None):
+        record = self._data[row]
+        record.mo2_name = mo2_name
+        record.mo2_path = mo2_path
+        if self.thumbnails is not None:
+            # 可能多了 MO2 副本里的预览图可以用
+            self.thumbnails.discard(record.source_path)
+        self.update_row(row)
+
+    def update_outdated(self, workshop_items: dict[str, WorkshopItem]) -> int:
+        """
+        按当前的 acf 重新判断每一行是否过期，返回过期的行数。
+        """
+        changed = [
+            row
+            for row in update_outdated(self._data, workshop_items)
+            if row < self._loaded
+        ]
+        if changed:
+            self.dataChanged.emit(
+                self.index(changed[0], OUTDATED_COLUMN),
+                self.index(changed[-1], OUTDATED_COLUMN),
+            )
+        return sum(1 for record in self._data if record.outdated)
+
+    def set_sizes(self, sizes: list[tuple[str, int, int]]):
+        """
+        填入后台统计到的 (源路径, 字节数, 文件数)。
+        """
+        changed: list[int] = []
+        for source_path, size_bytes, file_count in sizes:
+            row = self._by_source.get(source_path)
+            if row is None:
+                continue
+            record = self._data[row]
+            record.size_bytes = size_bytes
+            record.file_count = file_count
+            if row < self._loaded:
+                changed.append(row)
+        if changed:
+            self.dataChanged.emit(
+                self.index(min(changed), SIZE_COLUMN),
+                self.index(max(changed), SIZE_COLUMN),
+            )
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if parent.isValid():
+            return False
+        return self._loaded < len(self._data)
+
+    def fetchMore(self, parent: QModelIndex):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._data) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def fetch_all(self):
+        """
+        一次插入所有剩下的行。筛选时被过滤掉的行不会让视图继续 fetchMore。
+        """
+        if self._loaded < len(self._data):
+            self.beginInsertRows(QModelIndex(), self._loaded, len(self._data) - 1)
+            self._loaded = len(self._data)
+            self.endInsertRows()
+
+    def display_text(self, record: ModRecord, column: int) -> str:
+        if column == 0:
+            return record.source_path
+        if column == 1:
+            return record.title
+        if column == 2:
+            return " 1" if record.installed else ""
+        if column == 4:
+            return record.mo2_name or NOT_COPIED
+        if column == 5:
+            return record.mo2_path or NOT_COPIED
+        if column == 6:
+            return "1" if record.is_workshop else ""
+        if column == OUTDATED_COLUMN:
+            return "过期" if record.outdated else ""
+        if column == SIZE_COLUMN:
+            return format_bytes(record.size_bytes) if record.size_bytes >= 0 else ""
+        return ""
 
     def data(
         self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole
-    ) -> Literal[Qt.CheckState.Checked, Qt.CheckState.Unchecked] | str | None:
+    ) -> (
+        Literal[Qt.CheckState.Checked, Qt.CheckState.Unchecked]
+        | Qt.AlignmentFlag
+        | QImage
+        | str
+        | None
+    ):
         if role == Qt.ItemDataRole.DisplayRole:
             # 返回显示角色的数据
-            return self._data[index.row()][index.column()]
+            return self.display_text(self._data[index.row()], index.column())
         elif (
             role == Qt.ItemDataRole.CheckStateRole and index.column() == 2
         ):  # 假设第二列有复选框
             # 返回复选框的状态
-            value = self._data[index.row()][index.column()]
-            return Qt.CheckState.Checked if value else Qt.CheckState.Unchecked
-        return None
-
-    def setData(
-        self, index: QModelIndex, value: str, role: int = Qt.ItemDataRole.CheckStateRole
-    ) -> bool:
-        if role == Qt.ItemDataRole.CheckStateRole and index.column() == 2:
-            # 设置复选框的状态
-            self._data[index.row()][index.column()] = (
-                "1" if value == Qt.CheckState.Checked else ""
+            return (
+                Qt.CheckState.Checked
+                if self._data[index.row()].installed
+                else Qt.CheckState.Unchecked
             )
-            self.dataChanged.emit(index, index, [role])  # 发出数据改变信号
-            return True
-        self.dataChanged.emit(index, index, [role])
-        return True
+        elif (
+            role == Qt.ItemDataRole.DecorationRole and index.column() == PREVIEW_COLUMN
+        ):
+            # 只有画到的单元格才会取这个角色，所以只解码可见的行
+            return self.thumbnail(self._data[index.row()])
+        elif index.column() == SIZE_COLUMN:
+            if role == Qt.ItemDataRole.TextAlignmentRole:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            if role == Qt.ItemDataRole.ToolTipRole:
+                record = self._data[index.row()]
+                if record.file_count >= 0:
+                    return f"{record.file_count} 个文件，{record.size_bytes} 字节"
+        return None
 
     def rowCount(self, parent: QModelIndex) -> int:  # type: ignore
-        # 返回行数
-        return len(self._data)
+        # 返回已经插入的行数
+        if parent.isValid():
+            return 0
+        return self._loaded
 
     def columnCount(self, parent: QModelIndex) -> int:  # type: ignore
         # 返回列数
-        return len(self._data[0])
+        return len(COLUMN_HEADERS)
 
     def flags(self, index: QModelIndex) -> Qt.ItemFlag:
         if index.column() == 3:
@@ -74,19 +294,55 @@ class MyTableModel(QAbstractTableModel):
         # 表头仅显示文本信息
         if role == Qt.ItemDataRole.DisplayRole:
             if orientation == Qt.Orientation.Horizontal:
-                return [
-                    "mod 路径",
-                    "mod 名",
-                    "已存在",
-                    "-》",
-                    "mo2 名",
-                    "mo2 路径",
-                    "创意工坊模组",
-                ][section]
+                return COLUMN_HEADERS[section]
             elif orientation == Qt.Orientation.Vertical:
                 return str(section + 1)  # 假设行号从1开始
 
 
+class ModFilterProxy(QSortFilterProxyModel):
+    """
+    排序和筛选用的代理模型，视图里的行号要通过 mapToSource 换成 MyTableModel 的行号。
+    """
+
+    def __init__(self, model: MyTableModel):
+        super().__init__()
+        self._model = model
+        self.outdated_only = False
+        # 搜索结果的 PublishedFileId，None 表示不按搜索筛选
+        self.matched_ids: set[str] | None = None
+        self.setSourceModel(model)
+
+    def set_outdated_only(self, outdated_only: bool):
+        self.outdated_only = outdated_only
+        self.invalidateFilter()
+
+    def set_matched_ids(self, matched_ids: set[str] | None):
+        if matched_ids is None and self.matched_ids is None:
+            return
+        self.matched_ids = matched_ids
+        if matched_ids is not None:
+            self._model.fetch_all()
+        self.invalidateFilter()
+
+    def source_row(self, index: QModelIndex) -> int:
+        return self.mapToSource(index).row()
+
+    def lessThan(self, source_left: QModelIndex, source_right: QModelIndex) -> bool:
+        if source_left.column() == SIZE_COLUMN:
+            # 按字节数排序，显示的文字带单位不能直接比较
+            return (
+                self._model.record(source_left.row()).size_bytes
+                < self._model.record(source_right.row()).size_bytes
+            )
+        return super().lessThan(source_left, source_right)
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        record = self._model.record(source_row)
+        if self.outdated_only and not record.outdated:
+            return False
+        return self.matched_ids is None or record.published_file_id in self.matched_ids
+
+
 # 自定义委托类，用于在单元格中放置按钮
 
 
@@ -157,4 +413,4 @@ class ButtonDelegate(QStyledItemDelegate):
             and event.type() == QEvent.Type.MouseButtonRelease
         ):
             self._handleButtonClicked(index)
-        return super().editorEvent(event, model, option, index)
\ No newline at end of file
+        return super().editorEvent(event, model, option, index)
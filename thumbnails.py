@@ -0,0 +1,218 @@
+"""
+表格预览图列用的缩略图缓存。
+
+视图只为画到的单元格取 DecorationRole，所以只有可见的行会请求解码。
+请求按后进先出交给后台线程，快速滚动时先解码停下来时看得到的行，
+排队太久的旧请求直接丢弃。解码用 QImageReader 按目标大小读取（在非 GUI
+线程里只能用 QImage），结果放进按字节数限制大小的 LRU，同时以源文件路径、
+大小和 mtime 为键存一份 PNG 到磁盘，下次打开窗口时不用再解码原图。
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+
+from . import diagnostics
+from .defaults import DEFAULT_THUMBNAIL_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 内存里的缩略图最多占用的字节数，48px 的图大约 9 KB 一张
+MEMORY_BYTES = 32 * 1024 * 1024
+# 磁盘缓存超过这个大小时删掉最久没用的文件
+DISK_BYTES = 64 * 1024 * 1024
+# 排队等待解码的请求数上限，超出时丢掉最早的（多半已经滚出视图）
+MAX_PENDING = 256
+DECODE_WORKERS = 2
+
+
+class ThumbnailCache(QObject):
+    # 请求时给的键，图片已经放进缓存（或者确定没有图片）
+    ready = pyqtSignal(str)
+
+    def __init__(
+        self,
+        disk_path: Path,
+        size: int = DEFAULT_THUMBNAIL_SIZE,
+        memory_bytes: int = MEMORY_BYTES,
+        workers: int = DECODE_WORKERS,
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent)
+        self.size = size
+        self.memory_bytes = memory_bytes
+        self._disk_path = disk_path
+        self._images: OrderedDict[str, QImage] = OrderedDict()
+        self._used_bytes = 0
+        # 没有预览图或解码失败的键，避免每次重画都重新请求
+        self._missing: set[str] = set()
+        # 键 -> 候选图片路径，按请求顺序排列
+        self._pending: deque[tuple[str, tuple[str, ...]]] = deque()
+        self._queued: set[str] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        disk_path.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="dd-thumbnail"
+        )
+        self._executor.submit(self._prune_disk)
+
+    def get(self, key: str, paths: tuple[str, ...]) -> QImage | None:
+        """
+        在 GUI 线程里调用：有缓存时直接返回，否则排队解码 ``paths`` 里第一张能读的图，
+        完成后发出 ``ready(key)``。
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+            if key in self._missing or key in self._queued or self._closed:
+                return None
+            self._queued.add(key)
+            self._pending.append((key, paths))
+            while len(self._pending) > MAX_PENDING:
+                old_key, _paths = self._pending.popleft()
+                self._queued.discard(old_key)
+        self._executor.submit(self._work)
+        return None
+
+    def discard(self, key: str):
+        """
+        模组更新后丢掉旧的缩略图，下次显示时重新读取。
+        """
+        with self._lock:
+            image = self._images.pop(key, None)
+            if image is not None:
+                self._used_bytes -= image.sizeInBytes()
+            self._missing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._used_bytes = 0
+            self._missing.clear()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+            self._queued.clear()
+        self._executor.shutdown(wait=False)
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def _work(self):
+        with self._lock:
+            if not self._pending:
+                return
+            # 最新的请求对应当前可见的行
+            key, paths = self._pending.pop()
+        try:
+            image = self._load(paths)
+        except Exception:
+            # 预期内的读写失败在 _load 里已经处理，这里只兜底，免得 key 一直留在队列里
+            logger.exception(f"thumbnail {key} failed")
+            image = None
+        with self._lock:
+            self._queued.discard(key)
+            if self._closed:
+                return
+            if image is None:
+                self._missing.add(key)
+            else:
+                self._store(key, image)
+        self.ready.emit(key)
+
+    def _store(self, key: str, image: QImage):
+        old = self._images.pop(key, None)
+        if old is not None:
+            self._used_bytes -= old.sizeInBytes()
+        self._images[key] = image
+        self._used_bytes += image.sizeInBytes()
+        while self._used_bytes > self.memory_bytes and len(self._images) > 1:
+            _old_key, old = self._images.popitem(last=False)
+            self._used_bytes -= old.sizeInBytes()
+
+    def _disk_file(self, path: str, st: os.stat_result) -> Path:
+        key = f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0{self.size}"
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        return self._disk_path / f"{digest}.png"
+
+    def _load(self, paths: tuple[str, ...]) -> QImage | None:
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            cached = self._disk_file(path, st)
+            image = QImage(str(cached))
+            if not image.isNull():
+                # 用 mtime 记录最后使用的时间，清理磁盘缓存时先删最久没用的
+                try:
+                    os.utime(cached)
+                except OSError:
+                    pass
+                return image
+            with diagnostics.span("thumbnail.decode", 1, st.st_size):
+                image = self._decode(path)
+            if image is None:
+                continue
+            if not image.save(str(cached), "PNG"):
+                logger.debug(f"can not write thumbnail cache {cached}")
+            return image
+        return None
+
+    def _decode(self, path: str) -> QImage | None:
+        reader = QImageReader(path)
+        # 让支持的格式（如 JPEG）直接按缩小后的尺寸解码
+        source_size = reader.size()
+        if source_size.isValid():
+            reader.setScaledSize(
+                source_size.scaled(
+                    QSize(self.size, self.size), Qt.AspectRatioMode.KeepAspectRatio
+                )
+            )
+        image = reader.read()
+        if image.isNull():
+            logger.debug(f"can not decode {path}: {reader.errorString()}")
+            return None
+        if image.width() > self.size or image.height() > self.size:
+            image = image.scaled(
+                self.size,
+                self.size,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation,
+            )
+        return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+    def _prune_disk(self):
+        try:
+            entries = [
+                (entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self._disk_path)
+                if entry.is_file() and entry.name.endswith(".png")
+            ]
+        except OSError as e:
+            logger.debug(f"can not list thumbnail cache: {e}")
+            return
+        total = sum(size for _mtime, size, _path in entries)
+        if total <= DISK_BYTES:
+            return
+        for _mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= DISK_BYTES * 3 // 4:
+                break
@@ -0,0 +1,122 @@
+"""
+appworkshop_262060.acf 的流式读取。
+
+整个文件可能有几 MB，但插件只需要每个模组的 id、manifest、timeupdated
+和 size，所以逐行切分 KeyValues 记号，只保留需要的字段，不构建完整的嵌套字典。
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+# 带引号的字符串、花括号、注释、不带引号的记号
+_TOKEN = re.compile(r'"((?:\\.|[^\\"])*)"|([{}])|(//)|([^\s{}"]+)')
+
+DETAILS_KEYS = ("manifest", "timeupdated")
+INSTALLED_KEYS = ("size",)
+
+
+class WorkshopItem:
+    __slots__ = ("manifest", "published_file_id", "size", "timeupdated")
+
+    def __init__(
+        self,
+        published_file_id: str,
+        manifest: str = "",
+        timeupdated: str = "",
+        size: str = "",
+    ):
+        self.published_file_id = published_file_id
+        self.manifest = manifest
+        self.timeupdated = timeupdated
+        self.size = size
+
+    def __repr__(self):
+        return f"WorkshopItem({self.published_file_id}, manifest={self.manifest}, timeupdated={self.timeupdated})"
+
+
+class _Brace:
+    __slots__ = ()
+
+
+# 花括号用单独的对象表示，不会和内容是 "{" 的字符串混淆
+_OPEN = _Brace()
+_CLOSE = _Brace()
+
+
+def _tokens(lines: Iterable[str]) -> Iterator[str | _Brace]:
+    for line in lines:
+        # 绝大多数行是 `"key" "value"`、`"key"` 或单独的花括号，直接按引号切开
+        if "\\" not in line and "//" not in line:
+            parts = line.split('"')
+            if not parts[0].strip():
+                if len(parts) == 5 and not parts[2].strip() and not parts[4].strip():
+                    yield parts[1]
+                    yield parts[3]
+                    continue
+                if len(parts) == 3 and not parts[2].strip():
+                    yield parts[1]
+                    continue
+                if len(parts) == 1:
+                    stripped = line.strip()
+                    if not stripped:
+                        continue
+                    if stripped == "{":
+                        yield _OPEN
+                        continue
+                    if stripped == "}":
+                        yield _CLOSE
+                        continue
+        for quoted, brace, comment, bare in _TOKEN.findall(line):
+            if comment:
+                break
+            if brace == "{":
+                yield _OPEN
+            elif brace == "}":
+                yield _CLOSE
+            elif bare:
+                yield bare
+            else:
+                yield quoted
+
+
+def parse_workshop_acf(acf_path: Path) -> dict[str, WorkshopItem]:
+    """
+    读取 WorkshopItemDetails 里的模组（保持文件里的顺序）及其 manifest、
+    timeupdated，并从 WorkshopItemsInstalled 补上 size。
+    """
+    items: dict[str, WorkshopItem] = {}
+    installed_sizes: dict[str, str] = {}
+    # 当前所在的键路径，例如 ["AppWorkshop", "WorkshopItemDetails", "123"]
+    path: list[str] = []
+    key: str | None = None
+    with open(acf_path, "r", encoding="utf-8", errors="replace") as f:
+        for token in _tokens(f):
+            if token is _OPEN:
+                # 进入一个块
+                path.append(key or "")
+                key = None
+                if len(path) == 3 and path[1] == "WorkshopItemDetails":
+                    items.setdefault(path[2], WorkshopItem(path[2]))
+                continue
+            if not isinstance(token, str):
+                # 离开一个块
+                if path:
+                    path.pop()
+                key = None
+                continue
+            if key is None:
+                key = token
+                continue
+            # key 后面跟着值
+            if len(path) == 3:
+                section, item_id = path[1], path[2]
+                if section == "WorkshopItemDetails" and key in DETAILS_KEYS:
+                    setattr(items[item_id], key, token)
+                elif section == "WorkshopItemsInstalled" and key in INSTALLED_KEYS:
+                    installed_sizes[item_id] = token
+            key = None
+    for item_id, size in installed_sizes.items():
+        if item_id in items:
+            items[item_id].size = size
+    return items
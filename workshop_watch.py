@@ -0,0 +1,88 @@
+"""
+监视创意工坊和 MO2 模组文件夹的变化。
+
+Steam 下载或更新模组时会改写 appworkshop_262060.acf、在 content/262060 下
+增删文件夹；在 MO2 里安装或删除模组会改动 modsPath。这些事件经过防抖后
+合并成一次 ``changed`` 信号，由插件只重新读取受影响的行
+（差异由 mod_core.ModCore.diff_workshop_items 计算）。
+QFileSystemWatcher 监视不了的路径（例如部分网络盘）改用定时比较 mtime。
+"""
+
+import logging
+import os
+from pathlib import Path
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# 最后一次事件之后等多久再刷新（毫秒），Steam 更新一个模组会连续触发很多次
+DEBOUNCE_MS = 1000
+# 轮询模式下比较 mtime 的间隔（毫秒）
+POLL_INTERVAL_MS = 3000
+
+
+def _mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class WorkshopWatcher(QObject):
+    changed = pyqtSignal()
+
+    def __init__(
+        self,
+        paths: list[Path],
+        poll: bool = False,
+        parent: QObject | None = None,
+    ):
+        """
+        ``poll`` 为 True 时全部改用轮询，否则只轮询 QFileSystemWatcher 加不上的路径。
+        """
+        super().__init__(parent)
+        self._paths = [str(path) for path in paths if path.exists()]
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watcher.directoryChanged.connect(self._schedule)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.changed.emit)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+        self._polled: dict[str, int | None] = {}
+
+        failed = list(self._paths)
+        if not poll and self._paths:
+            failed = self._watcher.addPaths(self._paths)
+        if failed:
+            logger.debug(f"polling {len(failed)} paths: {failed}")
+            self._polled = {path: _mtime_ns(path) for path in failed}
+            self._poll_timer.start()
+
+    def stop(self):
+        self._debounce.stop()
+        self._poll_timer.stop()
+        if files := self._watcher.files():
+            self._watcher.removePaths(files)
+        if directories := self._watcher.directories():
+            self._watcher.removePaths(directories)
+
+    def _on_file_changed(self, path: str):
+        # Steam 用替换的方式写 acf，原来的文件被删掉后监视也随之失效，要重新加上
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        self._schedule()
+
+    def _schedule(self, *_args: object):
+        self._debounce.start()
+
+    def _poll(self):
+        for path, mtime in self._polled.items():
+            current = _mtime_ns(path)
+            if current != mtime:
+                self._polled[path] = current
+                self._schedule()
@@ -0,0 +1,180 @@
+"""
+project.xml 解析结果的持久化缓存。
+
+以 (路径, 大小, mtime) 为键保存在插件数据目录下的 SQLite 里，打开窗口时
+命中缓存的模组不再读取和解析 xml。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from . import diagnostics
+from .mod_xml import dd_xml_data
+
+logger = logging.getLogger(__name__)
+
+# 表结构变了就加一，旧缓存会被直接丢弃
+SCHEMA_VERSION = 1
+
+
+class _CacheEntry:
+    __slots__ = ("data", "mtime_ns", "size")
+
+    def __init__(self, size: int, mtime_ns: int, data: dd_xml_data):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.data = data
+
+
+class ModXmlCache:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._entries: dict[str, _CacheEntry] = {}
+        # 本次扫描里访问过的路径，保存时没访问过的会被当成过期删掉
+        self._seen: set[str] = set()
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS mod_xml")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mod_xml (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                versions TEXT NOT NULL,
+                tags TEXT NOT NULL,
+                description TEXT NOT NULL,
+                published_file_id TEXT NOT NULL
+            )
+            """
+        )
+        return conn
+
+    def _load(self):
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT path, size, mtime_ns, title, versions, tags,"
+                    " description, published_file_id FROM mod_xml"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception(f"failed to load xml cache {self.db_path}")
+            return
+        for path, size, mtime_ns, title, versions, tags, description, pfid in rows:
+            self._entries[path] = _CacheEntry(
+                size,
+                mtime_ns,
+                dd_xml_data(
+                    title, json.loads(versions), json.loads(tags), description, pfid
+                ),
+            )
+
+    def lookup(
+        self, xml_file: str | Path
+    ) -> tuple[dd_xml_data | None, os.stat_result | None]:
+        """
+        查缓存，返回 (命中的数据, 文件的 stat)；文件不存在时 stat 为 None。
+        """
+        key = os.path.abspath(xml_file)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None, None
+        with self._lock:
+            self._seen.add(key)
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry.size == st.st_size
+                and entry.mtime_ns == st.st_mtime_ns
+            ):
+                self.hits += 1
+                return entry.data, st
+            self.misses += 1
+        return None, st
+
+    def store(self, xml_file: str | Path, st: os.stat_result, data: dd_xml_data):
+        key = os.path.abspath(xml_file)
+        with self._lock:
+            self._seen.add(key)
+            self._entries[key] = _CacheEntry(st.st_size, st.st_mtime_ns, data)
+            self._dirty.add(key)
+
+    def parse(self, xml_file: str | Path) -> dd_xml_data:
+        """
+        和 dd_xml_data.mod_xml_parser 一样，只是命中缓存时不读文件。
+        """
+        with diagnostics.span("mod_xml.cache_lookup"):
+            data, st = self.lookup(xml_file)
+        if data is not None:
+            return data
+        with diagnostics.span("mod_xml.parse") as span:
+            data = dd_xml_data.mod_xml_parser(xml_file)
+            if st is not None:
+                span.set(nbytes=st.st_size)
+        # 文件不存在时不缓存，保持原来的默认值行为
+        if st is not None:
+            self.store(xml_file, st, data)
+        return data
+
+    def save(self, prune: bool = True):
+        """
+        写回新解析的条目，``prune`` 时删除本次没有访问到的过期条目。
+        """
+        with self._lock:
+            stale = set(self._entries) - self._seen if prune else set()
+            for key in stale:
+                del self._entries[key]
+            rows = [
+                (
+                    key,
+                    entry.size,
+                    entry.mtime_ns,
+                    entry.data.mod_title,
+                    json.dumps(entry.data.mod_versions),
+                    json.dumps(entry.data.mod_tags, ensure_ascii=False),
+                    entry.data.mod_description,
+                    entry.data.mod_PublishedFileId,
+                )
+                for key in self._dirty
+                if (entry := self._entries.get(key)) is not None
+            ]
+            self._dirty.clear()
+        if not rows and not stale:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "DELETE FROM mod_xml WHERE path = ?", [(k,) for k in stale]
+                    )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO mod_xml VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            logger.exception(f"failed to save xml cache {self.db_path}")
+        logger.debug(
+            f"xml cache: {self.hits} hits, {self.misses} misses, "
+            f"{len(rows)} written, {len(stale)} pruned"
+        )